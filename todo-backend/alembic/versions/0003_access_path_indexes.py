@@ -0,0 +1,41 @@
+"""Composite indexes matching the crud access patterns
+
+- (parent_id, completed): children listings, children_count, subtree CTEs,
+  root listings (parent_id IS NULL ordered by the rowid tail)
+- (user_id, parent_id): per-user listings and stats
+- (completed, due_date, priority): overdue counts; also covers the stats
+  aggregation so it scans the index instead of the table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Superseded single-column index created by create_all on some databases
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('todos')}
+    if 'ix_todos_parent_id' in existing:
+        op.drop_index('ix_todos_parent_id', table_name='todos')
+
+    op.create_index('ix_todos_parent_id_completed', 'todos', ['parent_id', 'completed'])
+    op.create_index('ix_todos_user_id_parent_id', 'todos', ['user_id', 'parent_id'])
+    op.create_index('ix_todos_completed_due_date_priority', 'todos', ['completed', 'due_date', 'priority'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_completed_due_date_priority', table_name='todos')
+    op.drop_index('ix_todos_user_id_parent_id', table_name='todos')
+    op.drop_index('ix_todos_parent_id_completed', table_name='todos')
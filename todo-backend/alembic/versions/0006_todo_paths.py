@@ -0,0 +1,68 @@
+"""Materialized path and depth columns for the todo hierarchy
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('path', sa.Text(), nullable=True))
+    op.add_column('todos', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_todos_path', 'todos', ['path'])
+    # Every todo needs a root above it: children of deleted parents become roots
+    op.execute("""
+        UPDATE todos SET parent_id = NULL
+        WHERE parent_id IS NOT NULL AND parent_id NOT IN (SELECT id FROM todos)
+    """)
+    backfill_paths()
+    # Anything still without a path is in (or under) a parent_id cycle: cut
+    # each cycle at its lowest id, one at a time
+    bind = op.get_bind()
+    while True:
+        cut = bind.execute(sa.text("""
+            WITH RECURSIVE up(start, id) AS (
+                SELECT id, parent_id FROM todos WHERE path IS NULL
+                UNION
+                SELECT up.start, todos.parent_id FROM up JOIN todos ON todos.id = up.id
+            )
+            SELECT min(start) FROM up WHERE start = id
+        """)).scalar()
+        if cut is None:
+            break
+        bind.execute(sa.text("UPDATE todos SET parent_id = NULL WHERE id = :id"), {"id": cut})
+        backfill_paths()
+
+
+def backfill_paths() -> None:
+    """Set path and depth from parent_id, walking down from the roots"""
+    op.execute("""
+        WITH RECURSIVE tree(id, path, depth) AS (
+            SELECT id, '/' || id || '/', 0 FROM todos WHERE parent_id IS NULL
+            UNION ALL
+            SELECT todos.id, tree.path || todos.id || '/', tree.depth + 1
+            FROM todos JOIN tree ON todos.parent_id = tree.id
+        )
+        UPDATE todos SET
+            path = (SELECT tree.path FROM tree WHERE tree.id = todos.id),
+            depth = coalesce((SELECT tree.depth FROM tree WHERE tree.id = todos.id), 0)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_path', table_name='todos')
+    with op.batch_alter_table('todos') as batch_op:
+        batch_op.drop_column('depth')
+        batch_op.drop_column('path')
@@ -0,0 +1,30 @@
+"""Index for the due-date views
+
+- (parent_id, due_date, completed, priority): due-date views. Listings are
+  always scoped to a parent (roots by default), so parent_id leads and the
+  today / this_week range on due_date follows it; completed and priority
+  make it cover the root-only stats aggregation
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_todos_parent_id_due_date_completed_priority', 'todos', ['parent_id', 'due_date', 'completed', 'priority'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_parent_id_due_date_completed_priority', table_name='todos')
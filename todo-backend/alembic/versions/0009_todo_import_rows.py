@@ -0,0 +1,47 @@
+"""Staging table for imports
+
+Imports stage their rows chunk by chunk, each chunk its own transaction,
+and publish them into todos in one final transaction.
+
+- (staged_at): rows left by imports that never finished are dropped by age
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'todo_import_rows',
+        sa.Column('import_id', sa.String(length=32), nullable=False),
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('completed', sa.Boolean(), nullable=False),
+        sa.Column('priority', sa.String(length=10), nullable=False),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('staged_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('import_id', 'id'),
+    )
+    op.create_index('ix_todo_import_rows_staged_at', 'todo_import_rows', ['staged_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_import_rows_staged_at', table_name='todo_import_rows')
+    op.drop_table('todo_import_rows')
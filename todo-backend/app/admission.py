@@ -0,0 +1,143 @@
+"""Admission control: bounded concurrency and load shedding per request class.
+
+Without it a burst queues without limit: on the threadpool, in the database
+pools and behind SQLite's single writer, and every queued request makes all
+later ones slower. ``AdmissionMiddleware`` runs at most ADMISSION_READ_LIMIT
+reads (GET and HEAD) and ADMISSION_WRITE_LIMIT writes at once, each class
+with its own limit so a write burst cannot starve reads. Up to
+ADMISSION_*_QUEUE more requests wait for a slot, first come first served, for
+at most ADMISSION_QUEUE_TIMEOUT seconds. A request that finds the queue full,
+or whose wait runs out, is answered at once with ADMISSION_REJECT_STATUS and
+a Retry-After header instead of being served late. It is counted in
+``http_requests_shed_total``.
+
+Health checks, /metrics and the change stream (ADMISSION_EXEMPT_PATHS) are
+never limited: a stream would hold its slot for the whole connection. Limits are per process, like
+``app.metrics``.
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Deque
+
+from starlette.responses import JSONResponse
+
+from app import metrics
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL", "True").lower() == "true"
+# Requests of each class served at once
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", 32))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", 4))
+# Requests of each class that may wait for a slot; beyond that they are shed at once
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", 64))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", 32))
+# Seconds a request may wait for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 1))
+# 503 (server overloaded) by default; 429 for clients that only back off on that
+ADMISSION_REJECT_STATUS = int(os.getenv("ADMISSION_REJECT_STATUS", 503))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+
+# By path, not by headers a client chooses: any request could ask for text/event-stream
+ADMISSION_EXEMPT_PATHS = {"/health", "/metrics", "/api/todos/changes/stream"}
+READ_METHODS = {"GET", "HEAD"}
+
+
+class Limiter:
+    """At most ``limit`` holders; up to ``queue`` more wait, for at most ``timeout`` seconds.
+
+    Used from the event loop only. A released slot is handed straight to the
+    oldest waiter, so a newcomer can never overtake the queue.
+    """
+
+    def __init__(self, limit: int, queue: int, timeout: float):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> str:
+        """Take a slot; returns "" once held, else why not: "queue_full" or "timeout" """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return ""
+        if len(self._waiters) >= self.queue:
+            return "queue_full"
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(self.timeout, self._expire, waiter)
+        try:
+            # True once release() hands us the slot, False when the deadline passes
+            granted = await waiter
+        except asyncio.CancelledError:
+            # The client went away; a slot handed over meanwhile must be passed on
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return "" if granted else "timeout"
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(False)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+
+class AdmissionMiddleware:
+    """Limit concurrent reads and writes separately and shed what cannot be served in time"""
+
+    def __init__(
+        self,
+        app,
+        read_limit: int = ADMISSION_READ_LIMIT,
+        write_limit: int = ADMISSION_WRITE_LIMIT,
+        read_queue: int = ADMISSION_READ_QUEUE,
+        write_queue: int = ADMISSION_WRITE_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.app = app
+        self.limiters = {
+            "read": Limiter(read_limit, read_queue, queue_timeout),
+            "write": Limiter(write_limit, write_queue, queue_timeout),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        request_class = "read" if scope["method"] in READ_METHODS else "write"
+        limiter = self.limiters[request_class]
+        queued_at = asyncio.get_running_loop().time()
+        rejected = await limiter.acquire()
+        metrics.admission_wait.observe((request_class,), asyncio.get_running_loop().time() - queued_at)
+        if rejected:
+            metrics.requests_shed_total.inc((request_class, rejected))
+            response = JSONResponse(
+                {"error": "Server is busy, retry later", "status_code": ADMISSION_REJECT_STATUS},
+                status_code=ADMISSION_REJECT_STATUS,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,46 @@
+"""Async versions of the crud functions.
+
+Each function runs the matching ``app.crud`` function through
+``AsyncSession.run_sync``: the query logic is shared, but it executes in a
+greenlet on the event loop against the async driver, so a request waiting on
+the database holds no threadpool slot.
+"""
+
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+
+
+def _run_sync(fn):
+    """Wrap a sync crud function so it can be awaited with an AsyncSession"""
+    @functools.wraps(fn)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    return wrapper
+
+
+get_todo = _run_sync(crud.get_todo)
+get_todo_with_children = _run_sync(crud.get_todo_with_children)
+get_ancestors = _run_sync(crud.get_ancestors)
+get_todos = _run_sync(crud.get_todos)
+get_root_todos_with_children = _run_sync(crud.get_root_todos_with_children)
+create_todo = _run_sync(crud.create_todo)
+update_todo = _run_sync(crud.update_todo)
+delete_todo = _run_sync(crud.delete_todo)
+toggle_todo_completion = _run_sync(crud.toggle_todo_completion)
+search_todos = _run_sync(crud.search_todos)
+get_todo_stats = _run_sync(crud.get_todo_stats)
+move_todo = _run_sync(crud.move_todo)
+is_descendant = _run_sync(crud.is_descendant)
+bulk_delete_todos = _run_sync(crud.bulk_delete_todos)
+apply_batch = _run_sync(crud.apply_batch)
+begin_import = _run_sync(crud.begin_import)
+import_todos_chunk = _run_sync(crud.import_todos_chunk)
+finish_import = _run_sync(crud.finish_import)
+discard_import = _run_sync(crud.discard_import)
+generate_ai_subtasks = _run_sync(crud.generate_ai_subtasks)
+generate_ai_subtasks_batch = _run_sync(crud.generate_ai_subtasks_batch)
+get_data_version = _run_sync(crud.get_data_version)
+get_changes = _run_sync(crud.get_changes)
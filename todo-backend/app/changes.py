@@ -0,0 +1,54 @@
+"""In-process wake-ups for clients streaming the todo change feed.
+
+``crud.record_change`` marks the session; once that session commits, every
+waiting stream is woken so it can read the new changes immediately instead
+of waiting for its next poll.
+"""
+
+import asyncio
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ChangeNotifier:
+    """Wakes coroutines waiting for the next committed change"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    def waiter(self) -> asyncio.Event:
+        """Event set by the next notify(); take it *before* reading changes"""
+        loop = asyncio.get_running_loop()
+        # An event from another (possibly closed) loop can't be awaited here
+        if self._event is None or self._loop is not loop:
+            self._loop = loop
+            self._event = asyncio.Event()
+        return self._event
+
+    def notify(self) -> None:
+        """Wake all waiters; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+
+notifier = ChangeNotifier()
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    if session.info.pop("todo_changes", False):
+        notifier.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("todo_changes", None)
@@ -1,17 +1,328 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
-from typing import List, Optional
-from datetime import datetime, date
-from app.models import Todo
+from sqlalchemy.orm import Session, aliased, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Text, and_, or_, func, select, case, cast, exists, insert, literal, literal_column, true, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import base64
+import json
+import os
+import re
+import uuid
+from app import database
+from app.models import DataVersion, Todo, TodoChange, TodoCounter, TodoImportRow, todos_fts
 from app.schemas import TodoCreate, TodoUpdate
 
+# Keep per-user counters in todo_counters so /stats/ is an O(1) read
+STATS_COUNTERS_ENABLED = os.getenv("STATS_COUNTERS", "False").lower() == "true"
+
+PRIORITIES = ('low', 'medium', 'high')
+
+# Due-date views of GET /api/todos/?due=...
+DUE_VIEWS = ('today', 'overdue', 'this_week')
+
+# Versions of change history kept for /changes; older clients must resync
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", 10000))
+
+# Seconds after which rows staged by an unfinished import are dropped
+IMPORT_STAGING_RETENTION = int(os.getenv("IMPORT_STAGING_RETENTION", 86400))
+
+def encode_cursor(*key) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor token"""
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor token into its key values; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, (int, float)) for value in key):
+        raise ValueError("Invalid cursor")
+    return key
+
+def next_cursor(todos: List[Todo], limit: int) -> Optional[str]:
+    """Cursor for the page after ``todos``, or None when this was the last page"""
+    if len(todos) < limit:
+        return None
+    last = todos[-1]
+    if last.rank is not None:
+        return encode_cursor(last.rank, last.id)
+    return encode_cursor(last.id)
+
+def _after_id(query, cursor: Optional[str]):
+    """Keyset-paginate a query on the primary key"""
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.filter(Todo.id > last_id)
+    return query.order_by(Todo.id)
+
+def local_now(tz: Optional[str] = None) -> datetime:
+    """The wall-clock time in the IANA zone ``tz`` (server time if None), naive like due_date.
+
+    Due dates are stored as the wall-clock time the client sent, so a zone
+    only decides which day is "today"; raises ValueError for an unknown zone.
+    """
+    if tz is None:
+        return datetime.now()
+    try:
+        return datetime.now(ZoneInfo(tz)).replace(tzinfo=None)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown time zone: {tz}") from e
+
+def due_filter(due: str, now: datetime):
+    """Condition for a due-date view, with days bucketed by the wall-clock ``now``.
+
+    overdue: pending and due before today; today: due today; this_week: due
+    from today through Sunday. Each is a range on due_date, served together
+    with the listing's parent_id by ix_todos_parent_id_due_date_completed_priority.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if due == "overdue":
+        return and_(Todo.due_date < today, Todo.completed == False)
+    if due == "today":
+        end = today + timedelta(days=1)
+    elif due == "this_week":
+        end = today + timedelta(days=7 - today.weekday())
+    else:
+        raise ValueError(f"Unknown due view: {due}")
+    return and_(Todo.due_date >= today, Todo.due_date < end)
+
 def get_todo(db: Session, todo_id: int) -> Optional[Todo]:
     """Get a single todo by ID"""
     return db.query(Todo).filter(Todo.id == todo_id).first()
 
-def get_todo_with_children(db: Session, todo_id: int) -> Optional[Todo]:
-    """Get a todo with all its nested children"""
-    return db.query(Todo).options(joinedload(Todo.children)).filter(Todo.id == todo_id).first()
+def _with_progress(query):
+    """Add completed/total descendant counts to each loaded todo.
+
+    Both are correlated counts over the todo's own path range, so they ride
+    along in the query that loads the tree and use ix_todos_path. Completion
+    is counted rather than filtered on: ``completed = 1`` in the WHERE lets
+    SQLite pick the completed index and scan a third of the table per row.
+    """
+    descendant = aliased(Todo)
+    below = and_(
+        descendant.path > Todo.path,
+        descendant.path < func.substr(Todo.path, 1, func.length(Todo.path) - 1) + "0"
+    )
+    return query.options(
+        with_expression(
+            Todo.descendants_total,
+            select(func.count(descendant.id)).where(below).scalar_subquery()
+        ),
+        with_expression(
+            Todo.descendants_completed,
+            select(func.count(case((descendant.completed == True, 1)))).where(below).scalar_subquery()
+        ),
+    )
+
+def get_todo_with_children(db: Session, todo_id: int, max_depth: Optional[int] = None) -> Optional[Todo]:
+    """Get a todo with its nested children, at most ``max_depth`` levels down"""
+    todo = _with_progress(db.query(Todo)).filter(Todo.id == todo_id).first()
+    if todo:
+        load_subtrees(db, [todo], max_depth)
+    return todo
+
+def load_subtrees(db: Session, roots: List[Todo], max_depth: Optional[int] = None) -> List[Todo]:
+    """Load every descendant of the given roots with one indexed path query.
+
+    The roots are joined back by id and each contributes one range on
+    ix_todos_path, so the statement stays the same size however many roots a
+    page holds. The rows are attached to ``Todo.children`` in memory so
+    walking the tree afterwards never triggers a lazy load, whatever its
+    depth. With ``max_depth`` the todos on the last level get an empty
+    ``children``.
+    """
+    if not roots:
+        return roots
+
+    root = aliased(Todo)
+    rows = (
+        _with_progress(db.query(Todo))
+        .join(root, and_(
+            Todo.path > root.path,
+            Todo.path < func.substr(root.path, 1, func.length(root.path) - 1) + "0",
+            Todo.depth <= root.depth + max_depth if max_depth is not None else true()
+        ))
+        .filter(root.id.in_([todo.id for todo in roots]))
+        .all()
+    )
+    # By id, which also drops repeats should one root lie under another;
+    # sorted here rather than in SQL, which would trade the path ranges for a scan
+    descendants = sorted({todo.id: todo for todo in rows}.values(), key=lambda todo: todo.id)
+
+    children_by_parent: Dict[int, List[Todo]] = {}
+    for todo in descendants:
+        children_by_parent.setdefault(todo.parent_id, []).append(todo)
+    for todo in [*roots, *descendants]:
+        set_committed_value(todo, "children", children_by_parent.get(todo.id, []))
+    return roots
+
+def subtree_ids(root_ids: List[int], include_roots: bool = False, nesting: bool = False):
+    """Recursive CTE yielding the ids of every descendant of ``root_ids``.
+
+    ``nesting`` renders the WITH inside the enclosing subquery rather than in
+    front of the statement (SQLite reports no rowcount for WITH ... DELETE).
+    """
+    anchor = Todo.id.in_(root_ids) if include_roots else Todo.parent_id.in_(root_ids)
+    subtree = select(Todo.id).where(anchor).cte("subtree", recursive=True, nesting=nesting)
+    # UNION (not UNION ALL) so a corrupted parent_id cycle cannot recurse forever
+    return subtree.union(
+        select(Todo.id).where(Todo.parent_id == subtree.c.id)
+    )
+
+def under_path(path: str):
+    """Condition matching every todo strictly below the todo at ``path``.
+
+    Written as a range rather than LIKE so it is an index range scan on
+    ix_todos_path: descendants extend the prefix, and '/' sorts just before '0'.
+    """
+    return and_(Todo.path > path, Todo.path < path[:-1] + "0")
+
+def ancestor_ids(path: Optional[str]) -> List[int]:
+    """Ids of the ancestors encoded in a path, root first"""
+    return [int(part) for part in (path or "").strip("/").split("/")[:-1]]
+
+def get_ancestors(db: Session, todo: Todo) -> List[Todo]:
+    """The todo's ancestors from the root down (breadcrumbs), in one query"""
+    ids = ancestor_ids(todo.path)
+    if not ids:
+        return []
+    return db.query(Todo).filter(Todo.id.in_(ids)).order_by(Todo.depth).all()
+
+def _set_paths(db: Session, todo_ids: List[int]) -> None:
+    """Derive path and depth of newly inserted todos from their parents"""
+    parent = aliased(Todo)
+    parent_path = select(parent.path).where(parent.id == Todo.parent_id).scalar_subquery()
+    parent_depth = select(parent.depth).where(parent.id == Todo.parent_id).scalar_subquery()
+    db.execute(
+        update(Todo)
+        .where(Todo.id.in_(todo_ids))
+        .values(
+            path=func.coalesce(parent_path, "/") + cast(Todo.id, Text) + "/",
+            depth=func.coalesce(parent_depth + 1, 0)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def _move_path(db: Session, todo_id: int, new_parent_id: Optional[int]) -> None:
+    """Rewrite the paths of a moved todo and its subtree in one UPDATE"""
+    rows = {
+        row.id: row
+        for row in db.query(Todo.id, Todo.path, Todo.depth).filter(Todo.id.in_([todo_id, new_parent_id]))
+    }
+    old = rows[todo_id]
+    parent = rows.get(new_parent_id)
+    new_path = f"{parent.path if parent else '/'}{todo_id}/"
+    new_depth = parent.depth + 1 if parent else 0
+    if old.path == new_path:
+        return
+    db.execute(
+        update(Todo)
+        .where(or_(Todo.id == todo_id, under_path(old.path)))
+        .values(
+            path=new_path + func.substr(Todo.path, len(old.path) + 1),
+            depth=Todo.depth + (new_depth - old.depth)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def _computed_paths(roots=None):
+    """Recursive CTE deriving each todo's path and depth from parent_id.
+
+    Starts from every root, or from the roots matching ``roots``. Todos whose
+    parent chain never reaches one (orphans, cycles) are absent.
+    """
+    tree = (
+        select(
+            Todo.id,
+            (literal("/") + cast(Todo.id, Text) + "/").label("path"),
+            literal(0).label("depth")
+        )
+        .where(Todo.parent_id.is_(None), roots if roots is not None else true())
+        .cte("tree", recursive=True, nesting=True)
+    )
+    child = aliased(Todo)
+    return tree.union_all(
+        select(child.id, tree.c.path + cast(child.id, Text) + "/", tree.c.depth + 1)
+        .where(child.parent_id == tree.c.id)
+    )
+
+def verify_todo_paths(db: Session) -> List[int]:
+    """Ids of todos whose stored path or depth disagrees with parent_id"""
+    tree = select(_computed_paths()).subquery()
+    return db.scalars(
+        select(Todo.id)
+        .outerjoin(tree, tree.c.id == Todo.id)
+        .where(or_(
+            tree.c.id.is_(None),
+            Todo.path.is_distinct_from(tree.c.path),
+            Todo.depth != tree.c.depth
+        ))
+        .order_by(Todo.id)
+    ).all()
+
+def _rebuild_paths(db: Session, roots=None) -> int:
+    """Rewrite path and depth under the matching roots where they drifted"""
+    tree = select(_computed_paths(roots)).subquery()
+    return db.execute(
+        update(Todo)
+        .where(Todo.id == tree.c.id)
+        .where(or_(Todo.path.is_distinct_from(tree.c.path), Todo.depth != tree.c.depth))
+        .values(path=tree.c.path, depth=tree.c.depth)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+def reroot_unreachable_todos(db: Session) -> List[int]:
+    """Turn into roots the todos whose parent chain never reaches one; returns their ids.
+
+    A chain that stops at a parent which no longer exists (an orphan left by a
+    raw delete) is re-rooted at its top todo, as finish_import does; a
+    parent_id cycle is cut at its lowest id. Their subtrees get paths on the
+    next rebuild. Does not commit.
+    """
+    tree = select(_computed_paths()).subquery()
+    parents = dict(
+        db.query(Todo.id, Todo.parent_id)
+        .outerjoin(tree, tree.c.id == Todo.id)
+        .filter(tree.c.id.is_(None))
+        .all()
+    )
+    roots = set()
+    seen = set()
+    for todo_id in parents:
+        chain = []
+        node = todo_id
+        while node in parents and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            node = parents[node]
+        if node not in parents:
+            # Unreachable rows all have a parent_id, so this one is missing
+            roots.add(chain[-1])
+        elif node in chain:
+            roots.add(min(chain[chain.index(node):]))
+
+    rerooted = sorted(roots)
+    if rerooted:
+        db.query(Todo).filter(Todo.id.in_(rerooted)).update({Todo.parent_id: None}, synchronize_session=False)
+        record_change(db, "update", rerooted)
+    return rerooted
+
+def rebuild_todo_paths(db: Session) -> int:
+    """Recompute path and depth from parent_id where they drifted; returns rows fixed.
+
+    Unreachable todos are re-rooted first, so afterwards every todo has a path.
+    """
+    reroot_unreachable_todos(db)
+    fixed = _rebuild_paths(db)
+    db.commit()
+    return fixed
 
 def get_todos(
     db: Session,
@@ -20,9 +331,12 @@ def get_todos(
     parent_id: Optional[int] = None,
     completed: Optional[bool] = None,
     priority: Optional[str] = None,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    due: Optional[str] = None,
+    tz: Optional[str] = None
 ) -> List[Todo]:
-    """Get todos with optional filtering"""
+    """Get todos with optional filtering, ordered by id"""
     query = db.query(Todo)
     
     if parent_id is not None:
@@ -39,248 +353,832 @@ def get_todos(
     
     if user_id:
         query = query.filter(Todo.user_id == user_id)
+
+    if due:
+        query = query.filter(due_filter(due, local_now(tz)))
     
-    return query.offset(skip).limit(limit).all()
+    return _after_id(query, cursor).offset(skip).limit(limit).all()
 
-def get_root_todos_with_children(db: Session, skip: int = 0, limit: int = 100) -> List[Todo]:
-    """Get all root todos with their nested children"""
-    return db.query(Todo).options(joinedload(Todo.children)).filter(
-        Todo.parent_id.is_(None)
-    ).offset(skip).limit(limit).all()
+def get_root_todos_with_children(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    due: Optional[str] = None,
+    tz: Optional[str] = None
+) -> List[Todo]:
+    """Get all root todos (those in the ``due`` view, if given) with their nested children"""
+    query = _with_progress(db.query(Todo)).filter(Todo.parent_id.is_(None))
+    if due:
+        query = query.filter(due_filter(due, local_now(tz)))
+    roots = _after_id(query, cursor).offset(skip).limit(limit).all()
+    return load_subtrees(db, roots)
 
 def create_todo(db: Session, todo: TodoCreate) -> Todo:
     """Create a new todo"""
     db_todo = Todo(**todo.model_dump())
     db.add(db_todo)
+    _count_todo(db, db_todo, 1)
+    db.flush()
+    _set_paths(db, [db_todo.id])
+    record_change(db, "insert", [db_todo.id])
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
 def update_todo(db: Session, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
-    """Update an existing todo"""
+    """Update an existing todo; raises ValueError for an invalid new parent"""
     db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
     if not db_todo:
         return None
     
     update_data = todo_update.model_dump(exclude_unset=True)
+    moved = "parent_id" in update_data and update_data["parent_id"] != db_todo.parent_id
+    if moved:
+        (error,) = check_moves(db, [(todo_id, update_data["parent_id"])])
+        if error:
+            raise ValueError(error)
+    _count_todo(db, db_todo, -1)
     for field, value in update_data.items():
         setattr(db_todo, field, value)
+    _count_todo(db, db_todo, 1)
+    if moved:
+        _move_path(db, todo_id, update_data["parent_id"])
     
+    record_change(db, "move" if moved else "update", [todo_id])
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
+def delete_subtrees(db: Session, root_ids: List[int], version: Optional[int] = None) -> int:
+    """Delete todos and all their descendants with one set-based DELETE.
+
+    The subtree is resolved by a recursive CTE inside the statement, so no
+    rows are loaded into the session and no child is left orphaned. Does not
+    commit; returns the number of todos deleted.
+    """
+    subtree = subtree_ids(root_ids, include_roots=True)
+    _count_todos(db, Todo.id.in_(select(subtree)), -1)
+    record_change(db, "delete", subtree, version)
+    return db.query(Todo).filter(
+        Todo.id.in_(select(subtree_ids(root_ids, include_roots=True, nesting=True)))
+    ).delete(synchronize_session=False)
+
 def delete_todo(db: Session, todo_id: int) -> bool:
     """Delete a todo and all its children (cascade)"""
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
-    if not db_todo:
+    if db.query(Todo.id).filter(Todo.id == todo_id).first() is None:
         return False
     
-    db.delete(db_todo)
+    delete_subtrees(db, [todo_id])
     db.commit()
     return True
 
-def toggle_todo_completion(db: Session, todo_id: int, completed: bool) -> Optional[Todo]:
-    """Toggle todo completion status"""
+def toggle_todo_completion(db: Session, todo_id: int, completed: bool, cascade: bool = False) -> Optional[Todo]:
+    """Toggle todo completion status, optionally for its whole subtree"""
     db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
     if not db_todo:
         return None
     
-    db_todo.completed = completed
+    if cascade:
+        _set_subtree_completed(db, db_todo, completed)
+    else:
+        _count_todo(db, db_todo, -1)
+        db_todo.completed = completed
+        _count_todo(db, db_todo, 1)
+        record_change(db, "update", [todo_id])
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
-def search_todos(db: Session, query: str, skip: int = 0, limit: int = 100) -> List[Todo]:
-    """Search todos by text content"""
-    return db.query(Todo).filter(
-        Todo.text.ilike(f"%{query}%")
-    ).offset(skip).limit(limit).all()
+def _set_subtree_completed(db: Session, todo: Todo, completed: bool) -> None:
+    """Set ``completed`` on a todo and all its descendants with one UPDATE"""
+    changing = and_(
+        or_(Todo.id == todo.id, under_path(todo.path)),
+        Todo.completed != completed
+    )
+    _count_todos(db, changing, -1)
+    version = record_change(db, "update", select(Todo.id).where(changing).subquery())
+    # The change log now names exactly the rows that flip, before and after
+    logged = Todo.id.in_(select(TodoChange.todo_id).where(TodoChange.version == version))
+    db.query(Todo).filter(logged).update({Todo.completed: completed}, synchronize_session=False)
+    _count_todos(db, logged, 1)
+
+def get_data_version(db: Session) -> int:
+    """Current global data version; it changes whenever any todo is written"""
+    return db.query(DataVersion.version).filter(DataVersion.id == 1).scalar() or 0
+
+def bump_data_version(db: Session) -> int:
+    """Advance the data version inside the caller's write transaction"""
+    return db.execute(
+        update(DataVersion)
+        .where(DataVersion.id == 1)
+        .values(version=DataVersion.version + 1)
+        .returning(DataVersion.version)
+    ).scalar()
+
+def reset_data_version(db: Session, floor: int) -> int:
+    """Move the data version well past ``floor`` and drop the change history.
+
+    Used after a restore: the jump is larger than CHANGE_LOG_RETENTION, so no
+    ETag handed out before can match and every client's next /changes read is
+    a reset rather than a silent gap.
+    """
+    version = max(get_data_version(db), floor) + CHANGE_LOG_RETENTION + 1
+    db.query(DataVersion).filter(DataVersion.id == 1).update(
+        {DataVersion.version: version}, synchronize_session=False
+    )
+    db.query(TodoChange).delete(synchronize_session=False)
+    db.info["todo_changes"] = True
+    db.commit()
+    return version
+
+def record_change(db: Session, op: str, todo_ids, version: Optional[int] = None) -> int:
+    """Bump the data version and log ``op`` for the affected todos.
+
+    ``todo_ids`` is either a list of ids or a selectable with an ``id`` column
+    (e.g. a subtree CTE), which is logged with a single INSERT ... SELECT.
+    Pass ``version`` to log several ops of one transaction under one version.
+    """
+    version = version or bump_data_version(db)
+    if isinstance(todo_ids, list):
+        if todo_ids:
+            db.execute(insert(TodoChange), [
+                {"version": version, "op": op, "todo_id": todo_id} for todo_id in todo_ids
+            ])
+    else:
+        db.execute(insert(TodoChange).from_select(
+            ["version", "op", "todo_id"],
+            select(literal(version), literal(op), todo_ids.c.id)
+        ))
+    if version % 100 == 0:
+        db.query(TodoChange).filter(
+            TodoChange.version <= version - CHANGE_LOG_RETENTION
+        ).delete(synchronize_session=False)
+    # Picked up by app.changes after commit to wake streaming clients
+    db.info["todo_changes"] = True
+    return version
+
+def get_changes(db: Session, since: int, limit: int = 1000) -> dict:
+    """Changes committed after version ``since`` plus the current state of touched todos.
+
+    ``reset`` is set when the history no longer reaches back to ``since`` or
+    holds more than ``limit`` changes; the client should then refetch in full.
+    """
+    version = get_data_version(db)
+    feed = {"version": version, "reset": False, "changes": [], "todos": []}
+    if since < version - CHANGE_LOG_RETENTION:
+        feed["reset"] = True
+        return feed
+
+    changes = db.query(TodoChange).filter(
+        TodoChange.version > since
+    ).order_by(TodoChange.version, TodoChange.id).limit(limit + 1).all()
+    if len(changes) > limit:
+        feed["reset"] = True
+        return feed
+
+    if changes:
+        feed["version"] = max(version, changes[-1].version)
+        touched = {change.todo_id for change in changes if change.op != "delete"}
+        feed["changes"] = changes
+        feed["todos"] = db.query(Todo).filter(Todo.id.in_(touched)).order_by(Todo.id).all()
+    return feed
+
+def fts_match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+def search_todos(
+    db: Session,
+    query: str,
+    skip: int = 0,
+    limit: int = 100,
+    highlight: bool = False,
+    cursor: Optional[str] = None
+) -> List[Todo]:
+    """Search todos by text content, ranked by bm25 when FTS5 is available"""
+    if not database.FTS_ENABLED:
+        return _after_id(
+            db.query(Todo).filter(Todo.text.ilike(f"%{query}%")), cursor
+        ).offset(skip).limit(limit).all()
+
+    match = fts_match_expression(query)
+    if match is None:
+        return []
+
+    fts = literal_column(todos_fts.name)
+    rank = func.bm25(fts)
+    results = db.query(Todo).join(
+        todos_fts, todos_fts.c.rowid == Todo.id
+    ).filter(fts.op("MATCH")(match)).options(with_expression(Todo.rank, rank))
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        results = results.filter(tuple_(rank, Todo.id) > tuple_(last_rank, last_id))
+    if highlight:
+        results = results.options(with_expression(
+            Todo.snippet, func.snippet(fts, 0, "<mark>", "</mark>", "…", 12)
+        ))
+    return results.order_by(rank, Todo.id).offset(skip).limit(limit).all()
+
+def get_todo_stats(
+    db: Session,
+    user_id: Optional[int] = None,
+    root_only: bool = False,
+    tz: Optional[str] = None
+) -> dict:
+    """Get todo statistics, of root todos only if ``root_only``, with days bucketed in ``tz``"""
+    now = local_now(tz)
+    overdue_filter = due_filter("overdue", now)
+    due_today_filter = due_filter("today", now)
+
+    if STATS_COUNTERS_ENABLED and not root_only:
+        # Counters are materialized; only the time-based counts are computed,
+        # each a range on the completed-first due_date index
+        counters = db.query(
+            func.coalesce(func.sum(TodoCounter.total), 0),
+            func.coalesce(func.sum(TodoCounter.completed), 0),
+            *[func.coalesce(func.sum(getattr(TodoCounter, p)), 0) for p in PRIORITIES]
+        )
+        overdue_query = db.query(func.count(Todo.id)).filter(overdue_filter)
+        # Both completed values, so the due_date range can use that index too
+        due_today_query = db.query(func.count(Todo.id)).filter(
+            due_today_filter, Todo.completed.in_((False, True))
+        )
+        if user_id:
+            counters = counters.filter(TodoCounter.user_id == user_id)
+            overdue_query = overdue_query.filter(Todo.user_id == user_id)
+            due_today_query = due_today_query.filter(Todo.user_id == user_id)
+        total, completed, *by_priority = counters.one()
+        overdue = overdue_query.scalar()
+        due_today = due_today_query.scalar()
+    else:
+        # One conditional-aggregation pass instead of a COUNT per statistic
+        query = db.query(
+            func.count(Todo.id),
+            func.count(case((Todo.completed == True, 1))),
+            func.count(case((overdue_filter, 1))),
+            func.count(case((due_today_filter, 1))),
+            *[func.count(case((Todo.priority == p, 1))) for p in PRIORITIES]
+        )
+        if user_id:
+            query = query.filter(Todo.user_id == user_id)
+        if root_only:
+            query = query.filter(Todo.parent_id.is_(None))
+        total, completed, overdue, due_today, *by_priority = query.one()
 
-def get_todo_stats(db: Session, user_id: Optional[int] = None) -> dict:
-    """Get todo statistics"""
-    query = db.query(Todo)
-    if user_id:
-        query = query.filter(Todo.user_id == user_id)
-    
-    total = query.count()
-    completed = query.filter(Todo.completed == True).count()
-    pending = total - completed
-    
-    # Count overdue todos
-    today = date.today()
-    overdue = query.filter(
-        and_(Todo.due_date < today, Todo.completed == False)
-    ).count()
-    
-    # Count by priority
-    priority_stats = {}
-    for priority in ['low', 'medium', 'high']:
-        priority_stats[priority] = query.filter(Todo.priority == priority).count()
-    
     return {
         "total": total,
         "completed": completed,
-        "pending": pending,
+        "pending": total - completed,
         "overdue": overdue,
-        "by_priority": priority_stats
+        "due_today": due_today,
+        "by_priority": dict(zip(PRIORITIES, by_priority))
     }
 
+def _adjust_counters(db: Session, user_id: Optional[int], **deltas: int) -> None:
+    """Apply counter deltas for one user inside the caller's transaction"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not STATS_COUNTERS_ENABLED or not deltas:
+        return
+
+    updated = db.query(TodoCounter).filter(TodoCounter.user_id == user_id).update(
+        {getattr(TodoCounter, field): getattr(TodoCounter, field) + delta
+         for field, delta in deltas.items()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(TodoCounter(user_id=user_id, **deltas))
+        db.flush()
+
+def _count_todo(db: Session, todo: Todo, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) a single todo from the counters"""
+    _adjust_counters(
+        db, todo.user_id,
+        total=sign,
+        completed=sign if todo.completed else 0,
+        **{todo.priority: sign}
+    )
+
+def _count_todos(db: Session, condition, sign: int) -> None:
+    """Add or remove every todo matching ``condition`` with one grouped query"""
+    if not STATS_COUNTERS_ENABLED:
+        return
+
+    rows = db.query(
+        Todo.user_id,
+        func.count(Todo.id),
+        func.count(case((Todo.completed == True, 1))),
+        *[func.count(case((Todo.priority == p, 1))) for p in PRIORITIES]
+    ).filter(condition).group_by(Todo.user_id).all()
+    for user_id, total, completed, *by_priority in rows:
+        _adjust_counters(
+            db, user_id,
+            total=sign * total,
+            completed=sign * completed,
+            **{p: sign * n for p, n in zip(PRIORITIES, by_priority)}
+        )
+
+def rebuild_todo_counters(db: Session) -> None:
+    """Recompute todo_counters from scratch (used at startup and after restores)"""
+    db.query(TodoCounter).delete(synchronize_session=False)
+    rows = db.query(
+        Todo.user_id,
+        func.count(Todo.id),
+        func.count(case((Todo.completed == True, 1))),
+        *[func.count(case((Todo.priority == p, 1))) for p in PRIORITIES]
+    ).group_by(Todo.user_id).all()
+    db.add_all([
+        TodoCounter(
+            user_id=user_id,
+            total=total,
+            completed=completed,
+            **dict(zip(PRIORITIES, by_priority))
+        )
+        for user_id, total, completed, *by_priority in rows
+    ])
+    db.commit()
+
 def move_todo(db: Session, todo_id: int, new_parent_id: Optional[int]) -> Optional[Todo]:
-    """Move a todo to a different parent"""
+    """Move a todo to a different parent; raises ValueError for an invalid new parent"""
     db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
     if not db_todo:
         return None
     
-    # Prevent circular references
-    if new_parent_id and is_descendant(db, new_parent_id, todo_id):
-        return None
+    # Parent validation and cycle detection in one query
+    (error,) = check_moves(db, [(todo_id, new_parent_id)])
+    if error:
+        raise ValueError(error)
     
+    if new_parent_id != db_todo.parent_id:
+        _move_path(db, todo_id, new_parent_id)
     db_todo.parent_id = new_parent_id
+    record_change(db, "move", [todo_id])
     db.commit()
     db.refresh(db_todo)
     return db_todo
 
+def parent_map(db: Session, todo_ids: List[int]) -> Dict[int, Optional[int]]:
+    """parent_id of the given todos and of all their ancestors, in one recursive query.
+
+    Walks parent_id itself rather than the derived paths, so cycle checks hold
+    even if the path index has drifted. Ids that do not exist are absent.
+    """
+    if not todo_ids:
+        return {}
+    chain = select(Todo.id, Todo.parent_id).where(Todo.id.in_(todo_ids)).cte("chain", recursive=True)
+    parent = aliased(Todo)
+    # UNION (not UNION ALL) so a corrupted parent_id cycle cannot recurse forever
+    chain = chain.union(
+        select(parent.id, parent.parent_id).where(parent.id == chain.c.parent_id)
+    )
+    return dict(db.execute(select(chain.c.id, chain.c.parent_id)).all())
+
+def _lineage(parents: Dict[int, Optional[int]], todo_id: Optional[int]):
+    """todo_id followed by its ancestors according to ``parents``"""
+    seen = set()
+    while todo_id is not None and todo_id not in seen:
+        yield todo_id
+        seen.add(todo_id)
+        todo_id = parents.get(todo_id)
+
+def check_moves(db: Session, moves: List[tuple]) -> List[Optional[str]]:
+    """Validate (todo_id, new_parent_id) moves, applied in order, with one query.
+
+    Returns an error message per move, or None where the move is valid. Later
+    moves are checked against the tree as left by the earlier valid ones.
+    """
+    parents = parent_map(db, [todo_id for move in moves for todo_id in move if todo_id is not None])
+    errors = []
+    for todo_id, new_parent_id in moves:
+        if todo_id not in parents:
+            errors.append("Todo not found")
+        elif new_parent_id is not None and new_parent_id not in parents:
+            errors.append("Parent todo not found")
+        elif todo_id in _lineage(parents, new_parent_id):
+            errors.append("Cannot move todo to its own descendant")
+        else:
+            parents[todo_id] = new_parent_id
+            errors.append(None)
+    return errors
+
 def is_descendant(db: Session, potential_parent_id: int, todo_id: int) -> bool:
     """Check if potential_parent_id is a descendant of todo_id (prevent circular refs)"""
-    todo = db.query(Todo).filter(Todo.id == potential_parent_id).first()
-    if not todo:
-        return False
-    
-    if todo.parent_id == todo_id:
-        return True
-    
-    if todo.parent_id:
-        return is_descendant(db, todo.parent_id, todo_id)
-    
-    return False
+    parents = parent_map(db, [potential_parent_id])
+    return todo_id in _lineage(parents, parents.get(potential_parent_id))
+
+# Columns written by /export and read back by /import, in file order
+EXPORT_FIELDS = (
+    "id", "parent_id", "text", "completed", "priority",
+    "due_date", "user_id", "created_at", "updated_at",
+)
+
+def export_todos_query():
+    """Core select of every todo's EXPORT_FIELDS, in id order, for streaming"""
+    return select(*[getattr(Todo, field) for field in EXPORT_FIELDS]).order_by(Todo.id)
+
+def begin_import(db: Session) -> str:
+    """Start an import; returns the id its rows are staged under.
+
+    Also drops rows left staged for more than IMPORT_STAGING_RETENTION
+    seconds by imports that never finished (their process died).
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=IMPORT_STAGING_RETENTION)
+    db.query(TodoImportRow).filter(TodoImportRow.staged_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return uuid.uuid4().hex
+
+def import_todos_chunk(db: Session, import_id: str, rows: List[dict]) -> None:
+    """Stage one chunk of exported rows with a single executemany, and commit.
+
+    Each chunk holds the write lock only for its own INSERT, so other writes
+    get through while a large file is read; finish_import publishes them.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for row in rows:
+        row["import_id"] = import_id
+        row["created_at"] = row["created_at"] or now
+        row["updated_at"] = row["updated_at"] or now
+    try:
+        db.execute(insert(TodoImportRow), rows)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise ValueError("Import contains the same todo id more than once") from e
+
+def discard_import(db: Session, import_id: str) -> None:
+    """Drop the staged rows of an import that failed"""
+    db.query(TodoImportRow).filter(TodoImportRow.import_id == import_id).delete(synchronize_session=False)
+    db.commit()
+
+def finish_import(db: Session, import_id: str) -> dict:
+    """Publish the staged rows as todos, linked up, indexed and logged, in one transaction.
+
+    The id offset is taken under the write lock that the first write here
+    takes. Imported ids are shifted by it, landing above every existing todo
+    with their parent links intact (into an empty table they are kept as they
+    are). Returns imported, orphaned and id_offset; raises ValueError, after
+    rolling back, if parent links form a cycle.
+    """
+    version = bump_data_version(db)
+    offset = db.query(func.max(Todo.id)).scalar() or 0
+    staged = TodoImportRow.import_id == import_id
+    shifted = {"id": TodoImportRow.id + offset, "parent_id": TodoImportRow.parent_id + offset}
+    count = db.execute(insert(Todo).from_select(
+        list(EXPORT_FIELDS),
+        select(*[shifted.get(field, getattr(TodoImportRow, field)) for field in EXPORT_FIELDS]).where(staged)
+    )).rowcount
+    db.query(TodoImportRow).filter(staged).delete(synchronize_session=False)
+
+    imported = Todo.id > offset
+    parent = aliased(Todo)
+    # A parent that was not part of the import: keep the todo as a root
+    orphaned = db.query(Todo).filter(
+        imported,
+        Todo.parent_id.isnot(None),
+        ~exists().where(parent.id == Todo.parent_id)
+    ).update({Todo.parent_id: None}, synchronize_session=False)
+    _rebuild_paths(db, roots=imported)
+    # Every chain now ends at a root, unless it loops back on itself
+    unreached = db.query(Todo.id).filter(imported, Todo.path.is_(None)).order_by(Todo.id).first()
+    if unreached:
+        db.rollback()
+        raise ValueError(f"Todo {unreached.id - offset} is in a parent_id cycle")
+    _count_todos(db, imported, 1)
+    record_change(db, "insert", select(Todo.id).where(imported).subquery(), version)
+    db.commit()
+    return {"imported": count, "orphaned": orphaned, "id_offset": offset}
 
 def bulk_delete_todos(db: Session, todo_ids: List[int]) -> int:
-    """Delete multiple todos by IDs"""
-    deleted_count = db.query(Todo).filter(Todo.id.in_(todo_ids)).delete(synchronize_session=False)
+    """Delete multiple todos by IDs, with all their children"""
+    deleted_count = delete_subtrees(db, todo_ids)
     db.commit()
     return deleted_count
 
-def generate_ai_subtasks(db: Session, parent_todo_id: int, max_subtasks: int = 5) -> List[Todo]:
-    """Generate AI subtasks for a given parent todo (mock implementation)"""
-    parent_todo = get_todo(db, parent_todo_id)
-    if not parent_todo:
-        return []
-    
-    # Mock AI analysis based on todo text
-    todo_text = parent_todo.text.lower()
-    
-    # Define mock subtask templates based on common todo patterns
-    subtask_templates = {
-        'project': [
-            "Research and gather requirements",
-            "Create project plan and timeline", 
-            "Set up development environment",
-            "Implement core functionality",
-            "Test and debug",
-            "Document the project",
-            "Deploy and launch"
-        ],
-        'meeting': [
-            "Prepare agenda",
-            "Send calendar invites",
-            "Book meeting room",
-            "Prepare presentation materials",
-            "Follow up with attendees",
-            "Document meeting notes"
-        ],
-        'travel': [
-            "Book flights",
-            "Reserve accommodation", 
-            "Plan itinerary",
-            "Pack luggage",
-            "Check travel documents",
-            "Arrange transportation"
-        ],
-        'shopping': [
-            "Make shopping list",
-            "Compare prices online",
-            "Check store hours",
-            "Visit stores",
-            "Compare products",
-            "Make purchase"
-        ],
-        'study': [
-            "Gather study materials",
-            "Create study schedule",
-            "Review notes",
-            "Practice exercises",
-            "Take practice tests",
-            "Review weak areas"
-        ],
-        'cooking': [
-            "Plan menu",
-            "Make grocery list",
-            "Buy ingredients",
-            "Prep ingredients",
-            "Cook meal",
-            "Clean up"
-        ],
-        'exercise': [
-            "Plan workout routine",
-            "Warm up",
-            "Cardio exercise",
-            "Strength training",
-            "Cool down and stretch",
-            "Track progress"
-        ]
-    }
-    
-    # Default generic subtasks
-    generic_subtasks = [
-        "Break down into smaller steps",
-        "Research and gather information",
-        "Create action plan",
-        "Execute first phase",
-        "Review and adjust approach",
-        "Complete final steps",
-        "Review and finalize"
+def _insert_todos(db: Session, rows: List[dict], *columns) -> list:
+    """Insert ``rows`` with multi-row INSERT ... RETURNING id and ``columns``, in row order.
+
+    RETURNING order is unspecified, and asking SQLAlchemy to keep it
+    (sort_by_parameter_order) makes it send one INSERT per row on SQLite. The
+    rows of one INSERT are numbered in VALUES order, so sorting the ids
+    restores it.
+    """
+    return sorted(db.execute(insert(Todo).returning(Todo.id, *columns), rows).all())
+
+def apply_batch(
+    db: Session,
+    operations: List[tuple],
+    atomic: bool = False
+) -> Dict[int, dict]:
+    """Apply (index, operation) pairs of create/update/toggle/delete in one transaction.
+
+    Every operation is validated against one recursive lookup of the
+    referenced todos and their ancestors before anything is written; the writes are then one executemany INSERT,
+    one executemany UPDATE and one subtree DELETE. Returns a result per index.
+    With ``atomic`` a single invalid operation means nothing is written.
+    """
+    results: Dict[int, dict] = {}
+    referenced = set()
+    for _, operation in operations:
+        if operation.op != "create":
+            referenced.add(operation.id)
+        if operation.op in ("create", "update") and operation.data.parent_id:
+            referenced.add(operation.data.parent_id)
+    # Parent of each todo as of the operations validated so far
+    parents = parent_map(db, list(referenced))
+    original_parents = dict(parents)
+    deleted = set()
+    creates: List[tuple] = []
+    changes: Dict[int, dict] = {}
+    moved = set()
+    # (todo, new parent) for every parent change, in operation order
+    path_moves: List[tuple] = []
+    delete_ids: List[int] = []
+
+    def gone(todo_id):
+        """Missing, or deleted (directly or with an ancestor) earlier in the batch"""
+        return todo_id not in parents or not deleted.isdisjoint(_lineage(parents, todo_id))
+
+    def fail(index, operation, error):
+        results[index] = {"index": index, "op": operation.op, "ok": False, "error": error}
+
+    for index, operation in operations:
+        if operation.op == "create":
+            values = operation.data.model_dump()
+            if values["parent_id"] and gone(values["parent_id"]):
+                fail(index, operation, "Parent todo not found")
+                continue
+            creates.append((index, values))
+            continue
+
+        todo_id = operation.id
+        if gone(todo_id):
+            fail(index, operation, "Todo not found")
+            continue
+
+        if operation.op == "delete":
+            deleted.add(todo_id)
+            delete_ids.append(todo_id)
+            results[index] = {"index": index, "op": "delete", "ok": True, "id": todo_id}
+            continue
+
+        if operation.op == "toggle":
+            values = {"completed": operation.completed}
+        else:
+            values = operation.data.model_dump(exclude_unset=True)
+            parent_id = values.get("parent_id")
+            if parent_id is not None:
+                if gone(parent_id):
+                    fail(index, operation, "Parent todo not found")
+                    continue
+                if todo_id in _lineage(parents, parent_id):
+                    fail(index, operation, "Cannot move todo to its own descendant")
+                    continue
+            if "parent_id" in values:
+                if parent_id != parents[todo_id]:
+                    path_moves.append((todo_id, parent_id))
+                parents[todo_id] = parent_id
+                if parent_id != original_parents[todo_id]:
+                    moved.add(todo_id)
+        changes.setdefault(todo_id, {}).update(values)
+        results[index] = {"index": index, "op": operation.op, "ok": True, "id": todo_id}
+
+    if atomic and any(not result["ok"] for result in results.values()):
+        for index, values in creates:
+            results[index] = {"index": index, "op": "create", "ok": True}
+        for result in results.values():
+            if result["ok"]:
+                result.update(ok=False, error="Not applied: batch rolled back")
+        return results
+
+    # One data version for the whole batch, however many kinds of change it logs
+    version = bump_data_version(db) if creates or changes or delete_ids else None
+
+    if creates:
+        created_ids = [row.id for row in _insert_todos(db, [values for _, values in creates])]
+        for (index, _), todo_id in zip(creates, created_ids):
+            results[index] = {"index": index, "op": "create", "ok": True, "id": todo_id}
+        _set_paths(db, created_ids)
+        _count_todos(db, Todo.id.in_(created_ids), 1)
+        record_change(db, "insert", created_ids, version)
+
+    if changes:
+        changed = Todo.id.in_(list(changes))
+        _count_todos(db, changed, -1)
+        # In operation order: each move was validated against the tree the earlier
+        # ones left, and _move_path reads the paths they wrote
+        for todo_id, parent_id in path_moves:
+            _move_path(db, todo_id, parent_id)
+        db.execute(update(Todo), [{"id": todo_id, **values} for todo_id, values in changes.items()])
+        _count_todos(db, changed, 1)
+        updated = [todo_id for todo_id in changes if todo_id not in moved]
+        if updated:
+            record_change(db, "update", updated, version)
+        if moved:
+            record_change(db, "move", list(moved), version)
+
+    if delete_ids:
+        delete_subtrees(db, delete_ids, version)
+
+    db.commit()
+
+    # One query for the final state of every created or changed todo
+    written = [result["id"] for result in results.values() if result["ok"] and result["op"] != "delete"]
+    if written:
+        todos = {
+            todo.id: todo
+            for todo in db.query(Todo).filter(Todo.id.in_(written)).populate_existing()
+        }
+        for result in results.values():
+            if result["ok"] and result["op"] != "delete":
+                result["todo"] = todos.get(result["id"])
+    return results
+
+# Mock AI subtask templates by category
+AI_SUBTASK_TEMPLATES = {
+    'project': [
+        "Research and gather requirements",
+        "Create project plan and timeline", 
+        "Set up development environment",
+        "Implement core functionality",
+        "Test and debug",
+        "Document the project",
+        "Deploy and launch"
+    ],
+    'meeting': [
+        "Prepare agenda",
+        "Send calendar invites",
+        "Book meeting room",
+        "Prepare presentation materials",
+        "Follow up with attendees",
+        "Document meeting notes"
+    ],
+    'travel': [
+        "Book flights",
+        "Reserve accommodation", 
+        "Plan itinerary",
+        "Pack luggage",
+        "Check travel documents",
+        "Arrange transportation"
+    ],
+    'shopping': [
+        "Make shopping list",
+        "Compare prices online",
+        "Check store hours",
+        "Visit stores",
+        "Compare products",
+        "Make purchase"
+    ],
+    'study': [
+        "Gather study materials",
+        "Create study schedule",
+        "Review notes",
+        "Practice exercises",
+        "Take practice tests",
+        "Review weak areas"
+    ],
+    'cooking': [
+        "Plan menu",
+        "Make grocery list",
+        "Buy ingredients",
+        "Prep ingredients",
+        "Cook meal",
+        "Clean up"
+    ],
+    'exercise': [
+        "Plan workout routine",
+        "Warm up",
+        "Cardio exercise",
+        "Strength training",
+        "Cool down and stretch",
+        "Track progress"
     ]
-    
-    # Determine which template to use based on keywords
-    selected_subtasks = generic_subtasks
-    for category, subtasks in subtask_templates.items():
-        if any(keyword in todo_text for keyword in [category, category[:-1] if category.endswith('ing') else category + 'ing']):
-            selected_subtasks = subtasks
-            break
-    
-    # Additional keyword matching
-    if any(word in todo_text for word in ['plan', 'organize', 'prepare']):
-        selected_subtasks = subtask_templates['project']
-    elif any(word in todo_text for word in ['buy', 'purchase', 'get']):
-        selected_subtasks = subtask_templates['shopping']
-    elif any(word in todo_text for word in ['learn', 'study', 'read']):
-        selected_subtasks = subtask_templates['study']
-    elif any(word in todo_text for word in ['workout', 'gym', 'fitness']):
-        selected_subtasks = subtask_templates['exercise']
-    
-    # Limit to max_subtasks and create todo objects
-    import random
-    selected_subtasks = selected_subtasks[:max_subtasks]
-    if len(selected_subtasks) > max_subtasks:
-        selected_subtasks = random.sample(selected_subtasks, max_subtasks)
-    
-    created_subtasks = []
-    for i, subtask_text in enumerate(selected_subtasks):
+}
+
+# Default generic subtasks
+AI_GENERIC_SUBTASKS = [
+    "Break down into smaller steps",
+    "Research and gather information",
+    "Create action plan",
+    "Execute first phase",
+    "Review and adjust approach",
+    "Complete final steps",
+    "Review and finalize"
+]
+
+# (keywords, template) rules, highest priority first: action words beat
+# category names (with their -ing form), and earlier rules beat later ones
+AI_KEYWORD_RULES = [
+    (('plan', 'organize', 'prepare'), 'project'),
+    (('buy', 'purchase', 'get'), 'shopping'),
+    (('learn', 'study', 'read'), 'study'),
+    (('workout', 'gym', 'fitness'), 'exercise'),
+    *(
+        ((category, category[:-1] if category.endswith('ing') else category + 'ing'), category)
+        for category in AI_SUBTASK_TEMPLATES
+    ),
+]
+
+# Keyword -> index of the first rule listing it (later rules are applied first, then overwritten)
+_AI_KEYWORD_RULE = {
+    keyword: rule
+    for rule, (keywords, _) in reversed(list(enumerate(AI_KEYWORD_RULES)))
+    for keyword in keywords
+}
+# A keyword containing another keyword of the same or an earlier rule never decides the
+# match (e.g. "projecting" always also matches "project"), so the matcher leaves it out
+_AI_KEYWORD_RULE = {
+    keyword: rule for keyword, rule in _AI_KEYWORD_RULE.items()
+    if not any(other != keyword and other in keyword and _AI_KEYWORD_RULE[other] <= rule
+               for other in _AI_KEYWORD_RULE)
+}
+
+def _trie_regex(words) -> str:
+    """An alternation of ``words`` shaped as a prefix trie, so each position follows one branch"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        alternation = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A word ending here: prefer it over longer ones
+        return f"(?:{alternation})??" if "" in node else alternation
+
+    return build(trie)
+
+# Every keyword occurrence in one pass; the lookahead tries every position, so
+# overlapping keywords ("gymeeting") are all seen
+_AI_KEYWORD_PATTERN = re.compile(f"(?=({_trie_regex(_AI_KEYWORD_RULE)}))")
+
+def ai_subtask_template(text: str) -> List[str]:
+    """Subtask texts for a todo, from the highest-priority keyword (a substring) in ``text``"""
+    rules = [_AI_KEYWORD_RULE[keyword] for keyword in _AI_KEYWORD_PATTERN.findall(text.lower())]
+    if not rules:
+        return AI_GENERIC_SUBTASKS
+    return AI_SUBTASK_TEMPLATES[AI_KEYWORD_RULES[min(rules)][1]]
+
+def generate_ai_subtasks_batch(
+    db: Session,
+    parent_todo_ids: List[int],
+    max_subtasks: int = 5
+) -> List[tuple]:
+    """Generate AI subtasks for many parent todos in one transaction (mock implementation).
+
+    Returns (parent, subtasks) for each parent that exists, in request order.
+    All subtasks are written with one INSERT ... RETURNING; the returned
+    subtasks are built from the inserted values, so nothing is re-read.
+    """
+    parent_todo_ids = list(dict.fromkeys(parent_todo_ids))
+    found = {todo.id: todo for todo in db.query(Todo).filter(Todo.id.in_(parent_todo_ids))}
+    parents = [found[todo_id] for todo_id in parent_todo_ids if todo_id in found]
+
+    rows = [
+        {
+            "text": subtask_text,
+            "completed": False,
+            "priority": parent.priority,  # Inherit priority from parent
+            "parent_id": parent.id,
+            "user_id": parent.user_id,
+        }
+        for parent in parents
+        for subtask_text in ai_subtask_template(parent.text)[:max_subtasks]
+    ]
+    if not rows:
+        return [(parent, []) for parent in parents]
+
+    inserted = _insert_todos(db, rows, Todo.created_at, Todo.updated_at)
+    created_ids = [row.id for row in inserted]
+    _set_paths(db, created_ids)
+    _count_todos(db, Todo.id.in_(created_ids), 1)
+    record_change(db, "insert", created_ids)
+    db.commit()
+
+    created: Dict[int, List[Todo]] = {parent.id: [] for parent in parents}
+    for values, (todo_id, created_at, updated_at) in zip(rows, inserted):
+        parent = found[values["parent_id"]]
         subtask = Todo(
-            text=subtask_text,
-            completed=False,
-            priority=parent_todo.priority,  # Inherit priority from parent
-            parent_id=parent_todo_id,
-            user_id=parent_todo.user_id
+            id=todo_id,
+            due_date=None,
+            # As _set_paths wrote them
+            path=f"{parent.path or '/'}{todo_id}/",
+            depth=(parent.depth or 0) + 1,
+            created_at=created_at,
+            updated_at=updated_at,
+            **values
         )
-        db.add(subtask)
-        created_subtasks.append(subtask)
-    
-    db.commit()
-    
-    # Refresh all created subtasks
-    for subtask in created_subtasks:
-        db.refresh(subtask)
-    
-    return created_subtasks
\ No newline at end of file
+        set_committed_value(subtask, "children_count", 0)
+        created[parent.id].append(subtask)
+    return [(parent, created[parent.id]) for parent in parents]
+
+def generate_ai_subtasks(db: Session, parent_todo_id: int, max_subtasks: int = 5) -> List[Todo]:
+    """Generate AI subtasks for a given parent todo (mock implementation)"""
+    generated = generate_ai_subtasks_batch(db, [parent_todo_id], max_subtasks)
+    return generated[0][1] if generated else []
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
@@ -8,17 +11,96 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./todos.db")
 
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Per-connection SQLite settings. WAL lets readers run alongside the single
+# writer; busy_timeout makes a blocked writer wait instead of failing with
+# "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 268435456)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def apply_sqlite_pragmas(target_engine, read_only: bool = False):
+    """Set SQLITE_PRAGMAS on every new connection of ``target_engine``"""
+    pragmas = dict(SQLITE_PRAGMAS)
+    if read_only:
+        # journal_mode is a persistent write; readers only guard against writes
+        pragmas.pop("journal_mode")
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(target_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
 # SQLite specific configuration
-if DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE:
     engine = create_engine(
         DATABASE_URL, 
         connect_args={"check_same_thread": False}  # SQLite specific
     )
+    apply_sqlite_pragmas(engine)
 else:
     engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async driver for the same database, used by the API routers
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def _async_url(url: str) -> str:
+    """Swap the sync driver in a DATABASE_URL for its async counterpart"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"No async driver is known for {dialect} databases (supported: {', '.join(ASYNC_DRIVERS)}); "
+            "set ASYNC_DATABASE_URL to a URL with an installed async driver"
+        )
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL", ASYNC_DATABASE_URL)
+
+# SQLite has a single writer: one pooled write connection queues writers in
+# the pool (without blocking the event loop) instead of on the file lock.
+# aiosqlite would otherwise default to NullPool and reconnect on every request.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=int(os.getenv("DB_POOL_SIZE", 1 if IS_SQLITE else 5)),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 0 if IS_SQLITE else 10)),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+)
+
+# Read-only routes get their own pool so they never queue behind writers
+async_read_engine = create_async_engine(
+    ASYNC_READ_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=int(os.getenv("DB_READ_POOL_SIZE", 8)),
+    max_overflow=int(os.getenv("DB_READ_MAX_OVERFLOW", 8)),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+)
+
+if IS_SQLITE:
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    apply_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
+# expire_on_commit=False: attributes must stay loaded once the greenlet exits
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,6 +111,78 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Dependency to get an async session on the read-only pool"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+# Set by create_tables() once the FTS5 index over todos.text is in place
+FTS_ENABLED = False
+
+# External-content FTS5 index over todos.text, kept in sync by triggers
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        text, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF text ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO todos_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+def create_search_index():
+    """Create the FTS5 search index (SQLite only); returns False if unavailable"""
+    if not IS_SQLITE:
+        return False
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'"
+            )).first()
+            for statement in FTS_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Index rows that were written before the index existed
+                conn.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+    except OperationalError as e:
+        print(f"FTS5 unavailable, falling back to LIKE search: {e}")
+        return False
+    return True
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Revision matching the schema create_all produced before migrations existed
+LEGACY_REVISION = "0001"
+
+def run_migrations():
+    """Upgrade the database to the latest Alembic revision"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "todos" in tables and "alembic_version" not in tables:
+            # Adopt databases created by create_all before migrations existed
+            command.stamp(config, LEGACY_REVISION)
+        command.upgrade(config, "head")
+
 def create_tables():
-    """Create all tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Bring the schema up to date and set up the search index"""
+    global FTS_ENABLED
+    run_migrations()
+    FTS_ENABLED = create_search_index()
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""Background jobs for long-running todo operations.
+
+A route submits a job with ``enqueue`` and answers with its id at once, so
+its latency does not grow with the size of the operation. The job is a row
+in the ``jobs`` table: it outlives the request and can be polled from any
+worker process with ``GET /api/jobs/{id}``. Each process runs a pool of
+JOB_WORKERS threads that claim queued jobs oldest first and run the handler
+registered for their kind with ``@handler(kind)``.
+
+A handler is ``fn(db, params, progress) -> result``. It gets its own sync
+session and the JSON params the job was submitted with. ``progress(done,
+total)`` stages the job's progress in that session, so it is committed with
+the handler's next commit, in the same transaction as the work it counts.
+The return value becomes the job's JSON result; an exception fails the job,
+with a ValueError's message as its error.
+
+SQLite has a single writer, so one worker per process is the default: more
+would only queue on the write lock. The running jobs of a process that died
+are failed when a process on the same host starts (``fail_interrupted_jobs``),
+and finished jobs are deleted after JOB_RETENTION_SECONDS.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic_core import to_json
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process; 0 only queues, for processes that leave jobs to others
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+# Seconds an idle worker sleeps before looking for jobs queued by another process
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+# Finished jobs are kept this long for clients to collect their result
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 86400))
+# Seconds shutdown waits for running jobs before leaving them to fail_interrupted_jobs
+JOB_SHUTDOWN_TIMEOUT = float(os.getenv("JOB_SHUTDOWN_TIMEOUT", 10))
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+Handler = Callable[[Session, dict, Callable[..., None]], Any]
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handler(kind: str):
+    """Register the decorated function as the handler of ``kind`` jobs"""
+    def register(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_dict(job: Job) -> dict:
+    """A job as ``schemas.JobResponse`` would serialize it"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "result": json.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+async def enqueue(db: AsyncSession, kind: str, params: dict) -> Job:
+    """Queue a ``kind`` job and wake a worker; returns the committed job"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, status="queued", params=to_json(params).decode(), progress=0)
+    db.add(job)
+    await db.commit()
+    pool.wake()
+    return job
+
+
+def claim_job(db: Session) -> Optional[Job]:
+    """Mark the oldest queued job as running in this process and return it"""
+    oldest = select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(1).scalar_subquery()
+    # status is checked again: another process may claim the same job first
+    job_id = db.execute(
+        update(Job)
+        .where(Job.id == oldest, Job.status == "queued")
+        .values(status="running", worker=worker_id(), started_at=func.now())
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return db.get(Job, job_id) if job_id is not None else None
+
+
+def run_job(db: Session, job: Job) -> None:
+    """Run a claimed job's handler and record its outcome"""
+    job_id, kind, params = job.id, job.kind, json.loads(job.params)
+
+    def progress(done: int, total: Optional[int] = None) -> None:
+        values = {"progress": done} if total is None else {"progress": done, "total": total}
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    fn = HANDLERS.get(kind)
+    try:
+        if fn is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result = to_json(fn(db, params, progress)).decode()
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, ValueError):
+            error = str(e)
+        else:
+            logger.exception("Job %s (%s) failed", job_id, kind)
+            error = f"{type(e).__name__}: {e}"
+        _finish(db, job_id, status="failed", error=error)
+    else:
+        _finish(
+            db, job_id, status="succeeded", result=result,
+            progress=func.coalesce(Job.total, Job.progress)
+        )
+
+
+def _finish(db: Session, job_id: int, **values) -> None:
+    db.execute(update(Job).where(Job.id == job_id).values(finished_at=func.now(), **values))
+    prune_jobs(db)
+    db.commit()
+
+
+def prune_jobs(db: Session) -> int:
+    """Delete jobs that finished more than JOB_RETENTION_SECONDS ago (no commit)"""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=JOB_RETENTION_SECONDS)
+    return db.query(Job).filter(
+        Job.status.in_(("succeeded", "failed")),
+        Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        # Our pid on a job we have not started yet: a previous process had it
+        return False
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; assume it lives
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail_interrupted_jobs(db: Session) -> int:
+    """Fail running jobs whose process on this host has exited; returns how many.
+
+    Such a job may have committed part of its work (handlers that commit in
+    chunks), so it is failed rather than run again.
+    """
+    host = socket.gethostname()
+    interrupted = []
+    for job_id, worker in db.query(Job.id, Job.worker).filter(Job.status == "running"):
+        worker_host, _, pid = (worker or "").rpartition(":")
+        if worker_host == host and pid.isdigit() and not _process_alive(int(pid)):
+            interrupted.append(job_id)
+    if interrupted:
+        db.query(Job).filter(Job.id.in_(interrupted)).update({
+            Job.status: "failed",
+            Job.error: "Interrupted: the process running it exited",
+            Job.finished_at: func.now(),
+        }, synchronize_session=False)
+    db.commit()
+    return len(interrupted)
+
+
+def run_next() -> bool:
+    """Claim and run the oldest queued job, if any; returns whether one ran"""
+    # As in the API's sessions: what a handler loaded stays loaded across its commits
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        job = claim_job(db)
+        if job is None:
+            return False
+        run_job(db, job)
+        return True
+    finally:
+        db.close()
+
+
+class JobPool:
+    """Threads that run queued jobs, woken on enqueue or every JOB_POLL_INTERVAL"""
+
+    def __init__(self, size: int = JOB_WORKERS):
+        self.size = size
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping.clear()
+        for n in range(self.size):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs and wait up to ``timeout`` for running ones"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        """Have an idle worker look for jobs now; safe to call from any thread"""
+        self._wakeup.set()
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            # Cleared before looking, so a job queued after the look still wakes us
+            self._wakeup.clear()
+            try:
+                ran = run_next()
+            except Exception:
+                logger.exception("Job worker error")
+                ran = False
+            if not ran:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+
+
+pool = JobPool()
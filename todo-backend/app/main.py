@@ -1,10 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import os
 from dotenv import load_dotenv
-from app.database import create_tables
-from app.routers import todos, maintain_db
+from app.database import create_tables, SessionLocal
+from app.routers import todos, maintain_db, jobs as jobs_router
+from app import admission, crud, jobs, metrics, profiling
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +19,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Innermost, so shed responses still get CORS headers and show up in the metrics
+if admission.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+
 # CORS middleware
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
@@ -26,11 +31,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
+    expose_headers=[todos.NEXT_CURSOR_HEADER, "ETag", profiling.PROFILE_ID_HEADER, "Retry-After"],
 )
 
+# Inside the metrics middleware, so a capture can report the request's SQL statistics
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware, token=maintain_db.ADMIN_TOKEN)
+
+# Outermost, so its timings include CORS and it sees every final status
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(todos.router)
 app.include_router(maintain_db.router)
+app.include_router(jobs_router.router)
 
 # Global exception handler
 @app.exception_handler(HTTPException)
@@ -53,6 +68,26 @@ async def startup_event():
     """Create database tables on startup"""
     create_tables()
     print("Database tables created successfully")
+    if crud.STATS_COUNTERS_ENABLED:
+        db = SessionLocal()
+        try:
+            crud.rebuild_todo_counters(db)
+        finally:
+            db.close()
+        print("Todo counters rebuilt")
+    db = SessionLocal()
+    try:
+        interrupted = jobs.fail_interrupted_jobs(db)
+    finally:
+        db.close()
+    if interrupted:
+        print(f"Marked {interrupted} interrupted background jobs as failed")
+    jobs.pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background job workers; a job still running is failed on the next start"""
+    jobs.pool.stop(timeout=jobs.JOB_SHUTDOWN_TIMEOUT)
 
 # Health check endpoint
 @app.get("/health")
@@ -60,6 +95,12 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Todo API is running"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request latency, status and per-request SQL metrics in Prometheus format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Root endpoint
 @app.get("/")
 async def root():
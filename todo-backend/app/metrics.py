@@ -0,0 +1,244 @@
+"""Request metrics and per-request SQL instrumentation.
+
+``MetricsMiddleware`` times every HTTP request and, through SQLAlchemy cursor
+events on every engine, counts the queries the request issues and the time
+spent in them, whether they run on the event loop (async sessions), in a
+greenlet (``run_sync``) or on the threadpool. Totals are kept per route
+template (``/api/todos/{todo_id}``, not the raw path) and served in the
+Prometheus text format on ``/metrics``. They are per process, like
+``app.changes``: scrape each worker.
+
+With QUERY_BUDGET set, a request that issues more queries than that is
+reported, which catches N+1 loads (a lazy load per row) in development and
+tests: QUERY_BUDGET_ACTION=warn logs it when the request ends, raise fails
+the query that went over, so the traceback points at the loop issuing it.
+"""
+
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+# Queries one request may issue before it is reported; 0 turns the check off
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 0))
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "warn")  # warn or raise
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Route label for requests no route matched (404s), so paths stay out of the labels
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A request issued more queries than QUERY_BUDGET allows"""
+
+
+@dataclass
+class QueryStats:
+    """Queries issued inside one ``track_queries`` block"""
+    label: str
+    budget: int
+    action: str
+    queries: int = 0
+    seconds: float = 0.0
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(
+    label: str,
+    budget: Optional[int] = None,
+    action: Optional[str] = None
+) -> Iterator[QueryStats]:
+    """Count the queries issued inside the block, checked against ``budget``.
+
+    Blocks nest: an inner block counts its own queries and they are not
+    added to the outer one.
+    """
+    stats = QueryStats(
+        label,
+        QUERY_BUDGET if budget is None else budget,
+        action or QUERY_BUDGET_ACTION,
+    )
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    if stats.budget and stats.queries > stats.budget and stats.action != "raise":
+        logger.warning(
+            "Possible N+1: %s issued %d queries (budget %d)", label, stats.queries, stats.budget
+        )
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """The innermost ``track_queries`` block running in this context, if any"""
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    if stats.budget and stats.action == "raise" and stats.queries > stats.budget:
+        raise QueryBudgetExceeded(
+            f"{stats.label} issued more than {stats.budget} queries; "
+            f"query {stats.queries}: {' '.join(statement.split())[:200]}"
+        )
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.seconds += time.perf_counter() - started
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name, self.help, self.label_names = name, help_text, label_names
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name, self.help, self.label_names, self.buckets = name, help_text, label_names, buckets
+        # Per label set: count per bucket (the last is +Inf), sum of observations
+        self.values: Dict[Tuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        counts, total = self.values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = (*self.label_names, "le")
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(names, (*labels, le))} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {total[0]:g}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+REQUEST_LABELS = ("method", "route")
+
+requests_total = Counter(
+    "http_requests_total", "Requests by route and response status", (*REQUEST_LABELS, "status")
+)
+request_exceptions_total = Counter(
+    "http_request_exceptions_total", "Requests that ended in an unhandled exception",
+    (*REQUEST_LABELS, "exception")
+)
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to send the whole response", REQUEST_LABELS, LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements issued per request", REQUEST_LABELS, QUERY_COUNT_BUCKETS
+)
+request_query_duration = Histogram(
+    "http_request_db_query_duration_seconds", "Time spent executing SQL per request",
+    REQUEST_LABELS, LATENCY_BUCKETS
+)
+
+# Recorded by app.admission
+requests_shed_total = Counter(
+    "http_requests_shed_total", "Requests rejected by admission control, by request class and reason",
+    ("class", "reason")
+)
+admission_wait = Histogram(
+    "http_request_admission_wait_seconds", "Time spent waiting for an admission slot", ("class",),
+    LATENCY_BUCKETS
+)
+
+METRICS = (
+    requests_total, request_exceptions_total, request_duration, request_queries, request_query_duration,
+    requests_shed_total, admission_wait,
+)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def route_label(scope: dict) -> str:
+    """The matched route's path template, set on the scope by routing"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Record latency, status and SQL statistics of every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        start = time.perf_counter()
+        with track_queries(f"{method} {scope['path']}") as stats:
+            try:
+                await self.app(scope, receive, send_with_status)
+            except Exception as e:
+                request_exceptions_total.inc((method, route_label(scope), type(e).__name__))
+                raise
+            finally:
+                labels = (method, route_label(scope))
+                requests_total.inc((*labels, status))
+                request_duration.observe(labels, time.perf_counter() - start)
+                request_queries.observe(labels, stats.queries)
+                request_query_duration.observe(labels, stats.seconds)
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, select
+from sqlalchemy.orm import relationship, column_property, aliased, query_expression
+from sqlalchemy.sql import func, table, column
 from app.database import Base
 
 class Todo(Base):
     __tablename__ = "todos"
+    # Keep in sync with alembic/versions/0003_access_path_indexes.py, 0006_todo_paths.py
+    # and 0007_due_date_index.py
+    __table_args__ = (
+        Index("ix_todos_path", "path"),
+        Index("ix_todos_parent_id_completed", "parent_id", "completed"),
+        Index("ix_todos_user_id_parent_id", "user_id", "parent_id"),
+        Index("ix_todos_completed_due_date_priority", "completed", "due_date", "priority"),
+        Index("ix_todos_parent_id_due_date_completed_priority", "parent_id", "due_date", "completed", "priority"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text, nullable=False)
@@ -13,6 +22,10 @@ class Todo(Base):
     priority = Column(String(10), default="medium", nullable=False)
     parent_id = Column(Integer, ForeignKey("todos.id"), nullable=True)
     user_id = Column(Integer, nullable=True)  # For future user support
+    # Materialized path of ids from the root down, e.g. "/1/5/9/" for todo 9
+    # under 5 under 1; maintained by crud on create and move
+    path = Column(Text, nullable=True)
+    depth = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -20,5 +33,112 @@ class Todo(Base):
     parent = relationship("Todo", remote_side=[id], back_populates="children")
     children = relationship("Todo", back_populates="parent", cascade="all, delete-orphan")
 
+    # Search-only values, populated by crud.search_todos
+    snippet = query_expression()
+    rank = query_expression()
+
+    # Descendant rollup, populated by crud when a tree is loaded
+    descendants_total = query_expression()
+    descendants_completed = query_expression()
+
+    def __repr__(self):
+        return f"<Todo(id={self.id}, text='{self.text}', completed={self.completed})>"
+
+# FTS5 index over todos.text; created by database.create_search_index, not by the ORM
+todos_fts = table("todos_fts", column("rowid"), column("text"))
+
+class DataVersion(Base):
+    """Single-row, monotonically increasing version of the todo data (used for ETags)"""
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
     def __repr__(self):
-        return f"<Todo(id={self.id}, text='{self.text}', completed={self.completed})>"
\ No newline at end of file
+        return f"<DataVersion(version={self.version})>"
+
+class TodoChange(Base):
+    """Append-only log of todo writes, read by the /changes delta feed"""
+    __tablename__ = "todo_changes"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    op = Column(String(10), nullable=False)  # insert, update, move or delete
+    todo_id = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<TodoChange(version={self.version}, op='{self.op}', todo_id={self.todo_id})>"
+
+class TodoCounter(Base):
+    """Materialized per-user todo counters, kept in step with every write"""
+    __tablename__ = "todo_counters"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=True, unique=True)
+    total = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+    low = Column(Integer, default=0, nullable=False)
+    medium = Column(Integer, default=0, nullable=False)
+    high = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<TodoCounter(user_id={self.user_id}, total={self.total}, completed={self.completed})>"
+
+class Job(Base):
+    """A long-running operation run in the background by app.jobs; clients poll it by id"""
+    __tablename__ = "jobs"
+    # Keep in sync with alembic/versions/0008_jobs.py
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(30), nullable=False)
+    status = Column(String(10), default="queued", nullable=False)  # queued, running, succeeded or failed
+    params = Column(Text, nullable=False)  # JSON
+    result = Column(Text, nullable=True)  # JSON, once succeeded
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, nullable=True)
+    # host:pid of the process running it, so a dead worker's jobs can be found
+    worker = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
+
+class TodoImportRow(Base):
+    """A row of an /import in progress, staged chunk by chunk until crud.finish_import publishes it"""
+    __tablename__ = "todo_import_rows"
+    # Keep in sync with alembic/versions/0009_todo_import_rows.py
+    __table_args__ = (
+        Index("ix_todo_import_rows_staged_at", "staged_at"),
+    )
+
+    # The primary key also rejects an id repeated within one import
+    import_id = Column(String(32), primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    parent_id = Column(Integer, nullable=True)
+    text = Column(Text, nullable=False)
+    completed = Column(Boolean, nullable=False)
+    priority = Column(String(10), nullable=False)
+    due_date = Column(DateTime, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    staged_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<TodoImportRow(import_id='{self.import_id}', id={self.id})>"
+
+# Number of direct children, loaded as a correlated scalar in the same SELECT as
+# the todo itself so flat listings never touch the children relationship.
+_Child = aliased(Todo)
+Todo.children_count = column_property(
+    select(func.count(_Child.id))
+    .where(_Child.parent_id == Todo.id)
+    .correlate_except(_Child)
+    .scalar_subquery()
+)
@@ -0,0 +1,184 @@
+"""Opt-in cProfile capture of single requests.
+
+``ProfilingMiddleware`` profiles a request when it carries the admin token in
+the ``X-Profile`` header, or when it falls in the PROFILE_SAMPLE_RATE sample.
+The profile is written in pstats format to a ring buffer of the last
+PROFILE_KEEP captures in PROFILE_DIR, together with the request's route,
+status, duration and SQL statistics (from ``app.metrics``), and its id is
+returned in the ``X-Profile-Id`` response header. The admin router lists and
+serves the captures.
+
+The middleware is only installed when PROFILING_ENABLED is set, so a
+deployment that does not use it pays nothing per request.
+
+cProfile is interpreter-wide: one request is profiled at a time (others are
+not captured while it runs), threadpool work shows up in it, and so does any
+other request the event loop interleaves with it.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+# Fraction of requests profiled without the header, e.g. 0.001; 0 profiles only on request
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "todo-profiles"))
+# Captures kept on disk; the oldest is deleted when a new one would exceed this
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}T\d{6}-\d{6}-[0-9a-f]{6}$")
+
+# cProfile allows one active profiler per interpreter
+_profiler_lock = threading.Lock()
+
+
+def _profile_path(profile_id: str, suffix: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}{suffix}")
+
+
+def new_profile_id() -> str:
+    """Time-ordered id, so sorting ids sorts captures oldest first"""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S-%f')}-{random.getrandbits(24):06x}"
+
+
+def save_profile(profile_id: str, profiler: cProfile.Profile, info: dict) -> None:
+    """Write a capture and drop the oldest ones beyond PROFILE_KEEP"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(_profile_path(profile_id, ".prof"))
+    # Metadata last: a capture is only listed once both files exist
+    tmp = _profile_path(profile_id, ".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(info, f)
+    os.replace(tmp, _profile_path(profile_id, ".json"))
+
+    for old in list_profile_ids()[:-max(PROFILE_KEEP, 1)]:
+        delete_profile(old)
+
+
+def list_profile_ids() -> List[str]:
+    """Ids of the stored captures, oldest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted(
+        name[:-len(".json")] for name in os.listdir(PROFILE_DIR)
+        if name.endswith(".json") and PROFILE_ID_PATTERN.match(name[:-len(".json")])
+    )
+
+
+def load_profile_info(profile_id: str) -> Optional[dict]:
+    """A capture's metadata, or None if there is no such capture"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id, ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def profile_stats_path(profile_id: str) -> Optional[str]:
+    """Path of a capture's pstats file, or None if there is no such capture"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = _profile_path(profile_id, ".prof")
+    return path if os.path.exists(path) else None
+
+
+def delete_profile(profile_id: str) -> None:
+    for suffix in (".json", ".prof"):
+        try:
+            os.remove(_profile_path(profile_id, suffix))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it with the admin token, or a random sample"""
+
+    def __init__(self, app, token: str, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+
+    def _wanted(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER.lower().encode()) == self.token:
+            return True
+        # Never sample event streams: the profiler would stay on for the whole connection
+        if b"text/event-stream" in headers.get(b"accept", b""):
+            return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            logger.info("Profiler busy; not profiling %s %s", scope["method"], scope["path"])
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode(), profile_id.encode()),
+                ]}
+            await send(message)
+
+        # SQL counted by the metrics middleware's block, or by our own if it is off
+        outer = metrics.current_query_stats()
+        tracking = nullcontext(outer) if outer else metrics.track_queries(scope["path"], budget=0)
+        profiler = cProfile.Profile()
+        try:
+            with tracking as stats:
+                queries_before, sql_before = stats.queries, stats.seconds
+                start = time.perf_counter()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    profiler.disable()
+                    duration = time.perf_counter() - start
+        finally:
+            _profiler_lock.release()
+            info = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": metrics.route_label(scope),
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+                "db_queries": stats.queries - queries_before,
+                "db_ms": round((stats.seconds - sql_before) * 1000, 3),
+                "captured_at": datetime.now().isoformat(),
+            }
+            try:
+                await run_in_threadpool(save_profile, profile_id, profiler, info)
+            except OSError as e:
+                logger.warning("Could not save profile %s: %s", profile_id, e)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_read_db
+from app import jobs, schemas
+from app.models import Job
+from app.serializers import TodoJSONResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+JOB_STATUS_PATTERN = f"^({'|'.join(jobs.JOB_STATUSES)})$"
+
+@router.get("/", response_model=List[schemas.JobResponse])
+async def list_jobs(
+    status: Optional[str] = Query(None, pattern=JOB_STATUS_PATTERN),
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Recent background jobs, newest first"""
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    result = await db.scalars(query)
+    return TodoJSONResponse([jobs.job_dict(job) for job in result])
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """A background job's status and progress, and its result once it has finished"""
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return TodoJSONResponse(jobs.job_dict(job))
@@ -1,13 +1,126 @@
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Body, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Body, Form, Query
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import os
 import base64
+import io
+import pstats
+import sqlite3
+import tempfile
+import zlib
+from app import crud, database, profiling
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 # 管理员 Token，可通过环境变量 ADMIN_TOKEN 设置，默认值更安全
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "YWRtaW4xMjM=")
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../todos.db"))
+# The file behind DATABASE_URL (relative paths resolve against the working directory, as in SQLite)
+DB_PATH = os.path.abspath(database.engine.url.database or "todos.db")
+
+# Bytes read, compressed and sent (or received and written) at a time
+DB_CHUNK_SIZE = 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def _require_sqlite():
+    if not database.IS_SQLITE:
+        raise HTTPException(status_code=400, detail="Backup and restore are only available for SQLite")
+
+def _snapshot(path: str) -> None:
+    """Write a consistent copy of the live database, WAL included, to ``path``"""
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(path)
+    try:
+        # All pages in one step: a single read transaction, so writers never tear it
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def _stream_snapshot(path: str, compress: bool):
+    """Yield the snapshot in chunks (gzip-compressed if asked), then delete it"""
+    try:
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        with open(path, "rb") as f:
+            while chunk := f.read(DB_CHUNK_SIZE):
+                yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        os.remove(path)
+
+def _spool_chunk(f, decompressor, chunk: bytes) -> None:
+    """Write one chunk of an upload, gunzipping it if the upload is compressed"""
+    f.write(decompressor.decompress(chunk) if decompressor else chunk)
+
+def _check_database(path: str) -> None:
+    """Raise ValueError unless ``path`` is an intact SQLite database with todos"""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            has_todos = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos'"
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Not a SQLite database: {e}")
+    if result != "ok":
+        raise ValueError(f"Integrity check failed: {result}")
+    if not has_todos:
+        raise ValueError("Database has no todos table")
+
+def _copy_into_live(path: str) -> None:
+    """Replace the live database's content with ``path`` in one atomic step.
+
+    The online backup API writes through SQLite's own locking and WAL, unlike
+    renaming a file over the live one, where a leftover -wal file would be
+    replayed onto the new database.
+    """
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(DB_PATH, timeout=database.SQLITE_PRAGMAS["busy_timeout"] / 1000)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+async def _drain_pools() -> None:
+    """Close every pooled connection so none outlives the old database content"""
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    database.engine.dispose()
+
+def _after_restore(old_version: int) -> None:
+    """Migrate the restored schema and rebuild everything derived from it"""
+    database.create_tables()
+    db = database.SessionLocal()
+    try:
+        crud.reset_data_version(db, old_version)
+        if crud.STATS_COUNTERS_ENABLED:
+            crud.rebuild_todo_counters(db)
+    finally:
+        db.close()
+
+def _data_version() -> int:
+    db = database.SessionLocal()
+    try:
+        return crud.get_data_version(db)
+    finally:
+        db.close()
+
+def _recent_profiles(limit: int) -> list:
+    """Metadata of the ``limit`` newest captures"""
+    ids = profiling.list_profile_ids()[-limit:]
+    profiles = [profiling.load_profile_info(profile_id) for profile_id in reversed(ids)]
+    return [info for info in profiles if info]
+
+def _profile_text(path: str, sort: str, limit: int) -> str:
+    """A pstats report of the ``limit`` top functions"""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
 
 @router.post("/verify")
 async def verify_password(payload: dict = Body(...)):
@@ -17,23 +130,96 @@ async def verify_password(payload: dict = Body(...)):
     return {"success": False, "message": "Incorrect token."}
 
 @router.get("/db")
-async def download_db(token: str):
+async def download_db(
+    token: str,
+    compress: bool = Query(False, description="gzip the snapshot while streaming it")
+):
     if token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid token")
+    _require_sqlite()
     if not os.path.exists(DB_PATH):
         raise HTTPException(status_code=404, detail="Database file not found")
-    return FileResponse(DB_PATH, filename="todos.db", media_type="application/octet-stream")
+
+    fd, snapshot = tempfile.mkstemp(prefix="todos-backup-", suffix=".db")
+    os.close(fd)
+    try:
+        await run_in_threadpool(_snapshot, snapshot)
+    except sqlite3.Error as e:
+        os.remove(snapshot)
+        raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
+
+    filename = "todos.db.gz" if compress else "todos.db"
+    return StreamingResponse(
+        _stream_snapshot(snapshot, compress),
+        media_type="application/gzip" if compress else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.post("/db")
 async def upload_db(token: str = Form(...), file: UploadFile = File(...)):
     if token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid token")
-    if file.content_type != "application/octet-stream":
+    _require_sqlite()
+    if file.content_type not in ("application/octet-stream", "application/gzip", "application/x-gzip"):
         raise HTTPException(status_code=400, detail="Invalid file type")
+
+    # Spooled to disk beside the database rather than read into RAM; the
+    # writes and the decompression run on the threadpool, off the event loop
+    fd, upload = await run_in_threadpool(
+        tempfile.mkstemp, prefix="todos-restore-", suffix=".db", dir=os.path.dirname(DB_PATH)
+    )
     try:
-        contents = await file.read()
-        with open(DB_PATH, "wb") as f:
-            f.write(contents)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        with os.fdopen(fd, "wb") as f:
+            chunk = await file.read(DB_CHUNK_SIZE)
+            decompressor = zlib.decompressobj(wbits=31) if chunk.startswith(GZIP_MAGIC) else None
+            try:
+                while chunk:
+                    await run_in_threadpool(_spool_chunk, f, decompressor, chunk)
+                    chunk = await file.read(DB_CHUNK_SIZE)
+                if decompressor:
+                    await run_in_threadpool(f.write, decompressor.flush())
+            except zlib.error as e:
+                raise HTTPException(status_code=400, detail=f"Invalid gzip data: {e}")
+
+        try:
+            await run_in_threadpool(_check_database, upload)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        old_version = await run_in_threadpool(_data_version)
+        await _drain_pools()
+        await run_in_threadpool(_copy_into_live, upload)
+        await run_in_threadpool(_after_restore, old_version)
+    except (OSError, sqlite3.Error) as e:
+        raise HTTPException(status_code=500, detail=f"Failed to restore database: {str(e)}")
+    finally:
+        await run_in_threadpool(os.remove, upload)
     return {"message": "Database uploaded successfully"}
+
+@router.get("/profiles")
+async def list_profiles(token: str, limit: int = Query(50, ge=1, le=1000)):
+    """Captured request profiles, newest first"""
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid token")
+    profiles = await run_in_threadpool(_recent_profiles, limit)
+    return {"enabled": profiling.PROFILING_ENABLED, "profiles": profiles}
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    token: str,
+    format: str = Query("prof", pattern="^(prof|text)$", description="pstats file or a printed report"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(50, ge=1, le=1000, description="Functions listed in the text report")
+):
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid token")
+    path = profiling.profile_stats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        info = await run_in_threadpool(profiling.load_profile_info, profile_id) or {}
+        header = "\n".join(f"{key}: {value}" for key, value in info.items())
+        report = await run_in_threadpool(_profile_text, path, sort, limit)
+        return PlainTextResponse(f"{header}\n{report}")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -1,278 +1,640 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from app.database import get_db
-from app import crud, schemas
+from datetime import datetime
+from itertools import islice
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+from app.database import AsyncReadSessionLocal, get_async_db, get_async_read_db
+from app import async_crud, crud, jobs, metrics, schemas
+from app.serializers import TodoJSONResponse, change_feed_dict, flat_dict, nested_dict, search_dict, todo_dict
+from app.changes import notifier
 from app.models import Todo
 
 router = APIRouter(prefix="/api/todos", tags=["todos"])
 
-def build_nested_response(todo: Todo) -> schemas.TodoNested:
-    """Convert Todo model to nested response schema"""
-    children = [build_nested_response(child) for child in todo.children]
-    return schemas.TodoNested(
-        id=todo.id,
-        text=todo.text,
-        completed=todo.completed,
-        due_date=todo.due_date,
-        priority=todo.priority,
-        parent_id=todo.parent_id,
-        user_id=todo.user_id,
-        created_at=todo.created_at,
-        updated_at=todo.updated_at,
-        children_count=len(children),
-        children=children
-    )
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Seconds between SSE keep-alives; also bounds how late changes committed by
+# another worker process are noticed
+CHANGE_STREAM_HEARTBEAT = 15
+
+# Largest batch accepted by POST /batch; one transaction holds the write lock
+BATCH_MAX_OPERATIONS = 1000
+
+# Rows per fetch when exporting and per executemany when importing
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_CHUNK_SIZE = 1000
+
+# Import bodies larger than this are spooled to a temp file rather than RAM
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Largest import body accepted. Rows are staged a chunk per transaction, but
+# publishing them is one transaction holding the write lock; larger files
+# must be split.
+IMPORT_MAX_BYTES = 64 * 1024 * 1024
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Todos per transaction in background jobs: each chunk commits on its own, so
+# the write lock is released between chunks and other requests get through
+JOB_CHUNK_SIZE = 100
+
+BACKGROUND_DESCRIPTION = "Run as a background job: answer 202 with its id at once, poll /api/jobs/{id} for the result"
+JOB_RESPONSES = {202: {"model": schemas.JobSubmitted, "description": "Queued as a background job"}}
+
+DUE_VIEW_PATTERN = f"^({'|'.join(crud.DUE_VIEWS)})$"
+TZ_DESCRIPTION = "IANA time zone deciding which day is today, e.g. Europe/Berlin (server time if omitted)"
+
+def set_next_cursor(response: Response, todos: List[Todo], limit: int) -> None:
+    """Expose the keyset cursor for the following page, if there is one"""
+    cursor = crud.next_cursor(todos, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    variant: str = ""
+) -> Optional[Response]:
+    """Tag the response with the data version; a 304 if the client is up to date.
+
+    ``variant`` is added to the tag for responses that also change without a
+    write, e.g. the local date for due-date views.
+    """
+    etag = f'"{await async_crud.get_data_version(db)}{variant}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def local_date_variant(tz: Optional[str]) -> str:
+    """ETag variant for responses bucketed by the current day in ``tz``"""
+    try:
+        return f"-{crud.local_now(tz).date().isoformat()}"
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def json_response(
+    content,
+    response: Optional[Response] = None,
+    status_code: int = 200
+) -> TodoJSONResponse:
+    """Send already-shaped content without re-validation, keeping headers set on ``response``"""
+    headers = dict(response.headers) if response is not None else None
+    return TodoJSONResponse(content, status_code=status_code, headers=headers)
+
+async def submit_job(db: AsyncSession, kind: str, params: dict) -> TodoJSONResponse:
+    """Queue a background job; 202 with its id, and its URL in Location"""
+    job = await jobs.enqueue(db, kind, params)
+    url = f"/api/jobs/{job.id}"
+    response = json_response({"job_id": job.id, "status": job.status, "url": url}, status_code=202)
+    response.headers["Location"] = url
+    return response
 
 @router.get("/", response_model=List[schemas.TodoNested])
-def get_todos(
+async def get_todos(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     parent_id: Optional[int] = Query(None, description="Filter by parent ID (null for root todos)"),
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
     priority: Optional[str] = Query(None, description="Filter by priority"),
     nested: bool = Query(True, description="Return nested structure"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=f"Continue after a previous page's {NEXT_CURSOR_HEADER}"),
+    due: Optional[str] = Query(None, pattern=DUE_VIEW_PATTERN, description="Only todos due today, overdue or due this week"),
+    tz: Optional[str] = Query(None, description=TZ_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all todos with optional filtering"""
-    if nested and parent_id is None:
-        # Get root todos with nested children
-        todos = crud.get_root_todos_with_children(db, skip=skip, limit=limit)
-        return [build_nested_response(todo) for todo in todos]
-    else:
-        # Get flat list of todos
-        todos = crud.get_todos(
-            db, skip=skip, limit=limit, parent_id=parent_id, 
-            completed=completed, priority=priority
+    unchanged = await not_modified(request, response, db, local_date_variant(tz) if due else "")
+    if unchanged is not None:
+        return unchanged
+
+    try:
+        if nested and parent_id is None:
+            # Get root todos with nested children
+            todos = await async_crud.get_root_todos_with_children(
+                db, skip=skip, limit=limit, cursor=cursor, due=due, tz=tz
+            )
+        else:
+            # Get flat list of todos
+            todos = await async_crud.get_todos(
+                db, skip=skip, limit=limit, parent_id=parent_id, 
+                completed=completed, priority=priority, cursor=cursor, due=due, tz=tz
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, todos, limit)
+
+    convert = nested_dict if nested and parent_id is None else flat_dict
+    return json_response([convert(todo) for todo in todos], response)
+
+@router.get("/changes", response_model=schemas.ChangeFeed)
+async def get_changes(
+    since: int = Query(..., ge=0, description="Data version the client already has"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get the todo changes committed after a data version"""
+    feed = await async_crud.get_changes(db, since)
+    return json_response(change_feed_dict(feed))
+
+@router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Data version the client already has")
+):
+    """Stream change feeds as Server-Sent Events whenever todos are written"""
+    last_event_id = request.headers.get("last-event-id", "")
+    version = int(last_event_id) if last_event_id.isdigit() else since
+
+    async def events():
+        nonlocal version
+        while not await request.is_disconnected():
+            # Take the waiter first so a commit during the read still wakes us
+            waiter = notifier.waiter()
+            # Each wake-up is its own unit of work for the query budget
+            with metrics.track_queries("change stream poll"):
+                async with AsyncReadSessionLocal() as db:
+                    feed = await async_crud.get_changes(db, version)
+            if feed["reset"] or feed["changes"]:
+                version = feed["version"]
+                payload = to_json(change_feed_dict(feed)).decode()
+                yield f"id: {version}\nevent: changes\ndata: {payload}\n\n"
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=CHANGE_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def export_value(value):
+    """JSON/CSV representation of an exported column value"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def format_export_rows(rows, fmt: str) -> str:
+    """Serialize one fetched partition of export rows"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([export_value(value) for value in row] for row in rows)
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(dict(zip(crud.EXPORT_FIELDS, map(export_value, row)))) + "\n"
+        for row in rows
+    )
+
+@router.get("/export")
+async def export_todos(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Stream every todo as NDJSON or CSV, fetched in chunks from a server-side cursor"""
+    async def chunks():
+        if format == "csv":
+            yield ",".join(crud.EXPORT_FIELDS) + "\r\n"
+        async with AsyncReadSessionLocal() as db:
+            result = await db.stream(
+                crud.export_todos_query().execution_options(yield_per=EXPORT_CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield format_export_rows(rows, format)
+
+    return StreamingResponse(
+        chunks(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'}
+    )
+
+def read_import_rows(spool, fmt: str):
+    """Validate the rows of an export file one at a time; raises ValueError with the line"""
+    text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        # CSV has no null: empty cells are missing values
+        records = (
+            (reader.line_num, {field: value for field, value in row.items() if value != ""})
+            for row in reader
         )
-        return [schemas.TodoNested(
-            id=todo.id,
-            text=todo.text,
-            completed=todo.completed,
-            due_date=todo.due_date,
-            priority=todo.priority,
-            parent_id=todo.parent_id,
-            user_id=todo.user_id,
-            created_at=todo.created_at,
-            updated_at=todo.updated_at,
-            children_count=len(todo.children),
-            children=[]
-        ) for todo in todos]
+    else:
+        records = ((number, json.loads(line)) for number, line in enumerate(text, 1) if line.strip())
+    try:
+        for line, record in records:
+            try:
+                yield schemas.TodoImport.model_validate(record).model_dump()
+            except ValidationError as e:
+                error = e.errors()[0]
+                raise ValueError(f"Line {line}: {'.'.join(map(str, error['loc']))}: {error['msg']}")
+    except (json.JSONDecodeError, csv.Error) as e:
+        raise ValueError(f"Malformed import file: {e}")
+
+async def spool_import(request: Request, spool) -> None:
+    """Write the request body to ``spool`` on the threadpool; 413 past IMPORT_MAX_BYTES"""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > IMPORT_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"An import may be at most {IMPORT_MAX_BYTES} bytes; split the file"
+            )
+        await run_in_threadpool(spool.write, chunk)
+
+@jobs.handler("import")
+def run_import(db: Session, params: dict, progress) -> dict:
+    """Import a spooled file as import_todos does, then delete it"""
+    try:
+        with open(params["path"], "rb") as spool:
+            rows = read_import_rows(spool, params["format"])
+            import_id = crud.begin_import(db)
+            staged = 0
+            try:
+                while chunk := list(islice(rows, IMPORT_CHUNK_SIZE)):
+                    staged += len(chunk)
+                    # Committed with the chunk
+                    progress(staged)
+                    crud.import_todos_chunk(db, import_id, chunk)
+                result = crud.finish_import(db, import_id)
+            except ValueError as e:
+                crud.discard_import(db, import_id)
+                raise ValueError(f"{e}; nothing was imported")
+    finally:
+        os.remove(params["path"])
+    return schemas.ImportResult(**result).model_dump()
+
+@router.post("/import", response_model=schemas.ImportResult, responses=JOB_RESPONSES)
+async def import_todos(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Defaults from the Content-Type"),
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import an /export file (NDJSON or CSV), all or nothing.
+
+    Rows are staged in bounded chunks, each committed on its own so other
+    writes get through meanwhile, then published in one transaction.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if background:
+        # Kept on disk until the job has read it
+        fd, path = await run_in_threadpool(tempfile.mkstemp, prefix="todos-import-", suffix=f".{fmt}")
+        try:
+            # Unbuffered, so closing it does no write of its own
+            with os.fdopen(fd, "wb", buffering=0) as spool:
+                await spool_import(request, spool)
+            return await submit_job(db, "import", {"path": path, "format": fmt})
+        except BaseException:
+            await run_in_threadpool(os.remove, path)
+            raise
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        await spool_import(request, spool)
+        spool.seek(0)
+
+        rows = read_import_rows(spool, fmt)
+        import_id = await async_crud.begin_import(db)
+        try:
+            # Reading and parsing the spool, which may be on disk, off the event loop too
+            while chunk := await run_in_threadpool(list, islice(rows, IMPORT_CHUNK_SIZE)):
+                await async_crud.import_todos_chunk(db, import_id, chunk)
+            result = await async_crud.finish_import(db, import_id)
+        except ValueError as e:
+            await async_crud.discard_import(db, import_id)
+            raise HTTPException(status_code=400, detail=f"{e}; nothing was imported")
+    return schemas.ImportResult(**result)
 
 @router.get("/{todo_id}", response_model=schemas.TodoNested)
-def get_todo(todo_id: int, db: Session = Depends(get_db)):
+async def get_todo(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    max_depth: Optional[int] = Query(None, ge=0, description="Levels of children to include (all if omitted)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Get a specific todo with its nested children"""
-    todo = crud.get_todo_with_children(db, todo_id=todo_id)
+    unchanged = await not_modified(request, response, db)
+    if unchanged is not None:
+        return unchanged
+
+    todo = await async_crud.get_todo_with_children(db, todo_id=todo_id, max_depth=max_depth)
+    if not todo:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return json_response(nested_dict(todo), response)
+
+@router.get("/{todo_id}/ancestors", response_model=List[schemas.TodoResponse])
+async def get_todo_ancestors(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get the ancestors of a todo from the root down (breadcrumbs)"""
+    unchanged = await not_modified(request, response, db)
+    if unchanged is not None:
+        return unchanged
+
+    todo = await async_crud.get_todo(db, todo_id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
-    return build_nested_response(todo)
+    ancestors = await async_crud.get_ancestors(db, todo)
+    return json_response([todo_dict(ancestor) for ancestor in ancestors], response)
 
 @router.post("/", response_model=schemas.TodoResponse, status_code=201)
-def create_todo(todo: schemas.TodoCreate, db: Session = Depends(get_db)):
+async def create_todo(todo: schemas.TodoCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new todo"""
     # Validate parent exists if parent_id is provided
     if todo.parent_id:
-        parent = crud.get_todo(db, todo.parent_id)
+        parent = await async_crud.get_todo(db, todo.parent_id)
         if not parent:
             raise HTTPException(status_code=400, detail="Parent todo not found")
     
-    db_todo = crud.create_todo(db=db, todo=todo)
-    return schemas.TodoResponse(
-        id=db_todo.id,
-        text=db_todo.text,
-        completed=db_todo.completed,
-        due_date=db_todo.due_date,
-        priority=db_todo.priority,
-        parent_id=db_todo.parent_id,
-        user_id=db_todo.user_id,
-        created_at=db_todo.created_at,
-        updated_at=db_todo.updated_at,
-        children_count=len(db_todo.children)
-    )
+    db_todo = await async_crud.create_todo(db=db, todo=todo)
+    return json_response(todo_dict(db_todo), status_code=201)
 
 @router.put("/{todo_id}", response_model=schemas.TodoResponse)
-def update_todo(todo_id: int, todo_update: schemas.TodoUpdate, db: Session = Depends(get_db)):
+async def update_todo(todo_id: int, todo_update: schemas.TodoUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing todo"""
-    # Validate parent exists if parent_id is being updated
-    if todo_update.parent_id is not None:
-        parent = crud.get_todo(db, todo_update.parent_id)
-        if not parent:
-            raise HTTPException(status_code=400, detail="Parent todo not found")
-        
-        # Prevent circular references
-        if crud.is_descendant(db, todo_update.parent_id, todo_id):
-            raise HTTPException(status_code=400, detail="Cannot move todo to its own descendant")
-    
-    db_todo = crud.update_todo(db=db, todo_id=todo_id, todo_update=todo_update)
+    # A new parent_id is validated (existence and cycles) inside the update
+    try:
+        db_todo = await async_crud.update_todo(db=db, todo_id=todo_id, todo_update=todo_update)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not db_todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
-    return schemas.TodoResponse(
-        id=db_todo.id,
-        text=db_todo.text,
-        completed=db_todo.completed,
-        due_date=db_todo.due_date,
-        priority=db_todo.priority,
-        parent_id=db_todo.parent_id,
-        user_id=db_todo.user_id,
-        created_at=db_todo.created_at,
-        updated_at=db_todo.updated_at,
-        children_count=len(db_todo.children)
-    )
+    return json_response(todo_dict(db_todo))
 
 @router.delete("/{todo_id}")
-def delete_todo(todo_id: int, db: Session = Depends(get_db)):
+async def delete_todo(todo_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a todo and all its children"""
-    success = crud.delete_todo(db=db, todo_id=todo_id)
+    success = await async_crud.delete_todo(db=db, todo_id=todo_id)
     if not success:
         raise HTTPException(status_code=404, detail="Todo not found")
     return {"message": "Todo deleted successfully"}
 
-@router.patch("/{todo_id}/toggle", response_model=schemas.TodoResponse)
-def toggle_todo_completion(
+@jobs.handler("toggle")
+def run_toggle(db: Session, params: dict, progress) -> dict:
+    """Toggle as the route does; a cascade is one UPDATE, so one transaction"""
+    db_todo = crud.toggle_todo_completion(db, params["todo_id"], params["completed"], cascade=params["cascade"])
+    if not db_todo:
+        raise ValueError("Todo not found")
+    return todo_dict(db_todo)
+
+@router.patch("/{todo_id}/toggle", response_model=schemas.TodoResponse, responses=JOB_RESPONSES)
+async def toggle_todo_completion(
     todo_id: int, 
     toggle_request: schemas.ToggleCompletionRequest,
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Toggle todo completion status"""
-    db_todo = crud.toggle_todo_completion(db=db, todo_id=todo_id, completed=toggle_request.completed)
+    if background:
+        return await submit_job(db, "toggle", {"todo_id": todo_id, **toggle_request.model_dump()})
+    db_todo = await async_crud.toggle_todo_completion(
+        db=db, todo_id=todo_id, completed=toggle_request.completed, cascade=toggle_request.cascade
+    )
     if not db_todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
-    return schemas.TodoResponse(
-        id=db_todo.id,
-        text=db_todo.text,
-        completed=db_todo.completed,
-        due_date=db_todo.due_date,
-        priority=db_todo.priority,
-        parent_id=db_todo.parent_id,
-        user_id=db_todo.user_id,
-        created_at=db_todo.created_at,
-        updated_at=db_todo.updated_at,
-        children_count=len(db_todo.children)
-    )
+    return json_response(todo_dict(db_todo))
 
 @router.get("/{todo_id}/children", response_model=List[schemas.TodoResponse])
-def get_todo_children(todo_id: int, db: Session = Depends(get_db)):
+async def get_todo_children(todo_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all direct children of a todo"""
-    parent = crud.get_todo(db, todo_id)
+    parent = await async_crud.get_todo(db, todo_id)
     if not parent:
         raise HTTPException(status_code=404, detail="Parent todo not found")
     
-    children = crud.get_todos(db, parent_id=todo_id)
-    return [schemas.TodoResponse(
-        id=child.id,
-        text=child.text,
-        completed=child.completed,
-        due_date=child.due_date,
-        priority=child.priority,
-        parent_id=child.parent_id,
-        user_id=child.user_id,
-        created_at=child.created_at,
-        updated_at=child.updated_at,
-        children_count=len(child.children)
-    ) for child in children]
+    children = await async_crud.get_todos(db, parent_id=todo_id)
+    return json_response([todo_dict(child) for child in children])
 
 @router.post("/{todo_id}/move", response_model=schemas.TodoResponse)
-def move_todo(
+async def move_todo(
     todo_id: int,
     move_request: schemas.MoveRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Move a todo to a different parent"""
-    # Validate new parent exists if provided
-    if move_request.new_parent_id:
-        parent = crud.get_todo(db, move_request.new_parent_id)
-        if not parent:
-            raise HTTPException(status_code=400, detail="New parent todo not found")
-    
-    db_todo = crud.move_todo(db=db, todo_id=todo_id, new_parent_id=move_request.new_parent_id)
+    try:
+        db_todo = await async_crud.move_todo(db=db, todo_id=todo_id, new_parent_id=move_request.new_parent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not db_todo:
-        raise HTTPException(status_code=404, detail="Todo not found or circular reference detected")
+        raise HTTPException(status_code=404, detail="Todo not found")
     
-    return schemas.TodoResponse(
-        id=db_todo.id,
-        text=db_todo.text,
-        completed=db_todo.completed,
-        due_date=db_todo.due_date,
-        priority=db_todo.priority,
-        parent_id=db_todo.parent_id,
-        user_id=db_todo.user_id,
-        created_at=db_todo.created_at,
-        updated_at=db_todo.updated_at,
-        children_count=len(db_todo.children)
-    )
+    return json_response(todo_dict(db_todo))
 
-@router.get("/search/", response_model=List[schemas.TodoResponse])
-def search_todos(
+@router.get("/search/", response_model=List[schemas.TodoSearchResult])
+async def search_todos(
+    response: Response,
     q: str = Query(..., min_length=1, description="Search query"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    highlight: bool = Query(False, description="Include a highlighted snippet of the match"),
+    cursor: Optional[str] = Query(None, description=f"Continue after a previous page's {NEXT_CURSOR_HEADER}"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Search todos by text content"""
-    todos = crud.search_todos(db, query=q, skip=skip, limit=limit)
-    return [schemas.TodoResponse(
-        id=todo.id,
-        text=todo.text,
-        completed=todo.completed,
-        due_date=todo.due_date,
-        priority=todo.priority,
-        parent_id=todo.parent_id,
-        user_id=todo.user_id,
-        created_at=todo.created_at,
-        updated_at=todo.updated_at,
-        children_count=len(todo.children)
-    ) for todo in todos]
+    try:
+        todos = await async_crud.search_todos(
+            db, query=q, skip=skip, limit=limit, highlight=highlight, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, todos, limit)
+    return json_response([search_dict(todo) for todo in todos], response)
 
 @router.get("/stats/", response_model=schemas.TodoStats)
-def get_todo_stats(db: Session = Depends(get_db)):
+async def get_todo_stats(
+    request: Request,
+    response: Response,
+    root_only: bool = Query(False, description="Count only root todos, as the todo list shows them"),
+    tz: Optional[str] = Query(None, description=TZ_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Get todo statistics"""
-    stats = crud.get_todo_stats(db)
-    return schemas.TodoStats(**stats)
+    unchanged = await not_modified(request, response, db, local_date_variant(tz))
+    if unchanged is not None:
+        return unchanged
+
+    stats = await async_crud.get_todo_stats(db, root_only=root_only, tz=tz)
+    return json_response(stats, response)
+
+@jobs.handler("bulk_delete")
+def run_bulk_delete(db: Session, params: dict, progress) -> dict:
+    """Delete JOB_CHUNK_SIZE ids per transaction; a failure keeps the chunks already done"""
+    ids = params["ids"]
+    deleted_count = 0
+    for start in range(0, len(ids), JOB_CHUNK_SIZE):
+        chunk = ids[start:start + JOB_CHUNK_SIZE]
+        deleted_count += crud.delete_subtrees(db, chunk)
+        # Counted once the chunk is deleted, and published by the same commit
+        progress(start + len(chunk), len(ids))
+        db.commit()
+    return {"message": f"Deleted {deleted_count} todos", "deleted_count": deleted_count}
 
-@router.delete("/bulk/", response_model=dict)
-def bulk_delete_todos(
+@router.delete("/bulk/", response_model=dict, responses=JOB_RESPONSES)
+async def bulk_delete_todos(
     delete_request: schemas.BulkDeleteRequest,
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete multiple todos by IDs"""
-    deleted_count = crud.bulk_delete_todos(db, delete_request.ids)
+    if background:
+        return await submit_job(db, "bulk_delete", {"ids": delete_request.ids})
+    deleted_count = await async_crud.bulk_delete_todos(db, delete_request.ids)
     return {"message": f"Deleted {deleted_count} todos", "deleted_count": deleted_count}
 
+async def read_batch_items(request: Request) -> list:
+    """Parse a batch body: a JSON array, or NDJSON read line by line as it arrives"""
+    items = []
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            buffer = b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                items.extend(json.loads(line) for line in lines if line.strip())
+                if len(items) > BATCH_MAX_OPERATIONS:
+                    break
+            if buffer.strip():
+                items.append(json.loads(buffer))
+        else:
+            items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Batch body is not valid JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+    if len(items) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {BATCH_MAX_OPERATIONS} operations"
+        )
+    return items
+
+def build_batch_response(results: dict) -> schemas.BatchResponse:
+    """Order per-operation results by index and count them"""
+    ordered = [schemas.BatchResult.model_validate(results[index]) for index in sorted(results)]
+    applied = sum(result.ok for result in ordered)
+    return schemas.BatchResponse(applied=applied, failed=len(ordered) - applied, results=ordered)
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def apply_batch(
+    request: Request,
+    atomic: bool = Query(False, description="Apply all operations or none of them"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Apply create, update, toggle and delete operations in one transaction"""
+    items = await read_batch_items(request)
+
+    results = {}
+    operations = []
+    for index, item in enumerate(items):
+        try:
+            operations.append((index, schemas.batch_operation_adapter.validate_python(item)))
+        except ValidationError as e:
+            op = item.get("op") if isinstance(item, dict) else None
+            error = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+                for err in e.errors()
+            )
+            results[index] = {"index": index, "op": op, "ok": False, "error": error}
+    if atomic and results:
+        raise HTTPException(status_code=422, detail=[
+            schemas.BatchResult(**result).model_dump() for result in results.values()
+        ])
+
+    results.update(await async_crud.apply_batch(db, operations, atomic=atomic))
+    return build_batch_response(results)
+
+@router.post("/move", response_model=schemas.BatchResponse)
+async def move_todos(
+    move_request: schemas.BatchMoveRequest,
+    atomic: bool = Query(False, description="Apply all moves or none of them"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Move many todos in one transaction, validating all moves together"""
+    if len(move_request.moves) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {BATCH_MAX_OPERATIONS} operations"
+        )
+    operations = [
+        (index, schemas.BatchUpdate(
+            op="update", id=move.todo_id, data=schemas.TodoUpdate(parent_id=move.new_parent_id)
+        ))
+        for index, move in enumerate(move_request.moves)
+    ]
+    results = await async_crud.apply_batch(db, operations, atomic=atomic)
+    return build_batch_response(results)
+
+def ai_subtasks_result(parent: Todo, subtasks: List[Todo]) -> dict:
+    return {
+        "parent_todo_id": parent.id,
+        "generated_subtasks": [todo_dict(subtask) for subtask in subtasks],
+        "message": f"Generated {len(subtasks)} AI subtasks for '{parent.text}'"
+    }
+
+def ai_batch_result(todo_ids: List[int], generated: List[tuple]) -> dict:
+    found = {parent.id for parent, _ in generated}
+    return {
+        "results": [ai_subtasks_result(parent, subtasks) for parent, subtasks in generated],
+        "missing": [todo_id for todo_id in dict.fromkeys(todo_ids) if todo_id not in found]
+    }
+
+@jobs.handler("ai_subtasks")
+def run_ai_subtasks(db: Session, params: dict, progress) -> dict:
+    """Generate subtasks for JOB_CHUNK_SIZE parents per transaction"""
+    todo_ids = list(dict.fromkeys(params["todo_ids"]))
+    generated = []
+    for start in range(0, len(todo_ids), JOB_CHUNK_SIZE):
+        chunk = todo_ids[start:start + JOB_CHUNK_SIZE]
+        progress(start + len(chunk), len(todo_ids))
+        generated.extend(crud.generate_ai_subtasks_batch(db, chunk, params["max_subtasks"]))
+    return ai_batch_result(todo_ids, generated)
+
+@router.post("/ai-subtasks", response_model=schemas.AIBatchGenerateSubtasksResponse, responses=JOB_RESPONSES)
+async def generate_ai_subtasks_batch(
+    generate_request: schemas.AIBatchGenerateSubtasksRequest,
+    background: bool = Query(False, description=BACKGROUND_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Generate AI subtasks for many todos in one transaction"""
+    if background:
+        return await submit_job(db, "ai_subtasks", generate_request.model_dump())
+    generated = await async_crud.generate_ai_subtasks_batch(
+        db, generate_request.todo_ids, generate_request.max_subtasks
+    )
+    return json_response(ai_batch_result(generate_request.todo_ids, generated))
+
 @router.post("/{todo_id}/ai-subtasks", response_model=schemas.AIGenerateSubtasksResponse)
-def generate_ai_subtasks(
+async def generate_ai_subtasks(
     todo_id: int,
     max_subtasks: int = Query(default=5, ge=1, le=10, description="Maximum number of subtasks to generate"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate AI subtasks for a todo using mock AI analysis"""
-    # Check if parent todo exists
-    parent_todo = crud.get_todo(db, todo_id)
-    if not parent_todo:
+    # Generate subtasks using mock AI; the parent is looked up in the same transaction
+    generated = await async_crud.generate_ai_subtasks_batch(db, [todo_id], max_subtasks)
+    if not generated:
         raise HTTPException(status_code=404, detail="Todo not found")
-    
-    # Generate subtasks using mock AI
-    generated_subtasks = crud.generate_ai_subtasks(db, todo_id, max_subtasks)
-    
-    # Convert to response format
-    subtask_responses = [
-        schemas.TodoResponse(
-            id=subtask.id,
-            text=subtask.text,
-            completed=subtask.completed,
-            due_date=subtask.due_date,
-            priority=subtask.priority,
-            parent_id=subtask.parent_id,
-            user_id=subtask.user_id,
-            created_at=subtask.created_at,
-            updated_at=subtask.updated_at,
-            children_count=len(subtask.children)
-        ) for subtask in generated_subtasks
-    ]
-    
-    return schemas.AIGenerateSubtasksResponse(
-        parent_todo_id=todo_id,
-        generated_subtasks=subtask_responses,
-        message=f"Generated {len(generated_subtasks)} AI subtasks for '{parent_todo.text}'"
-    )
\ No newline at end of file
+
+    return json_response(ai_subtasks_result(*generated[0]))
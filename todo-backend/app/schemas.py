@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, Any, Literal, Optional, List, Union
 from datetime import datetime
 from enum import Enum
 
@@ -35,7 +35,12 @@ class TodoResponse(TodoBase):
     class Config:
         from_attributes = True
 
+class TodoProgress(BaseModel):
+    completed: int = Field(..., description="Completed descendants")
+    total: int = Field(..., description="All descendants, at any depth")
+
 class TodoNested(TodoResponse):
+    progress: Optional[TodoProgress] = None
     children: List['TodoNested'] = []
 
     class Config:
@@ -44,22 +49,98 @@ class TodoNested(TodoResponse):
 # Update forward reference
 TodoNested.model_rebuild()
 
+class TodoSearchResult(TodoResponse):
+    snippet: Optional[str] = Field(None, description="Matched text with <mark> highlights")
+
 class TodoStats(BaseModel):
     total: int
     completed: int
     pending: int
     overdue: int
+    due_today: int
     by_priority: dict
 
+class ChangeEntry(BaseModel):
+    version: int
+    op: str = Field(..., description="insert, update, move or delete")
+    todo_id: int
+
+    class Config:
+        from_attributes = True
+
+class ChangeFeed(BaseModel):
+    version: int = Field(..., description="Pass as `since` to get the next changes")
+    reset: bool = Field(False, description="History is incomplete; refetch everything")
+    changes: List[ChangeEntry] = []
+    todos: List[TodoResponse] = Field([], description="Current state of inserted, updated and moved todos")
+
 class BulkDeleteRequest(BaseModel):
     ids: List[int] = Field(..., min_items=1, description="List of todo IDs to delete")
 
 class ToggleCompletionRequest(BaseModel):
     completed: bool = Field(..., description="New completion status")
+    cascade: bool = Field(False, description="Apply the same status to all descendants")
 
 class MoveRequest(BaseModel):
     new_parent_id: Optional[int] = Field(None, description="New parent ID (null for root level)")
 
+class MoveItem(MoveRequest):
+    todo_id: int
+
+class BatchMoveRequest(BaseModel):
+    moves: List[MoveItem] = Field(..., min_length=1, description="Moves, validated and applied in order")
+
+class TodoImport(TodoBase):
+    """One row of an /export file, as accepted by /import"""
+    id: int = Field(..., ge=1)
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ImportResult(BaseModel):
+    imported: int
+    orphaned: int = Field(..., description="Todos whose parent was not in the file, imported as roots")
+    id_offset: int = Field(..., description="Added to every imported id and parent_id")
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    data: TodoCreate
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: TodoUpdate
+
+class BatchToggle(BaseModel):
+    op: Literal["toggle"]
+    id: int
+    completed: bool
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+BatchOperation = Annotated[
+    Union[BatchCreate, BatchUpdate, BatchToggle, BatchDelete],
+    Field(discriminator="op")
+]
+
+# Built once; validating each item separately keeps errors per item
+batch_operation_adapter = TypeAdapter(BatchOperation)
+
+class BatchResult(BaseModel):
+    index: int = Field(..., description="Position of the operation in the request")
+    op: Optional[str] = None
+    ok: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+    todo: Optional[TodoResponse] = None
+
+class BatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: List[BatchResult]
+
 class AIGenerateSubtasksRequest(BaseModel):
     todo_id: int = Field(..., description="ID of the parent todo to generate subtasks for")
     max_subtasks: int = Field(default=5, ge=1, le=10, description="Maximum number of subtasks to generate")
@@ -69,6 +150,31 @@ class AIGenerateSubtasksResponse(BaseModel):
     generated_subtasks: List[TodoResponse]
     message: str
 
+class AIBatchGenerateSubtasksRequest(BaseModel):
+    todo_ids: List[int] = Field(..., min_length=1, max_length=100, description="Parent todos to generate subtasks for")
+    max_subtasks: int = Field(default=5, ge=1, le=10, description="Maximum number of subtasks per parent")
+
+class AIBatchGenerateSubtasksResponse(BaseModel):
+    results: List[AIGenerateSubtasksResponse]
+    missing: List[int] = Field(..., description="Requested ids with no todo")
+
+class JobSubmitted(BaseModel):
+    job_id: int
+    status: str
+    url: str = Field(..., description="Poll this for progress and the result")
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    progress: int = Field(..., description="Units of work done, out of total")
+    total: Optional[int] = None
+    result: Optional[Any] = Field(None, description="What the same request without background=true returns")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Fast JSON serialization of todo rows.
+
+The routers used to build a ``schemas.TodoResponse`` (or ``TodoNested``) for
+every row, which FastAPI then validated a second time against the route's
+``response_model`` and encoded with the stdlib ``json`` module. For a large
+tree that cost more than the query itself.
+
+Here rows become plain dicts in the schemas' field order and are encoded in
+one pass by pydantic-core's Rust serializer (``pydantic_core.to_json``), which
+handles datetimes the same way pydantic does. Handlers return a
+``TodoJSONResponse`` directly, so FastAPI skips response validation; the
+``response_model`` on each route still documents the shape.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import PydanticSerializationError, to_json
+
+from app.models import Todo
+
+
+class TodoJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core rather than the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return to_json(content)
+        except PydanticSerializationError:
+            # pydantic-core gives up past 255 nested containers (about 126
+            # levels of todos); the stdlib encoder is only bound by recursion
+            return json.dumps(
+                content, ensure_ascii=False, separators=(",", ":"), default=_pydantic_json
+            ).encode("utf-8")
+
+
+def _pydantic_json(value: Any) -> Any:
+    """Values the stdlib encoder lacks (datetimes), formatted exactly as pydantic does"""
+    return json.loads(to_json(value))
+
+
+def todo_dict(todo: Todo) -> dict:
+    """A row as ``schemas.TodoResponse`` would serialize it"""
+    return {
+        "text": todo.text,
+        "completed": todo.completed,
+        "due_date": todo.due_date,
+        "priority": todo.priority,
+        "parent_id": todo.parent_id,
+        "id": todo.id,
+        "user_id": todo.user_id,
+        "created_at": todo.created_at,
+        "updated_at": todo.updated_at,
+        "children_count": todo.children_count,
+    }
+
+
+def nested_dict(todo: Todo) -> dict:
+    """A row and its loaded subtree as ``schemas.TodoNested`` would serialize it"""
+    data = todo_dict(todo)
+    data["progress"] = {
+        "completed": todo.descendants_completed or 0,
+        "total": todo.descendants_total or 0,
+    }
+    data["children"] = [nested_dict(child) for child in todo.children]
+    return data
+
+
+def flat_dict(todo: Todo) -> dict:
+    """A row as a ``schemas.TodoNested`` without children (flat listings)"""
+    data = todo_dict(todo)
+    data["progress"] = None
+    data["children"] = []
+    return data
+
+
+def search_dict(todo: Todo) -> dict:
+    """A row as ``schemas.TodoSearchResult`` would serialize it"""
+    data = todo_dict(todo)
+    data["snippet"] = todo.snippet
+    return data
+
+
+def change_feed_dict(feed: dict) -> dict:
+    """A crud change feed as ``schemas.ChangeFeed`` would serialize it"""
+    return {
+        "version": feed["version"],
+        "reset": feed["reset"],
+        "changes": [
+            {"version": change.version, "op": change.op, "todo_id": change.todo_id}
+            for change in feed["changes"]
+        ],
+        "todos": [todo_dict(todo) for todo in feed["todos"]],
+    }
+
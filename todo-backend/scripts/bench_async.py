@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Compare the sync (threadpool) and async database paths under concurrent load.
+
+The sync path is what the routers used to do: run a crud function with a
+``SessionLocal`` session on Starlette's threadpool (40 threads by default).
+The async path is what they do now: await the ``app.async_crud`` wrapper with
+an ``AsyncReadSessionLocal`` session on the event loop.
+
+Usage: python scripts/bench_async.py [--requests 2000] [--concurrency 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Always a scratch database: seeding would otherwise write into a real one
+_tmpdir = tempfile.mkdtemp(prefix="todo-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from app import async_crud, crud, database, schemas  # noqa: E402
+
+
+def seed(roots: int, children: int) -> None:
+    """Populate the benchmark database with a two-level tree"""
+    db = database.SessionLocal()
+    try:
+        for i in range(roots):
+            root = crud.create_todo(db, schemas.TodoCreate(text=f"bench root {i}"))
+            for j in range(children):
+                crud.create_todo(db, schemas.TodoCreate(text=f"bench child {i}.{j}", parent_id=root.id))
+    finally:
+        db.close()
+
+
+def sync_request() -> None:
+    db = database.SessionLocal()
+    try:
+        crud.get_root_todos_with_children(db, limit=20)
+        crud.get_todo_stats(db)
+    finally:
+        db.close()
+
+
+async def async_request() -> None:
+    async with database.AsyncReadSessionLocal() as db:
+        await async_crud.get_root_todos_with_children(db, limit=20)
+        await async_crud.get_todo_stats(db)
+
+
+async def run(label: str, request, total: int, concurrency: int) -> dict:
+    """Issue ``total`` requests with at most ``concurrency`` in flight"""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    peak_threads = threading.active_count()
+
+    async def one():
+        nonlocal peak_threads
+        async with gate:
+            start = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - start)
+            peak_threads = max(peak_threads, threading.active_count())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "path": label,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "peak_threads": peak_threads,
+    }
+    print(
+        f"{label:>5}: {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']:>8} ms  "
+        f"p99 {result['p99_ms']:>8} ms  peak threads {peak_threads}"
+    )
+    return result
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--roots", type=int, default=50)
+    parser.add_argument("--children", type=int, default=5)
+    args = parser.parse_args()
+
+    database.create_tables()
+    seed(args.roots, args.children)
+    print(f"{args.requests} requests, {args.concurrency} in flight, {database.DATABASE_URL}")
+
+    # Async first, so its thread count is not inflated by idle threadpool workers
+    await run("async", async_request, args.requests, args.concurrency)
+    await run("sync", lambda: run_in_threadpool(sync_request), args.requests, args.concurrency)
+    await database.async_engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
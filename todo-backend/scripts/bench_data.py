@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Synthetic todo datasets for benchmarks.
+
+Four shapes stress different access paths:
+
+- ``flat``: root todos with no children (long listings, search, stats)
+- ``wide``: a few roots with very many direct children (children listings, subtree loads)
+- ``deep``: chains where every todo is the only child of the previous one (paths, ancestors)
+- ``users``: many users, each owning small two-level trees (per-user filters and counters)
+
+Rows are bulk-inserted in one transaction with their ids, materialized paths
+and depths computed up front, so building millions of todos skips crud's
+per-row bookkeeping. The FTS triggers still index every row, and the counters
+and data version are rebuilt once at the end.
+
+Usage: DATABASE_URL=sqlite:///big.db python scripts/bench_data.py [--profile large] [--flat 2000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, database  # noqa: E402
+from app.models import Todo  # noqa: E402
+
+# Rows per executemany
+INSERT_CHUNK_SIZE = 10000
+
+# Dataset sizes; every key can be overridden on the command line
+PROFILES = {
+    "small": {
+        "flat": 20000,
+        "wide_roots": 5, "wide_children": 2000,
+        "deep_chains": 5, "deep_length": 200,
+        "users": 100, "todos_per_user": 100,
+    },
+    "large": {
+        "flat": 1000000,
+        "wide_roots": 10, "wide_children": 50000,
+        "deep_chains": 10, "deep_length": 500,
+        "users": 1000, "todos_per_user": 1000,
+    },
+}
+
+WORDS = ("plan", "review", "write", "fix", "deploy", "test", "call", "email", "design", "update",
+         "report", "budget", "meeting", "invoice", "release")
+
+# Every USER_TREE_SIZE-th todo of a user is a root; the others are its children
+USER_TREE_SIZE = 10
+
+
+class _Rows:
+    """Hands out sequential ids and builds row dicts in the todos table layout"""
+
+    def __init__(self, first_id: int):
+        self.next_id = first_id
+        self.now = datetime.now()
+
+    def make(self, parent_path: str, depth: int, parent_id=None, user_id=None) -> dict:
+        todo_id = self.next_id
+        self.next_id += 1
+        return {
+            "id": todo_id,
+            "text": f"{WORDS[todo_id % len(WORDS)]} {WORDS[todo_id * 7 % len(WORDS)]} task {todo_id}",
+            "completed": todo_id % 3 == 0,
+            "priority": crud.PRIORITIES[todo_id % 3],
+            # A quarter have no due date; the rest spread a month either side of today
+            "due_date": None if todo_id % 4 == 0 else self.now + timedelta(days=todo_id % 61 - 30),
+            "parent_id": parent_id,
+            "user_id": user_id,
+            "path": f"{parent_path}{todo_id}/",
+            "depth": depth,
+            "created_at": self.now,
+            "updated_at": self.now,
+        }
+
+
+def _flat(rows: _Rows, spec: dict, fixtures: dict) -> Iterator[dict]:
+    for i in range(spec["flat"]):
+        row = rows.make("/", 0)
+        if i == 0:
+            fixtures["flat_first"] = row["id"]
+        fixtures["flat_last"] = row["id"]
+        yield row
+
+
+def _wide(rows: _Rows, spec: dict, fixtures: dict) -> Iterator[dict]:
+    fixtures["wide_roots"] = []
+    for _ in range(spec["wide_roots"]):
+        root = rows.make("/", 0)
+        fixtures["wide_roots"].append(root["id"])
+        yield root
+        for j in range(spec["wide_children"]):
+            child = rows.make(root["path"], 1, parent_id=root["id"])
+            if j == 0:
+                fixtures.setdefault("wide_child", child["id"])
+            yield child
+
+
+def _deep(rows: _Rows, spec: dict, fixtures: dict) -> Iterator[dict]:
+    fixtures["deep_roots"], fixtures["deep_leaves"] = [], []
+    for _ in range(spec["deep_chains"]):
+        parent = None
+        for depth in range(spec["deep_length"]):
+            if parent is None:
+                row = rows.make("/", 0)
+            else:
+                row = rows.make(parent["path"], depth, parent_id=parent["id"])
+            if depth == 0:
+                fixtures["deep_roots"].append(row["id"])
+            yield row
+            parent = row
+        if parent:
+            fixtures["deep_leaves"].append(parent["id"])
+
+
+def _users(rows: _Rows, spec: dict, fixtures: dict) -> Iterator[dict]:
+    fixtures["user_ids"] = list(range(1, spec["users"] + 1))
+    for user_id in fixtures["user_ids"]:
+        root = None
+        for i in range(spec["todos_per_user"]):
+            if i % USER_TREE_SIZE == 0:
+                root = rows.make("/", 0, user_id=user_id)
+                fixtures.setdefault("user_root", root["id"])
+                yield root
+            else:
+                yield rows.make(root["path"], 1, parent_id=root["id"], user_id=user_id)
+
+
+SHAPES = (_flat, _wide, _deep, _users)
+
+
+def _chunks(rows: Iterator[dict]) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == INSERT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def profile_spec(profile: str, overrides: dict) -> Dict[str, int]:
+    """A profile's sizes with any non-None ``overrides`` applied"""
+    return {
+        key: size if overrides.get(key) is None else overrides[key]
+        for key, size in PROFILES[profile].items()
+    }
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """--profile plus one override option per dataset size"""
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    for key in PROFILES["small"]:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key)
+
+
+def generate(spec: Dict[str, int]) -> dict:
+    """Insert the dataset described by ``spec`` into DATABASE_URL.
+
+    Returns the fixture ids benchmarks aim at (first wide root, a deep leaf,
+    a user with todos, ...) along with the number of rows written.
+    """
+    database.create_tables()
+    db = database.SessionLocal()
+    try:
+        first_id = (db.query(Todo.id).order_by(Todo.id.desc()).limit(1).scalar() or 0) + 1
+        rows = _Rows(first_id)
+        fixtures = {}
+        with database.engine.begin() as conn:
+            for shape in SHAPES:
+                for chunk in _chunks(shape(rows, spec, fixtures)):
+                    conn.execute(Todo.__table__.insert(), chunk)
+        # Counters and the data version as if every row had come through crud
+        crud.bump_data_version(db)
+        crud.rebuild_todo_counters(db)
+    finally:
+        db.close()
+    fixtures["rows"] = rows.next_id - first_id
+    return fixtures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    spec = profile_spec(args.profile, vars(args))
+    start = time.perf_counter()
+    fixtures = generate(spec)
+    print(f"Inserted {fixtures['rows']} todos into {database.DATABASE_URL} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Compare the old and new ways of turning loaded todos into a JSON response body.
+
+The old path is what the routers used to do: build a ``schemas.TodoNested``
+field by field for every row, let FastAPI validate the result against the
+route's ``response_model`` (``serialize_response``) and encode it with the
+stdlib-based ``JSONResponse``. The new path is ``app.serializers``: plain dicts
+encoded once by pydantic-core in a ``TodoJSONResponse``.
+
+Both paths start from the same rows, already loaded through crud, so only the
+serialization is timed. The two bodies are checked to be byte-identical.
+
+Usage: python scripts/bench_serialization.py [--roots 100] [--fanout 5] [--depth 3]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Always a scratch database: seeding would otherwise write into a real one
+_tmpdir = tempfile.mkdtemp(prefix="todo-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app import crud, database, schemas  # noqa: E402
+from app.models import Todo  # noqa: E402
+from app.serializers import TodoJSONResponse, flat_dict, nested_dict  # noqa: E402
+
+
+def seed(roots: int, fanout: int, depth: int) -> int:
+    """Import ``roots`` trees, each ``fanout`` wide and ``depth`` levels below the root"""
+    rows = []
+    level = []
+    for i in range(roots):
+        rows.append({"id": len(rows) + 1, "parent_id": None, "text": f"bench root {i}"})
+        level.append(rows[-1]["id"])
+    for _ in range(depth):
+        below = []
+        for parent in level:
+            for j in range(fanout):
+                rows.append({"id": len(rows) + 1, "parent_id": parent, "text": f"bench task {parent}.{j}"})
+                below.append(rows[-1]["id"])
+        level = below
+    for index, row in enumerate(rows):
+        row.update(completed=index % 3 == 0, priority=("low", "medium", "high")[index % 3],
+                   due_date=None, user_id=None, created_at=None, updated_at=None)
+
+    db = database.SessionLocal()
+    try:
+        import_id = crud.begin_import(db)
+        for start in range(0, len(rows), 1000):
+            crud.import_todos_chunk(db, import_id, rows[start:start + 1000])
+        crud.finish_import(db, import_id)
+    finally:
+        db.close()
+    return len(rows)
+
+
+def pydantic_nested(todo, nested: bool = True) -> schemas.TodoNested:
+    """The response model the routers used to build for every row"""
+    if not nested:
+        return schemas.TodoNested(
+            id=todo.id,
+            text=todo.text,
+            completed=todo.completed,
+            due_date=todo.due_date,
+            priority=todo.priority,
+            parent_id=todo.parent_id,
+            user_id=todo.user_id,
+            created_at=todo.created_at,
+            updated_at=todo.updated_at,
+            children_count=todo.children_count,
+            children=[]
+        )
+    return schemas.TodoNested(
+        id=todo.id,
+        text=todo.text,
+        completed=todo.completed,
+        due_date=todo.due_date,
+        priority=todo.priority,
+        parent_id=todo.parent_id,
+        user_id=todo.user_id,
+        created_at=todo.created_at,
+        updated_at=todo.updated_at,
+        children_count=todo.children_count,
+        progress=schemas.TodoProgress(
+            completed=todo.descendants_completed or 0,
+            total=todo.descendants_total or 0
+        ),
+        children=[pydantic_nested(child) for child in todo.children]
+    )
+
+
+def timed(fn, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def compare(label: str, todos: list, nested: bool, repeat: int) -> dict:
+    """Time both paths over the same rows and check they produce the same bytes"""
+    field = create_response_field(name=f"Response_{label}", type_=List[schemas.TodoNested], mode="serialization")
+
+    def old() -> bytes:
+        content = asyncio.run(serialize_response(
+            field=field, response_content=[pydantic_nested(todo, nested) for todo in todos]
+        ))
+        return JSONResponse(content).body
+
+    def new() -> bytes:
+        convert = nested_dict if nested else flat_dict
+        return TodoJSONResponse([convert(todo) for todo in todos]).body
+
+    body = new()
+    if old() != body:
+        raise SystemExit(f"{label}: old and new response bodies differ")
+
+    old_ms = statistics.median(timed(old, repeat)) * 1000
+    new_ms = statistics.median(timed(new, repeat)) * 1000
+    result = {
+        "response": label,
+        "rows": count_rows(todos) if nested else len(todos),
+        "bytes": len(body),
+        "old_ms": round(old_ms, 2),
+        "new_ms": round(new_ms, 2),
+        "speedup": round(old_ms / new_ms, 1),
+    }
+    print(
+        f"{label:>5}: {result['rows']:>7} rows {result['bytes']:>10} bytes  "
+        f"old {result['old_ms']:>9} ms  new {result['new_ms']:>8} ms  {result['speedup']}x"
+    )
+    return result
+
+
+def count_rows(todos) -> int:
+    return sum(1 + count_rows(todo.children) for todo in todos)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--roots", type=int, default=100)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database.create_tables()
+    total = seed(args.roots, args.fanout, args.depth)
+    print(f"{total} todos, median of {args.repeat} runs, {database.DATABASE_URL}")
+
+    db = database.SessionLocal()
+    try:
+        # A full page of a flat listing (GET /api/todos/?nested=false, children, search)
+        page = db.query(Todo).order_by(Todo.id).limit(1000).all()
+        compare("list", page, False, args.repeat)
+        tree = crud.get_root_todos_with_children(db, limit=args.roots)
+        compare("tree", tree, True, args.repeat)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""Benchmark every /api/todos endpoint and crud function on a synthetic dataset.
+
+``run`` seeds a database with the flat, wide, deep and per-user shapes from
+``bench_data`` (cached per dataset size, so large profiles are built once),
+then times each case and writes latency percentiles and throughput as JSON.
+Every run works on a fresh copy of the cached dataset, so write cases never
+leak into the next run. Endpoints go through the full ASGI app in-process;
+crud functions get a fresh session per call, as a request would.
+
+``compare`` lines up two result files and exits non-zero if any case got
+slower than the threshold, so it can gate a change.
+
+Usage:
+  python scripts/bench_suite.py run [--profile large] [--only search] [--output results.json]
+  python scripts/bench_suite.py compare baseline.json results.json [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Always a scratch copy: the write cases would otherwise modify a real database
+_workdir = tempfile.mkdtemp(prefix="todo-bench-")
+WORK_DB = os.path.join(_workdir, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DB}"
+
+import bench_data  # noqa: E402
+from app import crud, database, schemas  # noqa: E402
+from app.main import app  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generated datasets are kept here, keyed by their sizes and the generator's source
+CACHE_DIR = os.getenv("BENCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "todo-bench-datasets"))
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench-results")
+
+# Timed calls of whole-table cases (exports, maintenance), whatever --iterations says
+HEAVY_ITERATIONS = 3
+
+# Levels of deep chains loaded per tree read; a whole 500-level chain of the large
+# profile nests deeper than the JSON encoder can recurse
+DEEP_PAGE_DEPTH = 100
+
+
+@dataclass
+class Case:
+    """One timed operation; ``call(i)`` is the i-th invocation"""
+    name: str
+    call: Callable
+    # Called once with the number of invocations, before timing (e.g. to create todos to delete)
+    setup: Optional[Callable[[int], None]] = None
+    # Whole-table work: timed HEAVY_ITERATIONS times, without a warm-up
+    heavy: bool = False
+
+
+async def request(method: str, url: str, body=None, content_type: str = "application/json") -> Tuple[int, int]:
+    """Send one request through the ASGI app; returns the status and body size.
+
+    The body is counted and dropped as it streams, so exports of millions of
+    rows are measured without being held in memory.
+    """
+    path, _, query = url.partition("?")
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", content_type.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    received = False
+    finished = asyncio.Event()
+    status = size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body or b"", "more_body": False}
+        # Streaming responses listen for a disconnect; only send one once done
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    if status >= 400:
+        raise RuntimeError(f"{method} {url} returned {status}")
+    return status, size
+
+
+def get(url: str):
+    return lambda i: request("GET", url)
+
+
+def with_session(fn):
+    """Run ``fn(db, i)`` with a session of its own, as one request would"""
+    def call(i):
+        db = database.SessionLocal()
+        try:
+            return fn(db, i)
+        finally:
+            db.close()
+    return call
+
+
+def make_todos(count: int, parent_id: Optional[int] = None) -> List[int]:
+    """Create ``count`` todos in one batch; returns their ids"""
+    db = database.SessionLocal()
+    try:
+        results = crud.apply_batch(db, [
+            (index, schemas.BatchCreate(
+                op="create", data=schemas.TodoCreate(text=f"bench scratch {index}", parent_id=parent_id)
+            ))
+            for index in range(count)
+        ])
+        return [results[index]["id"] for index in range(count)]
+    finally:
+        db.close()
+
+
+def current_version() -> int:
+    db = database.SessionLocal()
+    try:
+        return crud.get_data_version(db)
+    finally:
+        db.close()
+
+
+def import_rows(i: int, count: int = 100) -> List[dict]:
+    """``count`` export-format rows: a root and its children"""
+    return [
+        {"id": n + 1, "parent_id": None if n == 0 else 1, "text": f"imported {i}.{n}",
+         "completed": n % 2 == 0, "priority": crud.PRIORITIES[n % 3]}
+        for n in range(count)
+    ]
+
+
+def endpoint_cases(fx: dict) -> List[Case]:
+    """Every /api/todos route except the open-ended SSE stream (see get_changes)"""
+    wide, wide2 = fx["wide_roots"][0], fx["wide_roots"][1]
+    deep_root, deep_leaf = fx["deep_roots"][0], fx["deep_leaves"][0]
+    deep_mid = (deep_root + deep_leaf) // 2
+    user_root, flat = fx["user_root"], fx["flat_first"]
+    flat_mid = (fx["flat_first"] + fx["flat_last"]) // 2
+    api = "/api/todos"
+    victims, bulk_victims, since = [], [], []
+
+    def move_back_and_forth(todo_id, parent_a, parent_b):
+        return lambda i: request("POST", f"{api}/{todo_id}/move",
+                                 {"new_parent_id": parent_a if i % 2 == 0 else parent_b})
+
+    def batch(i):
+        base = flat + 10 * i
+        return request("POST", f"{api}/batch", [
+            *({"op": "create", "data": {"text": f"batch {i}.{n}", "parent_id": user_root}} for n in range(4)),
+            *({"op": "update", "id": base + n, "data": {"text": f"batch update {i}.{n}"}} for n in range(3)),
+            *({"op": "toggle", "id": base + n, "completed": i % 2 == 0} for n in range(3, 6)),
+        ])
+
+    def changes_setup(n):
+        since.append(current_version())
+        make_todos(50)
+
+    return [
+        Case("GET /api/todos/ [roots, nested]", get(f"{api}/?limit=100")),
+        Case("GET /api/todos/ [wide root, nested]",
+             get(f"{api}/?limit=1&cursor={crud.encode_cursor(wide - 1)}")),
+        Case("GET /api/todos/ [flat page]", get(f"{api}/?nested=false&limit=1000")),
+        Case("GET /api/todos/ [flat cursor]",
+             get(f"{api}/?nested=false&limit=100&cursor={crud.encode_cursor(flat_mid)}")),
+        Case("GET /api/todos/ [filtered]", get(f"{api}/?nested=false&completed=true&priority=high&limit=100")),
+        Case("GET /api/todos/ [wide children]", get(f"{api}/?parent_id={wide}&limit=1000")),
+        Case("GET /api/todos/{id} [leaf]", get(f"{api}/{flat}")),
+        Case("GET /api/todos/{id} [wide, depth 1]", get(f"{api}/{wide}?max_depth=1")),
+        Case(f"GET /api/todos/{{id}} [deep, depth {DEEP_PAGE_DEPTH}]",
+             get(f"{api}/{deep_root}?max_depth={DEEP_PAGE_DEPTH}")),
+        Case("GET /api/todos/{id}/ancestors [deep leaf]", get(f"{api}/{deep_leaf}/ancestors")),
+        Case("GET /api/todos/{id}/children [wide]", get(f"{api}/{wide}/children")),
+        Case("GET /api/todos/search/", get(f"{api}/search/?q=plan&limit=100")),
+        Case("GET /api/todos/search/ [highlight]", get(f"{api}/search/?q=bud&highlight=true&limit=100")),
+        Case("GET /api/todos/stats/", get(f"{api}/stats/")),
+        Case("GET /api/todos/stats/ [root only]", get(f"{api}/stats/?root_only=true&tz=UTC")),
+        Case("GET /api/todos/ [due today]", get(f"{api}/?due=today&tz=UTC&limit=100")),
+        Case("GET /api/todos/ [overdue, flat]", get(f"{api}/?due=overdue&nested=false&limit=100")),
+        Case("GET /api/todos/changes", lambda i: request("GET", f"{api}/changes?since={since[0]}"),
+             setup=changes_setup),
+        Case("POST /api/todos/", lambda i: request("POST", f"{api}/", {"text": f"bench {i}", "parent_id": wide2})),
+        Case("PUT /api/todos/{id}", lambda i: request("PUT", f"{api}/{flat + i}", {"text": f"renamed {i}"})),
+        Case("PATCH /api/todos/{id}/toggle",
+             lambda i: request("PATCH", f"{api}/{flat + i}/toggle", {"completed": i % 2 == 0})),
+        Case("PATCH /api/todos/{id}/toggle [cascade, user tree]",
+             lambda i: request("PATCH", f"{api}/{user_root}/toggle", {"completed": i % 2 == 0, "cascade": True})),
+        Case("PATCH /api/todos/{id}/toggle [cascade, wide root]",
+             lambda i: request("PATCH", f"{api}/{wide}/toggle", {"completed": i % 2 == 0, "cascade": True})),
+        Case("POST /api/todos/{id}/move [leaf]", move_back_and_forth(fx["wide_child"], wide2, wide)),
+        Case("POST /api/todos/{id}/move [deep subtree]", move_back_and_forth(deep_mid, None, deep_mid - 1)),
+        Case("POST /api/todos/move [10 moves]", lambda i: request("POST", f"{api}/move", {"moves": [
+            {"todo_id": flat_mid + 10 * i + n, "new_parent_id": wide2} for n in range(10)
+        ]})),
+        Case("POST /api/todos/batch [10 ops]", batch),
+        Case("DELETE /api/todos/{id}", lambda i: request("DELETE", f"{api}/{victims[i]}"),
+             setup=lambda n: victims.extend(make_todos(n, parent_id=wide2))),
+        Case("DELETE /api/todos/bulk/ [10 ids]",
+             lambda i: request("DELETE", f"{api}/bulk/", {"ids": bulk_victims[10 * i:10 * i + 10]}),
+             setup=lambda n: bulk_victims.extend(make_todos(10 * n))),
+        Case("POST /api/todos/{id}/ai-subtasks", lambda i: request("POST", f"{api}/{flat + i}/ai-subtasks")),
+        Case("POST /api/todos/ai-subtasks [10 parents]", lambda i: request("POST", f"{api}/ai-subtasks", {
+            "todo_ids": [flat + 10 * i + n for n in range(10)]
+        })),
+        Case("POST /api/todos/import [100 rows]", lambda i: request(
+            "POST", f"{api}/import", b"".join(json.dumps(row).encode() + b"\n" for row in import_rows(i)),
+            content_type="application/x-ndjson"
+        )),
+        Case("GET /api/todos/export [ndjson]", get(f"{api}/export"), heavy=True),
+        Case("GET /api/todos/export [csv]", get(f"{api}/export?format=csv"), heavy=True),
+    ]
+
+
+def crud_cases(fx: dict) -> List[Case]:
+    """Every public crud function, with the dataset shape it is most sensitive to"""
+    wide, wide2 = fx["wide_roots"][0], fx["wide_roots"][1]
+    deep_root, deep_leaf = fx["deep_roots"][0], fx["deep_leaves"][0]
+    user_root, flat = fx["user_root"], fx["flat_first"]
+    flat_mid = (fx["flat_first"] + fx["flat_last"]) // 2
+    user_id = fx["user_ids"][len(fx["user_ids"]) // 2]
+    # Later flat rows than the endpoint cases touch, so each case starts clean
+    flat_writes = flat_mid + 5000
+    victims, bulk_victims, batch_victims, since = [], [], [], []
+    # A chain the endpoint cases leave alone
+    chain_root, chain_leaf = fx["deep_roots"][-1], fx["deep_leaves"][-1]
+
+    def import_todos(db, i):
+        import_id = crud.begin_import(db)
+        crud.import_todos_chunk(db, import_id, [
+            {**row, "due_date": None, "user_id": None, "created_at": None, "updated_at": None}
+            for row in import_rows(i)
+        ])
+        crud.finish_import(db, import_id)
+
+    def apply_batch(db, i):
+        crud.apply_batch(db, [
+            *((n, schemas.BatchCreate(op="create", data=schemas.TodoCreate(text=f"batch {i}", parent_id=user_root)))
+              for n in range(4)),
+            *((4 + n, schemas.BatchUpdate(op="update", id=flat_writes + 10 * i + n,
+                                          data=schemas.TodoUpdate(parent_id=wide2)))
+              for n in range(3)),
+            *((7 + n, schemas.BatchToggle(op="toggle", id=flat_writes + 10 * i + 3 + n, completed=True))
+              for n in range(2)),
+            (9, schemas.BatchDelete(op="delete", id=batch_victims[i])),
+        ])
+
+    def export_todos(db, i):
+        for _ in db.execute(crud.export_todos_query().execution_options(yield_per=1000)):
+            pass
+
+    return [
+        Case("crud.get_todo", with_session(lambda db, i: crud.get_todo(db, flat + i))),
+        Case("crud.get_todo_with_children [wide]", with_session(lambda db, i: crud.get_todo_with_children(db, wide))),
+        Case(f"crud.get_todo_with_children [deep, depth {DEEP_PAGE_DEPTH}]", with_session(
+            lambda db, i: crud.get_todo_with_children(db, deep_root, max_depth=DEEP_PAGE_DEPTH))),
+        Case("crud.get_ancestors [deep leaf]",
+             with_session(lambda db, i: crud.get_ancestors(db, crud.get_todo(db, deep_leaf)))),
+        Case("crud.get_todos [roots]", with_session(lambda db, i: crud.get_todos(db, limit=1000))),
+        Case("crud.get_todos [wide children]",
+             with_session(lambda db, i: crud.get_todos(db, parent_id=wide, limit=1000))),
+        Case("crud.get_todos [user]", with_session(lambda db, i: crud.get_todos(db, user_id=user_id))),
+        Case("crud.get_todos [cursor]", with_session(
+            lambda db, i: crud.get_todos(db, cursor=crud.encode_cursor(flat_mid)))),
+        Case("crud.get_root_todos_with_children", with_session(lambda db, i: crud.get_root_todos_with_children(db))),
+        Case("crud.search_todos", with_session(lambda db, i: crud.search_todos(db, "plan"))),
+        Case("crud.search_todos [highlight]",
+             with_session(lambda db, i: crud.search_todos(db, "bud", highlight=True))),
+        Case("crud.get_todo_stats", with_session(lambda db, i: crud.get_todo_stats(db))),
+        Case("crud.get_todo_stats [user]", with_session(lambda db, i: crud.get_todo_stats(db, user_id=user_id))),
+        Case("crud.get_todo_stats [root only]", with_session(lambda db, i: crud.get_todo_stats(db, root_only=True))),
+        Case("crud.get_todos [due this week]", with_session(lambda db, i: crud.get_todos(db, due="this_week"))),
+        Case("crud.get_data_version", with_session(lambda db, i: crud.get_data_version(db))),
+        Case("crud.get_changes", with_session(lambda db, i: crud.get_changes(db, since[0])),
+             setup=lambda n: since.append(current_version() - 20)),
+        Case("crud.is_descendant [deep]", with_session(lambda db, i: crud.is_descendant(db, deep_leaf, deep_root))),
+        Case("crud.check_moves [deep]",
+             with_session(lambda db, i: crud.check_moves(db, [(deep_root, deep_leaf), (deep_leaf, wide)]))),
+        Case("crud.create_todo", with_session(
+            lambda db, i: crud.create_todo(db, schemas.TodoCreate(text=f"bench {i}", parent_id=wide2)))),
+        Case("crud.update_todo", with_session(
+            lambda db, i: crud.update_todo(db, flat_writes - 1000 - i, schemas.TodoUpdate(text=f"renamed {i}")))),
+        Case("crud.toggle_todo_completion", with_session(
+            lambda db, i: crud.toggle_todo_completion(db, flat_writes - 1000 - i, i % 2 == 0))),
+        Case("crud.toggle_todo_completion [cascade, wide root]", with_session(
+            lambda db, i: crud.toggle_todo_completion(db, wide, i % 2 == 0, cascade=True))),
+        Case("crud.move_todo [deep subtree]", with_session(
+            lambda db, i: crud.move_todo(db, chain_leaf - DEEP_PAGE_DEPTH, None if i % 2 == 0 else chain_root))),
+        Case("crud.delete_todo", with_session(lambda db, i: crud.delete_todo(db, victims[i])),
+             setup=lambda n: victims.extend(make_todos(n, parent_id=wide2))),
+        Case("crud.bulk_delete_todos [10 ids]",
+             with_session(lambda db, i: crud.bulk_delete_todos(db, bulk_victims[10 * i:10 * i + 10])),
+             setup=lambda n: bulk_victims.extend(make_todos(10 * n))),
+        Case("crud.apply_batch [10 ops]", with_session(apply_batch),
+             setup=lambda n: batch_victims.extend(make_todos(n))),
+        Case("crud.generate_ai_subtasks", with_session(lambda db, i: crud.generate_ai_subtasks(db, flat_writes + i))),
+        Case("crud.import [100 rows]", with_session(import_todos)),
+        Case("crud.export_todos_query", with_session(export_todos), heavy=True),
+        Case("crud.verify_todo_paths", with_session(lambda db, i: crud.verify_todo_paths(db)), heavy=True),
+        Case("crud.rebuild_todo_counters", with_session(lambda db, i: crud.rebuild_todo_counters(db)), heavy=True),
+        Case("crud.rebuild_todo_paths", with_session(lambda db, i: crud.rebuild_todo_paths(db)), heavy=True),
+        # Restore-only; last because it drops the change history
+        Case("crud.reset_data_version",
+             with_session(lambda db, i: crud.reset_data_version(db, crud.get_data_version(db))), heavy=True),
+    ]
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Latency percentiles in ms and completed calls per second"""
+    ordered = sorted(latencies)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "ops_per_s": round(len(ordered) / elapsed, 1),
+    }
+
+
+async def measure(case: Case, iterations: int, max_seconds: float, concurrency: int) -> dict:
+    """Time ``case``: up to ``iterations`` calls or ``max_seconds``, ``concurrency`` at a time.
+
+    Async calls (endpoints) share the event loop; sync calls (crud) run one
+    after another, as each holds the thread.
+    """
+    count = min(iterations, HEAVY_ITERATIONS) if case.heavy else iterations
+    warmup = 0 if case.heavy else 1
+    if case.setup:
+        case.setup(count + warmup)
+    if warmup:
+        result = case.call(0)
+        if asyncio.iscoroutine(result):
+            await result
+
+    latencies = []
+    next_index = warmup
+    deadline = time.perf_counter() + max_seconds
+
+    async def worker():
+        nonlocal next_index
+        while next_index < count + warmup and (not latencies or time.perf_counter() < deadline):
+            index, next_index = next_index, next_index + 1
+            start = time.perf_counter()
+            result = case.call(index)
+            if asyncio.iscoroutine(result):
+                await result
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def dataset_key(spec: dict) -> str:
+    """Cache key: the sizes plus the generator's source, so generator changes rebuild"""
+    with open(bench_data.__file__, "rb") as f:
+        source = f.read()
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode() + source).hexdigest()[:16]
+
+
+def prepare_dataset(spec: dict, rebuild: bool) -> dict:
+    """Copy the cached dataset for ``spec`` into the work database, generating it if needed"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cached = os.path.join(CACHE_DIR, f"{dataset_key(spec)}.db")
+    if rebuild or not os.path.exists(cached + ".json"):
+        start = time.perf_counter()
+        fixtures = bench_data.generate(spec)
+        print(f"Generated {fixtures['rows']} todos in {time.perf_counter() - start:.1f}s")
+        # Fold the WAL into the file before copying it
+        database.engine.dispose()
+        conn = sqlite3.connect(WORK_DB)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        shutil.copy(WORK_DB, cached + ".tmp")
+        os.replace(cached + ".tmp", cached)
+        with open(cached + ".json", "w") as f:
+            json.dump(fixtures, f)
+        return fixtures
+
+    shutil.copy(cached, WORK_DB)
+    database.create_tables()
+    with open(cached + ".json") as f:
+        fixtures = json.load(f)
+    print(f"Using cached dataset of {fixtures['rows']} todos ({cached})")
+    return fixtures
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_cases(cases: List[Case], args) -> dict:
+    results = {}
+    for case in cases:
+        try:
+            result = await measure(case, args.iterations, args.max_seconds, args.concurrency)
+        except Exception as e:
+            # Keep going; a failing case is reported rather than ending the run
+            results[case.name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{case.name:<58} ERROR {results[case.name]['error']}")
+            continue
+        results[case.name] = result
+        print(
+            f"{case.name:<58} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+            f"{result['ops_per_s']:>8.1f} ops/s"
+        )
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    return results
+
+
+def run(args) -> int:
+    spec = bench_data.profile_spec(args.profile, vars(args))
+    fixtures = prepare_dataset(spec, args.rebuild)
+
+    cases = endpoint_cases(fixtures) + crud_cases(fixtures)
+    if args.only:
+        cases = [case for case in cases if any(term in case.name for term in args.only)]
+    print(f"{len(cases)} cases, up to {args.iterations} calls or {args.max_seconds}s each")
+    results = asyncio.run(run_cases(cases, args))
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "profile": args.profile,
+            "spec": spec,
+            "rows": fixtures["rows"],
+            "iterations": args.iterations,
+            "max_seconds": args.max_seconds,
+            "concurrency": args.concurrency,
+            "stats_counters": crud.STATS_COUNTERS_ENABLED,
+            "fts": database.FTS_ENABLED,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}-{args.profile}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return 1 if any("error" in result for result in results.values()) else 0
+
+
+def compare(args) -> int:
+    """Print both runs side by side; non-zero exit if any case regressed"""
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.current) as f:
+        new = json.load(f)
+    if old["meta"]["spec"] != new["meta"]["spec"]:
+        print("Warning: the runs used different datasets; differences may not be regressions\n")
+
+    metric = args.metric
+    regressions = 0
+    print(f"{'case':<58} {'old ' + metric:>14} {'new ' + metric:>14} {'change':>9}")
+    for name in list(old["results"]) + [name for name in new["results"] if name not in old["results"]]:
+        before, after = old["results"].get(name), new["results"].get(name)
+        if not before or not after or "error" in before or "error" in after:
+            state = "missing" if not before or not after else "error"
+            print(f"{name:<58} {state:>14}")
+            continue
+        a, b = before[metric], after[metric]
+        change = (b - a) / a if a else 0.0
+        if change > args.threshold and b - a >= args.min_delta_ms:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -args.threshold and a - b >= args.min_delta_ms:
+            flag = "  faster"
+        else:
+            flag = ""
+        print(f"{name:<58} {a:>14.3f} {b:>14.3f} {change:>+8.1%}{flag}")
+
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%} in {metric}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a dataset and benchmark every case")
+    bench_data.add_spec_arguments(run_parser)
+    run_parser.add_argument("--iterations", type=int, default=20, help="Timed calls per case")
+    run_parser.add_argument("--max-seconds", type=float, default=5.0, help="Stop a case early after this long")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="Endpoint calls in flight at once")
+    run_parser.add_argument("--only", action="append", help="Only cases whose name contains this (repeatable)")
+    run_parser.add_argument("--output", help=f"Results file (default: a timestamped file in {RESULTS_DIR})")
+    run_parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached dataset")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--metric", default="p50_ms",
+                                choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown that fails")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                                help="Ignore changes smaller than this, however large relatively")
+
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,12 @@ def main():
         print("  format     - Format code with black and isort")
         print("  lint       - Run linting")
         print("  test       - Run tests")
+        print("  migrate    - Upgrade the database to the latest migration")
+        print("  plans      - Check that no crud query does a full table scan")
+        print("  bench      - Benchmark every endpoint and crud function (run | compare OLD NEW)")
+        print("  bench-async - Compare sync and async database paths under load")
+        print("  bench-serialize - Compare pydantic and fast serialization of list and tree responses")
+        print("  tree       - Verify (--verify) or rebuild the materialized todo paths")
         return 1
 
     command = sys.argv[1]
@@ -27,7 +33,7 @@ def main():
     if command == "install":
         # Install main dependencies
         main_deps = [
-            "fastapi", "uvicorn[standard]", "sqlalchemy", "alembic", 
+            "fastapi", "uvicorn[standard]", "sqlalchemy[asyncio]", "aiosqlite", "alembic", 
             "python-dotenv", "pydantic", "python-multipart", 
             "python-jose[cryptography]", "passlib[bcrypt]", "python-dateutil"
         ]
@@ -53,6 +59,24 @@ def main():
     elif command == "test":
         return run_command(["uv", "run", "pytest"])
     
+    elif command == "migrate":
+        return run_command(["uv", "run", "alembic", "upgrade", "head"])
+    
+    elif command == "plans":
+        return run_command(["uv", "run", "pytest", "tests/test_query_plans.py"])
+    
+    elif command == "bench":
+        return run_command(["uv", "run", "python", "scripts/bench_suite.py"] + (sys.argv[2:] or ["run"]))
+    
+    elif command == "bench-async":
+        return run_command(["uv", "run", "python", "scripts/bench_async.py"] + sys.argv[2:])
+    
+    elif command == "bench-serialize":
+        return run_command(["uv", "run", "python", "scripts/bench_serialization.py"] + sys.argv[2:])
+    
+    elif command == "tree":
+        return run_command(["uv", "run", "python", "scripts/rebuild_tree.py"] + sys.argv[2:])
+    
     else:
         print(f"Unknown command: {command}")
         return 1
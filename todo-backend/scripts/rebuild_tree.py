@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Verify or rebuild the materialized todo paths (todos.path / todos.depth).
+
+Paths are maintained by the API on create and move. Rows written some other
+way (raw SQL, an uploaded database, a partial restore) can leave them stale;
+this recomputes them from parent_id. Todos no root reaches (a parent that was
+deleted, a parent_id cycle) are made roots first.
+
+Usage: python scripts/rebuild_tree.py [--verify]  (or: python scripts/dev.py tree)
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, database  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verify", action="store_true", help="only report drifted todos, exit 1 if any")
+    args = parser.parse_args()
+
+    database.create_tables()
+    db = database.SessionLocal()
+    try:
+        drifted = crud.verify_todo_paths(db)
+        print(f"{len(drifted)} todos with a stale path" + (f": {drifted[:20]}" if drifted else ""))
+        if args.verify or not drifted:
+            return 1 if drifted else 0
+
+        rerooted = crud.reroot_unreachable_todos(db)
+        if rerooted:
+            print(f"Made {len(rerooted)} unreachable todos roots: {rerooted[:20]}")
+        print(f"Rebuilt {crud.rebuild_todo_paths(db)} paths")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
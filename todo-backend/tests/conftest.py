@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The engines are created on import, so point them at a scratch database first
+_tmpdir = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import crud, database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Job, Todo, TodoChange, TodoCounter, TodoImportRow  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    database.create_tables()
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(db):
+    """Every test starts from an empty database"""
+    for model in (Todo, TodoChange, TodoCounter, Job, TodoImportRow):
+        db.query(model).delete()
+    db.commit()
+
+
+@pytest.fixture
+def counters(db, monkeypatch):
+    """Maintain the materialized counters, so tests can check them"""
+    monkeypatch.setattr(crud, "STATS_COUNTERS_ENABLED", True)
+    crud.rebuild_todo_counters(db)
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager: no startup, so no background job workers
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_todo(client):
+    """Create a todo through the API; returns its id"""
+    def make(text="todo", parent_id=None, **fields):
+        response = client.post("/api/todos/", json={"text": text, "parent_id": parent_id, **fields})
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return make
+
+
+@pytest.fixture
+def assert_consistent(db):
+    """Check that stored paths match parent_id, and the counters (if kept) a recount"""
+    def check():
+        db.expire_all()
+        assert crud.verify_todo_paths(db) == []
+        if crud.STATS_COUNTERS_ENABLED:
+            stored = crud.get_todo_stats(db)
+            crud.STATS_COUNTERS_ENABLED = False
+            try:
+                assert stored == crud.get_todo_stats(db)
+            finally:
+                crud.STATS_COUNTERS_ENABLED = True
+    return check
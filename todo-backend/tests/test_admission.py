@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from app.admission import AdmissionMiddleware
+
+
+async def ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def test_only_exempt_paths_bypass_the_limits():
+    # No slots and no queue: every limited request is shed at once
+    client = TestClient(AdmissionMiddleware(ok, read_limit=0, read_queue=0))
+    event_stream = {"Accept": "text/event-stream"}
+
+    assert client.get("/api/todos/changes/stream", headers=event_stream).status_code == 200
+    assert client.get("/health").status_code == 200
+    assert client.get("/api/todos/", headers=event_stream).status_code == 503
+    assert client.get("/api/todos/").status_code == 503
@@ -0,0 +1,79 @@
+import pytest
+
+from app import crud, jobs
+
+TEXTS = [
+    ("Plan the gym session", "high"),
+    ("Buy a study guide", "low"),
+    ("Go shopping after work", "medium"),
+    ("gymeeting notes", "medium"),
+    ("Water the plants", "high"),
+]
+
+
+def reference_template(text):
+    """The rules applied one by one, highest priority first"""
+    for keywords, template in crud.AI_KEYWORD_RULES:
+        if any(keyword in text.lower() for keyword in keywords):
+            return crud.AI_SUBTASK_TEMPLATES[template]
+    return crud.AI_GENERIC_SUBTASKS
+
+
+@pytest.mark.parametrize("text", [
+    *[text for text, _ in TEXTS], "Projecting the budget", "READ a book", "Cooking class",
+    "shop", "exercising", "meetings", "forget it", "",
+])
+def test_the_keyword_matcher_agrees_with_the_rules(text):
+    assert crud.ai_subtask_template(text) == reference_template(text)
+
+
+def shape(result):
+    """A generated result without the ids and timestamps, which differ per run"""
+    return (result["message"], [
+        (subtask["text"], subtask["priority"], subtask["completed"], subtask["children_count"])
+        for subtask in result["generated_subtasks"]
+    ])
+
+
+def test_batch_matches_generating_one_todo_at_a_time(client, make_todo):
+    singles = [make_todo(text, priority=priority) for text, priority in TEXTS]
+    batched = [make_todo(text, priority=priority) for text, priority in TEXTS]
+
+    one_by_one = [client.post(f"/api/todos/{todo_id}/ai-subtasks?max_subtasks=4").json() for todo_id in singles]
+    response = client.post("/api/todos/ai-subtasks", json={
+        "todo_ids": [*batched, 9999, batched[0]], "max_subtasks": 4
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["missing"] == [9999]
+    assert [result["parent_todo_id"] for result in body["results"]] == batched
+    assert [shape(result) for result in body["results"]] == [shape(result) for result in one_by_one]
+
+
+def test_batch_returns_the_stored_subtasks(client, make_todo):
+    parents = [make_todo(text, priority=priority) for text, priority in TEXTS[:2]]
+
+    results = client.post("/api/todos/ai-subtasks", json={"todo_ids": parents}).json()["results"]
+
+    for parent, result in zip(parents, results):
+        # Built from the INSERT ... RETURNING values; they must equal a fresh read
+        stored = client.get(f"/api/todos/?parent_id={parent}&nested=false").json()
+        assert result["generated_subtasks"] == [{key: todo[key] for key in result["generated_subtasks"][0]}
+                                                for todo in stored]
+        assert client.get(f"/api/todos/{parent}").json()["children_count"] == len(stored)
+
+
+def test_background_batch_has_the_same_result(client, make_todo, monkeypatch, assert_consistent):
+    monkeypatch.setattr("app.routers.todos.JOB_CHUNK_SIZE", 2)
+    inline = [make_todo(text, priority=priority) for text, priority in TEXTS]
+    queued = [make_todo(text, priority=priority) for text, priority in TEXTS]
+
+    expected = client.post("/api/todos/ai-subtasks", json={"todo_ids": inline}).json()
+    response = client.post("/api/todos/ai-subtasks?background=true", json={"todo_ids": queued})
+    assert response.status_code == 202
+    assert jobs.run_next()
+    result = client.get(response.headers["Location"]).json()["result"]
+
+    assert [shape(r) for r in result["results"]] == [shape(r) for r in expected["results"]]
+    assert_consistent()
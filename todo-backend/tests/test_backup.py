@@ -0,0 +1,67 @@
+import gzip
+
+import pytest
+
+from app.routers import maintain_db
+
+TOKEN = maintain_db.ADMIN_TOKEN
+
+
+def download(client, compress=False):
+    response = client.get(f"/api/admin/db?token={TOKEN}&compress={str(compress).lower()}")
+    assert response.status_code == 200
+    return response.content
+
+
+def upload(client, content, content_type="application/octet-stream"):
+    return client.post("/api/admin/db", data={"token": TOKEN},
+                       files={"file": ("todos.db", content, content_type)})
+
+
+def texts(client):
+    return sorted(todo["text"] for todo in client.get("/api/todos/").json())
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_backup_restores_the_snapshot(client, make_todo, compress):
+    a = make_todo("A")
+    make_todo("B", parent_id=a)
+    backup = download(client, compress)
+    assert backup.startswith(maintain_db.GZIP_MAGIC) is compress
+    version = client.get("/api/todos/changes?since=0").json()["version"]
+
+    client.delete(f"/api/todos/{a}")
+    make_todo("written after the backup")
+
+    response = upload(client, backup, "application/gzip" if compress else "application/octet-stream")
+
+    assert response.status_code == 200, response.text
+    assert texts(client) == ["A"]
+    assert client.get(f"/api/todos/{a}").json()["children"][0]["text"] == "B"
+    # Clients synced past the backup start over rather than miss the rollback
+    assert client.get(f"/api/todos/changes?since={version}").json()["reset"] is True
+
+
+@pytest.mark.parametrize("content", [
+    b"not a database at all",
+    gzip.compress(b"not a database at all"),
+    b"\x1f\x8b" + b"corrupt gzip stream",
+], ids=["garbage", "gzipped-garbage", "bad-gzip"])
+def test_corrupt_uploads_are_rejected(client, make_todo, content):
+    make_todo("A")
+
+    response = upload(client, content)
+
+    assert response.status_code == 400
+    assert texts(client) == ["A"]
+
+
+def test_truncated_backup_is_rejected(client, make_todo):
+    for i in range(200):
+        make_todo(f"todo {i}")
+    backup = download(client)
+
+    response = upload(client, backup[:len(backup) // 2])
+
+    assert response.status_code == 400
+    assert client.get("/api/todos/stats/").json()["total"] == 200
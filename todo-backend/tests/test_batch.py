@@ -0,0 +1,86 @@
+def child_ids(client, todo_id):
+    return [child["id"] for child in client.get(f"/api/todos/{todo_id}").json()["children"]]
+
+
+def test_move_after_its_reversal(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    x = make_todo("X", parent_id=a)
+
+    response = client.post("/api/todos/batch", json=[
+        {"op": "update", "id": a, "data": {"text": "A renamed"}},
+        {"op": "update", "id": x, "data": {"parent_id": None}},
+        {"op": "update", "id": a, "data": {"parent_id": x}},
+    ])
+
+    assert response.status_code == 200
+    assert response.json()["applied"] == 3
+    assert_consistent()
+    assert child_ids(client, x) == [a]
+    assert client.get(f"/api/todos/{a}").json()["text"] == "A renamed"
+
+
+def test_moves_are_applied_in_order(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+
+    # Reverse the chain a > b > c into c > b > a, one step at a time
+    response = client.post("/api/todos/batch", json=[
+        {"op": "update", "id": c, "data": {"parent_id": None}},
+        {"op": "update", "id": b, "data": {"parent_id": c}},
+        {"op": "update", "id": a, "data": {"parent_id": b}},
+    ])
+
+    assert response.json()["applied"] == 3
+    assert_consistent()
+    assert child_ids(client, c) == [b]
+    assert child_ids(client, b) == [a]
+
+
+def test_mixed_batch_keeps_paths_and_counters(client, make_todo, counters, assert_consistent):
+    root = make_todo("root")
+    child = make_todo("child", parent_id=root)
+    leaf = make_todo("leaf", parent_id=child)
+    other = make_todo("other", priority="high")
+
+    response = client.post("/api/todos/batch", json=[
+        {"op": "create", "data": {"text": "new", "parent_id": leaf}},
+        {"op": "create", "data": {"text": "new root", "priority": "low"}},
+        {"op": "toggle", "id": child, "completed": True},
+        {"op": "update", "id": child, "data": {"parent_id": other}},
+        {"op": "delete", "id": root},
+        {"op": "delete", "id": 999999},
+    ])
+
+    body = response.json()
+    assert (body["applied"], body["failed"]) == (5, 1)
+    created = [result["id"] for result in body["results"][:2]]
+    assert created == sorted(created)
+    assert client.get(f"/api/todos/{root}").status_code == 404
+    assert child_ids(client, other) == [child]
+    assert_consistent()
+
+
+def test_atomic_batch_writes_nothing_on_failure(client, make_todo, assert_consistent):
+    a = make_todo("A")
+
+    response = client.post("/api/todos/batch?atomic=true", json=[
+        {"op": "update", "id": a, "data": {"text": "changed"}},
+        {"op": "delete", "id": 999999},
+    ])
+
+    assert response.json()["applied"] == 0
+    assert client.get(f"/api/todos/{a}").json()["text"] == "A"
+    assert_consistent()
+
+
+def test_move_into_own_subtree_is_rejected(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    x = make_todo("X", parent_id=a)
+
+    response = client.post("/api/todos/batch", json=[
+        {"op": "update", "id": a, "data": {"parent_id": x}},
+    ])
+
+    assert response.json()["results"][0]["error"] == "Cannot move todo to its own descendant"
+    assert_consistent()
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import crud, database, jobs
+from app.models import Job, Todo
+from app.routers import todos
+
+
+def orphans(db):
+    """Todos whose parent_id points at a row that no longer exists"""
+    parent = aliased(Todo)
+    return db.scalars(
+        select(Todo.id)
+        .outerjoin(parent, parent.id == Todo.parent_id)
+        .where(Todo.parent_id.is_not(None), parent.id.is_(None))
+    ).all()
+
+
+def seed_tree(make_todo):
+    """Two three-level trees and a bystander; returns (a, a1, a1x, b, b1, keep)"""
+    a = make_todo("A")
+    a1 = make_todo("A1", parent_id=a)
+    a1x = make_todo("A1x", parent_id=a1)
+    b = make_todo("B")
+    b1 = make_todo("B1", parent_id=b)
+    keep = make_todo("keep")
+    make_todo("keep child", parent_id=keep)
+    return a, a1, a1x, b, b1, keep
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_bulk_delete_takes_the_descendants_along(client, db, make_todo, counters, assert_consistent,
+                                                 monkeypatch, background):
+    # One id per chunk, so the background job commits between the subtrees
+    monkeypatch.setattr(todos, "JOB_CHUNK_SIZE", 1)
+    a, a1, a1x, b, b1, keep = seed_tree(make_todo)
+
+    # a1 sits under a: it goes with its ancestor and must not be counted twice
+    response = client.request("DELETE", f"/api/todos/bulk/?background={str(background).lower()}",
+                              json={"ids": [a, a1, b1]})
+    if background:
+        assert response.status_code == 202
+        assert jobs.run_next()
+        result = client.get(response.headers["Location"]).json()["result"]
+    else:
+        result = response.json()
+
+    assert result["deleted_count"] == 4
+    db.expire_all()
+    assert [text for (text,) in db.query(Todo.text).order_by(Todo.id)] == ["B", "keep", "keep child"]
+    assert orphans(db) == []
+    assert client.get(f"/api/todos/{b}").json()["children_count"] == 0
+    assert_consistent()
+
+
+def test_bulk_delete_logs_every_removed_todo(client, make_todo):
+    a, a1, a1x, b, b1, keep = seed_tree(make_todo)
+    since = client.get("/api/todos/changes?since=0").json()["version"]
+
+    client.request("DELETE", "/api/todos/bulk/", json={"ids": [a, b]})
+
+    feed = client.get(f"/api/todos/changes?since={since}").json()
+    assert sorted(change["todo_id"] for change in feed["changes"] if change["op"] == "delete") == [a, a1, a1x, b, b1]
+
+
+def test_job_progress_counts_only_committed_chunks(client, db, make_todo, monkeypatch):
+    monkeypatch.setattr(todos, "JOB_CHUNK_SIZE", 1)
+    ids = [make_todo(f"root {i}") for i in range(4)]
+    for todo_id in ids:
+        make_todo("child", parent_id=todo_id)
+    job_id = client.request("DELETE", "/api/todos/bulk/?background=true", json={"ids": ids}).json()["job_id"]
+    delete_subtrees = crud.delete_subtrees
+    seen = []
+
+    def observed(session, root_ids, *args):
+        # What a poller sees before each chunk: progress and deletes agree
+        with database.SessionLocal() as other:
+            roots_left = other.query(Todo).filter(Todo.parent_id.is_(None)).count()
+            seen.append((other.get(Job, job_id).progress, len(ids) - roots_left))
+        if len(seen) == 3:
+            raise ValueError("disk full")
+        return delete_subtrees(session, root_ids, *args)
+
+    monkeypatch.setattr(crud, "delete_subtrees", observed)
+    assert jobs.run_next()
+
+    assert seen == [(0, 0), (1, 1), (2, 2)]
+    job = client.get(f"/api/jobs/{job_id}").json()
+    assert (job["status"], job["progress"], job["error"]) == ("failed", 2, "disk full")
+    assert orphans(db) == []
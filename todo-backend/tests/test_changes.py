@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+from app import crud
+from app.routers import todos
+
+
+def changes(client, since):
+    response = client.get(f"/api/todos/changes?since={since}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_since_cursor_round_trip(client, make_todo):
+    start = changes(client, 0)["version"]
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+
+    feed = changes(client, start)
+    assert [(change["op"], change["todo_id"]) for change in feed["changes"]] == [("insert", a), ("insert", b)]
+    assert [todo["id"] for todo in feed["todos"]] == [a, b]
+
+    # Passing the returned version back gives only what happened since
+    client.put(f"/api/todos/{a}", json={"text": "renamed"})
+    later = changes(client, feed["version"])
+    assert [(change["op"], change["todo_id"]) for change in later["changes"]] == [("update", a)]
+    assert later["todos"][0]["text"] == "renamed"
+    assert changes(client, later["version"])["changes"] == []
+
+
+def test_deletes_are_logged_for_the_whole_subtree(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+    since = changes(client, 0)["version"]
+
+    client.delete(f"/api/todos/{a}")
+
+    feed = changes(client, since)
+    assert sorted((change["op"], change["todo_id"]) for change in feed["changes"]) == [
+        ("delete", a), ("delete", b), ("delete", c)
+    ]
+    # Deleted todos have no current state to send
+    assert feed["todos"] == []
+
+
+def test_history_older_than_the_retention_asks_for_a_reset(client, make_todo, monkeypatch):
+    make_todo("A")
+    make_todo("B")
+    monkeypatch.setattr(crud, "CHANGE_LOG_RETENTION", 1)
+
+    feed = changes(client, 0)
+
+    assert feed["reset"] is True
+    assert feed["changes"] == []
+
+
+class StreamRequest:
+    """Enough of a Request for stream_changes; disconnects after ``polls`` polls"""
+
+    def __init__(self, polls=1, last_event_id=None):
+        self.headers = {"last-event-id": last_event_id} if last_event_id else {}
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def stream(request, since=0):
+    async def read():
+        response = await todos.stream_changes(request, since=since)
+        return [chunk async for chunk in response.body_iterator]
+    return asyncio.run(read())
+
+
+def test_stream_sends_changes_as_events(client, make_todo, monkeypatch):
+    monkeypatch.setattr(todos, "CHANGE_STREAM_HEARTBEAT", 0.01)
+    since = changes(client, 0)["version"]
+    a = make_todo("A")
+
+    event, keep_alive = stream(StreamRequest(), since=since)
+
+    version = changes(client, 0)["version"]
+    lines = event.splitlines()
+    assert lines[:2] == [f"id: {version}", "event: changes"]
+    payload = json.loads(lines[2].removeprefix("data: "))
+    assert [change["todo_id"] for change in payload["changes"]] == [a]
+    assert keep_alive == ": keep-alive\n\n"
+
+    # A reconnecting client resumes from Last-Event-ID, so it gets nothing twice
+    assert stream(StreamRequest(last_event_id=str(version))) == [": keep-alive\n\n"]
+
+
+def test_commits_wake_a_waiting_stream(client, monkeypatch):
+    monkeypatch.setattr(todos, "CHANGE_STREAM_HEARTBEAT", 30)
+    since = changes(client, 0)["version"]
+
+    async def read():
+        response = await todos.stream_changes(StreamRequest(polls=2), since=since)
+        chunks = response.body_iterator
+        first = asyncio.ensure_future(chunks.__anext__())
+        await asyncio.sleep(0.05)
+        await asyncio.to_thread(client.post, "/api/todos/", json={"text": "A"})
+        # Well before the heartbeat: the commit itself wakes the stream
+        event = await asyncio.wait_for(first, timeout=5)
+        await chunks.aclose()
+        return event
+
+    assert asyncio.run(read()).splitlines()[1] == "event: changes"
@@ -0,0 +1,45 @@
+from sqlalchemy import func
+
+from app.models import Todo
+
+
+def actual_counts(db):
+    db.expire_all()
+    counts = dict(db.query(Todo.parent_id, func.count(Todo.id)).group_by(Todo.parent_id).all())
+    return {todo_id: counts.get(todo_id, 0) for (todo_id,) in db.query(Todo.id)}
+
+
+def reported_counts(client):
+    counts = {}
+    nodes = client.get("/api/todos/").json()
+    while nodes:
+        todo = nodes.pop()
+        counts[todo["id"]] = todo["children_count"]
+        nodes.extend(todo["children"])
+    return counts
+
+
+def test_children_count_follows_every_kind_of_write(client, db, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=a)
+    d = make_todo("D", parent_id=b)
+    e = make_todo("E")
+    assert reported_counts(client) == actual_counts(db) == {a: 2, b: 1, c: 0, d: 0, e: 0}
+
+    client.put(f"/api/todos/{c}", json={"parent_id": e})
+    client.post(f"/api/todos/{d}/move", json={"new_parent_id": e})
+    client.post("/api/todos/batch", json=[
+        {"op": "create", "data": {"text": "F", "parent_id": b}},
+        {"op": "update", "id": b, "data": {"parent_id": e}},
+    ])
+    client.delete(f"/api/todos/{c}")
+
+    counts = actual_counts(db)
+    assert reported_counts(client) == counts
+    assert (counts[a], counts[b], counts[e]) == (0, 1, 2)
+    # The detail and children routes load the count with the same column property
+    assert client.get(f"/api/todos/{e}").json()["children_count"] == 2
+    assert [child["children_count"] for child in client.get(f"/api/todos/{e}/children").json()] == [
+        counts[child_id] for child_id in sorted([b, d])
+    ]
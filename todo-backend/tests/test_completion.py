@@ -0,0 +1,68 @@
+def toggle(client, todo_id, completed, cascade=False):
+    return client.patch(f"/api/todos/{todo_id}/toggle", json={"completed": completed, "cascade": cascade})
+
+
+def test_cascade_marks_the_whole_subtree(client, make_todo, counters, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    make_todo("C", parent_id=b, completed=True)
+    other = make_todo("other")
+
+    response = toggle(client, a, True, cascade=True)
+
+    assert response.status_code == 200
+    assert response.json()["completed"] is True
+    tree = client.get(f"/api/todos/{a}").json()
+    assert tree["children"][0]["completed"] is True
+    assert tree["children"][0]["children"][0]["completed"] is True
+    assert client.get(f"/api/todos/{other}").json()["completed"] is False
+    assert_consistent()
+
+    toggle(client, b, False, cascade=True)
+    tree = client.get(f"/api/todos/{a}").json()
+    assert tree["completed"] is True
+    assert tree["children"][0]["completed"] is False
+    assert tree["children"][0]["children"][0]["completed"] is False
+    assert_consistent()
+
+
+def test_toggle_without_cascade_leaves_children(client, make_todo, counters, assert_consistent):
+    a = make_todo("A")
+    make_todo("B", parent_id=a)
+
+    toggle(client, a, True)
+
+    tree = client.get(f"/api/todos/{a}").json()
+    assert tree["completed"] is True
+    assert tree["children"][0]["completed"] is False
+    assert_consistent()
+
+
+def test_cascade_logs_only_the_todos_that_flip(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    make_todo("C", parent_id=b, completed=True)
+    since = client.get("/api/todos/changes?since=0").json()["version"]
+
+    toggle(client, a, True, cascade=True)
+
+    feed = client.get(f"/api/todos/changes?since={since}").json()
+    assert sorted(todo["id"] for todo in feed["todos"]) == [a, b]
+
+
+def test_progress_rolls_up_all_descendants(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    make_todo("C", parent_id=b, completed=True)
+    make_todo("D", parent_id=b)
+    make_todo("E", parent_id=a, completed=True)
+
+    tree = client.get(f"/api/todos/{a}").json()
+
+    assert tree["progress"] == {"completed": 2, "total": 4}
+    assert tree["children"][0]["progress"] == {"completed": 1, "total": 2}
+    roots = client.get("/api/todos/").json()
+    assert roots[0]["progress"] == {"completed": 2, "total": 4}
+
+    toggle(client, b, True, cascade=True)
+    assert client.get(f"/api/todos/{a}").json()["progress"] == {"completed": 4, "total": 4}
@@ -0,0 +1,13 @@
+import pytest
+
+from app.database import _async_url
+
+
+def test_async_url_swaps_in_the_async_driver():
+    assert _async_url("sqlite:///./todos.db") == "sqlite+aiosqlite:///./todos.db"
+    assert _async_url("postgresql+psycopg2://u:p@db/todos") == "postgresql+asyncpg://u:p@db/todos"
+
+
+def test_async_url_rejects_databases_without_a_known_driver():
+    with pytest.raises(ValueError, match="No async driver is known for mysql databases"):
+        _async_url("mysql://u:p@db/todos")
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app import crud
+
+# Sunday 23:30 in UTC (and on the server); already Monday 08:30 in Tokyo
+NOW = datetime(2026, 10, 18, 23, 30, tzinfo=timezone.utc)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz) if tz else NOW.replace(tzinfo=None)
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(crud, "datetime", FrozenDatetime)
+
+
+@pytest.fixture
+def todos(make_todo):
+    """Roots due around the boundary, and one child; returns ids by name"""
+    ids = {
+        "saturday": make_todo("saturday", due_date="2026-10-17T12:00:00"),
+        "saturday done": make_todo("saturday done", due_date="2026-10-17T12:00:00", completed=True),
+        "sunday": make_todo("sunday", due_date="2026-10-18T12:00:00"),
+        "monday": make_todo("monday", due_date="2026-10-19T12:00:00"),
+        "wednesday": make_todo("wednesday", due_date="2026-10-21T12:00:00"),
+        "next monday": make_todo("next monday", due_date="2026-10-26T12:00:00"),
+    }
+    ids["sunday child"] = make_todo("sunday child", parent_id=ids["wednesday"], due_date="2026-10-18T12:00:00")
+    return ids
+
+
+def view(client, due, tz):
+    response = client.get(f"/api/todos/?due={due}&tz={tz}")
+    assert response.status_code == 200
+    return [todo["text"] for todo in response.json()]
+
+
+@pytest.mark.parametrize("tz", ["UTC", "America/Los_Angeles"])
+def test_due_views_on_sunday(client, todos, tz):
+    assert view(client, "today", tz) == ["sunday"]
+    assert view(client, "overdue", tz) == ["saturday"]
+    # The week ends today
+    assert view(client, "this_week", tz) == ["sunday"]
+
+
+def test_due_views_once_it_is_monday(client, todos):
+    assert view(client, "today", "Asia/Tokyo") == ["monday"]
+    assert view(client, "overdue", "Asia/Tokyo") == ["saturday", "sunday"]
+    assert view(client, "this_week", "Asia/Tokyo") == ["monday", "wednesday"]
+
+
+def test_the_server_zone_is_used_without_tz(client, todos):
+    assert [todo["text"] for todo in client.get("/api/todos/?due=today").json()] == ["sunday"]
+
+
+def test_due_views_have_an_etag_per_local_day(client, todos):
+    utc = client.get("/api/todos/?due=today&tz=UTC").headers["ETag"]
+    tokyo = client.get("/api/todos/?due=today&tz=Asia/Tokyo").headers["ETag"]
+
+    assert utc != tokyo
+    assert client.get("/api/todos/?due=today&tz=Asia/Tokyo", headers={"If-None-Match": utc}).status_code == 200
+
+
+@pytest.mark.parametrize("use_counters", [False, True])
+def test_stats_bucket_days_in_the_given_zone(client, todos, request, use_counters):
+    if use_counters:
+        request.getfixturevalue("counters")
+
+    def stats(query):
+        stats = client.get(f"/api/todos/stats/?{query}").json()
+        return stats["total"], stats["overdue"], stats["due_today"]
+
+    assert stats("tz=UTC") == (7, 1, 2)
+    assert stats("tz=Asia/Tokyo") == (7, 3, 1)
+    assert stats("root_only=true&tz=UTC") == (6, 1, 1)
+    assert stats("root_only=true&tz=Asia/Tokyo") == (6, 2, 1)
+
+
+def test_unknown_zones_are_rejected(client):
+    for url in ("/api/todos/?due=today&tz=Mars/Olympus", "/api/todos/stats/?tz=Mars/Olympus"):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert response.json()["error"] == "Unknown time zone: Mars/Olympus"
@@ -0,0 +1,49 @@
+import pytest
+
+
+@pytest.fixture
+def urls(make_todo):
+    todo = make_todo("A")
+    make_todo("B", parent_id=todo)
+    return ["/api/todos/", "/api/todos/?nested=false", f"/api/todos/{todo}", "/api/todos/stats/"]
+
+
+def test_matching_if_none_match_is_a_304(client, urls):
+    for url in urls:
+        response = client.get(url)
+        etag = response.headers["ETag"]
+
+        assert response.headers["Cache-Control"] == "no-cache"
+        unchanged = client.get(url, headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert unchanged.headers["ETag"] == etag
+        # Weak and listed forms match too; a stale tag does not
+        assert client.get(url, headers={"If-None-Match": f'"0", W/{etag}'}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": '"0"'}).status_code == 200
+
+
+def test_every_write_changes_the_etag(client, make_todo, urls):
+    todo = int(urls[2].rsplit("/", 1)[1])
+    writes = [
+        lambda: make_todo("C"),
+        lambda: client.put(f"/api/todos/{todo}", json={"text": "renamed"}),
+        lambda: client.patch(f"/api/todos/{todo}/toggle", json={"completed": True}),
+        lambda: client.delete(f"/api/todos/{todo}"),
+    ]
+    etag = client.get("/api/todos/").headers["ETag"]
+    for write in writes:
+        write()
+
+        response = client.get("/api/todos/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        etag = response.headers["ETag"]
+
+
+def test_due_views_are_tagged_with_the_local_date(client, urls):
+    plain = client.get("/api/todos/").headers["ETag"]
+    due = client.get("/api/todos/?due=today&tz=UTC").headers["ETag"]
+
+    assert due != plain
+    assert client.get("/api/todos/?due=today&tz=UTC", headers={"If-None-Match": plain}).status_code == 200
@@ -0,0 +1,139 @@
+import io
+import json
+import os
+
+import pytest
+
+from app import crud, jobs
+from app.models import Job, Todo, TodoImportRow
+from app.routers import todos
+
+
+def ndjson(*rows):
+    return "".join(json.dumps({"text": "todo", **row}) + "\n" for row in rows)
+
+
+def rows(body):
+    return list(todos.read_import_rows(io.BytesIO(body.encode()), "ndjson"))
+
+
+def import_file(client, body, fmt="ndjson"):
+    return client.post(f"/api/todos/import?format={fmt}", content=body)
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_import_round_trip(client, make_todo, counters, assert_consistent, fmt):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a, priority="high")
+    make_todo("C", parent_id=b, completed=True)
+    exported = client.get(f"/api/todos/export?format={fmt}").text
+
+    response = import_file(client, exported, fmt)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["imported"], body["orphaned"]) == (3, 0)
+    copy = client.get(f"/api/todos/{a + body['id_offset']}").json()
+    assert copy["children"][0]["priority"] == "high"
+    assert copy["children"][0]["children"][0]["completed"] is True
+    assert copy["progress"] == {"completed": 1, "total": 2}
+    assert_consistent()
+
+
+def test_missing_parents_become_roots(client, db, assert_consistent):
+    response = import_file(client, ndjson(
+        {"id": 1, "parent_id": 50},
+        {"id": 2, "parent_id": 1},
+    ))
+
+    assert response.json()["orphaned"] == 1
+    assert db.query(Todo.id, Todo.parent_id).order_by(Todo.id).all() == [(1, None), (2, 1)]
+    assert_consistent()
+
+
+@pytest.mark.parametrize("rows", [
+    [{"id": 1, "parent_id": 2}, {"id": 2, "parent_id": 1}],
+    [{"id": 3, "parent_id": 3}],
+    [{"id": 1}, {"id": 2, "parent_id": 3}, {"id": 3, "parent_id": 4}, {"id": 4, "parent_id": 2}],
+])
+def test_parent_cycles_are_rejected(client, db, make_todo, counters, assert_consistent, rows):
+    make_todo("existing")
+
+    response = import_file(client, ndjson(*rows))
+
+    assert response.status_code == 400
+    assert "parent_id cycle; nothing was imported" in response.json()["error"]
+    assert db.query(Todo).count() == 1
+    assert client.get("/api/todos/").status_code == 200
+    assert_consistent()
+
+
+def test_invalid_rows_import_nothing(client, db):
+    duplicate = import_file(client, ndjson({"id": 1}, {"id": 1}))
+    invalid = import_file(client, ndjson({"id": 1}, {"id": 2, "priority": "urgent"}))
+    malformed = import_file(client, '{"id": 1, "text": "todo"}\n{"id": 2,')
+
+    assert [duplicate.status_code, invalid.status_code, malformed.status_code] == [400, 400, 400]
+    assert invalid.json()["error"].startswith("Line 2: priority")
+    assert db.query(Todo).count() == 0
+
+
+def test_background_import_runs_from_the_spooled_file(client, db, assert_consistent):
+    response = client.post("/api/todos/import?background=true", content=ndjson({"id": 1}, {"id": 2, "parent_id": 1}))
+
+    assert response.status_code == 202
+    path = json.loads(db.get(Job, response.json()["job_id"]).params)["path"]
+    assert os.path.exists(path)
+    assert jobs.run_next()
+    job = client.get(response.headers["Location"]).json()
+    assert job["status"] == "succeeded"
+    assert job["result"]["imported"] == 2
+    assert not os.path.exists(path)
+    assert_consistent()
+
+
+@pytest.mark.parametrize("background", ["false", "true"])
+def test_oversized_imports_are_refused(client, db, monkeypatch, background):
+    monkeypatch.setattr(todos, "IMPORT_MAX_BYTES", 100)
+
+    body = ndjson(*[{"id": i} for i in range(1, 10)])
+
+    response = client.post(f"/api/todos/import?background={background}", content=body)
+
+    assert response.status_code == 413
+    assert db.query(Todo).count() == 0
+    assert db.query(Job).count() == 0
+
+
+def test_writes_get_through_while_an_import_is_staged(client, db, make_todo, counters, assert_consistent):
+    existing = make_todo("existing")
+    import_id = crud.begin_import(db)
+    crud.import_todos_chunk(db, import_id, rows(ndjson({"id": 1}, {"id": 2, "parent_id": 1})))
+
+    # The staged chunk is committed: no write lock is held between chunks
+    during = make_todo("created during the import")
+    crud.import_todos_chunk(db, import_id, rows(ndjson({"id": 3, "parent_id": 2})))
+    result = crud.finish_import(db, import_id)
+
+    # The offset is taken when the rows are published, above the todo created meanwhile
+    assert result == {"imported": 3, "orphaned": 0, "id_offset": during}
+    assert db.query(Todo.id).order_by(Todo.id).all() == [(existing,), (during,), (during + 1,), (during + 2,), (during + 3,)]
+    assert db.query(TodoImportRow).count() == 0
+    assert_consistent()
+
+
+def test_failed_imports_leave_nothing_staged(client, db):
+    assert import_file(client, ndjson({"id": 1}, {"id": 2, "priority": "urgent"})).status_code == 400
+    assert import_file(client, ndjson({"id": 1, "parent_id": 1})).status_code == 400
+
+    assert db.query(TodoImportRow).count() == 0
+
+
+def test_rows_of_abandoned_imports_are_dropped(db, monkeypatch):
+    abandoned = crud.begin_import(db)
+    crud.import_todos_chunk(db, abandoned, rows(ndjson({"id": 1})))
+    monkeypatch.setattr(crud, "IMPORT_STAGING_RETENTION", -60)
+
+    crud.begin_import(db)
+
+    assert db.query(TodoImportRow).count() == 0
@@ -0,0 +1,73 @@
+import logging
+import re
+
+import pytest
+from sqlalchemy import text
+
+from app import database, metrics
+
+
+def sample(client, name, **labels):
+    """Current value of one metric sample on /metrics (0 if it has none yet)"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in client.get("/metrics").text.splitlines():
+        match = re.fullmatch(r"(\w+)\{(.*)\} (\S+)", line)
+        if match and match.group(1) == name and match.group(2) == wanted:
+            return float(match.group(3))
+    return 0
+
+
+def test_requests_are_labelled_by_route_template(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B")
+    before = sample(client, "http_requests_total", method="GET", route="/api/todos/{todo_id}", status=200)
+
+    client.get(f"/api/todos/{a}")
+    client.get(f"/api/todos/{b}")
+
+    after = sample(client, "http_requests_total", method="GET", route="/api/todos/{todo_id}", status=200)
+    assert after - before == 2
+    body = client.get("/metrics").text
+    assert f"/api/todos/{a}\"" not in body
+    assert 'http_request_db_queries_count{method="GET",route="/api/todos/{todo_id}"}' in body
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = sample(client, "http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status=404)
+
+    client.get("/no/such/page-1")
+    client.get("/no/such/page-2")
+
+    assert sample(client, "http_requests_total", method="GET", route=metrics.UNMATCHED_ROUTE, status=404) - before == 2
+    assert "/no/such" not in client.get("/metrics").text
+
+
+def test_requests_over_the_query_budget_are_logged(client, make_todo, monkeypatch, caplog):
+    make_todo("A")
+    monkeypatch.setattr(metrics, "QUERY_BUDGET", 1)
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/api/todos/")
+
+    assert any(record.getMessage().startswith("Possible N+1: GET /api/todos/ issued")
+               and record.getMessage().endswith("(budget 1)") for record in caplog.records)
+
+
+def test_budget_raise_fails_the_query_that_goes_over():
+    with database.engine.connect() as conn:
+        with metrics.track_queries("loop", budget=2, action="raise") as stats:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            with pytest.raises(metrics.QueryBudgetExceeded, match="query 3: SELECT 3"):
+                conn.execute(text("SELECT 3"))
+    assert stats.queries == 3
+
+
+def test_nested_blocks_count_their_own_queries():
+    with database.engine.connect() as conn:
+        with metrics.track_queries("outer", budget=0) as outer:
+            conn.execute(text("SELECT 1"))
+            with metrics.track_queries("inner", budget=0) as inner:
+                conn.execute(text("SELECT 2"))
+                conn.execute(text("SELECT 3"))
+    assert (outer.queries, inner.queries) == (1, 2)
@@ -0,0 +1,38 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from app import database
+
+
+def upgrade(connection, revision):
+    config = Config(database.ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(database.ALEMBIC_INI), "alembic"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+
+
+def test_path_backfill_roots_orphans_and_cycles(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        upgrade(connection, "0005")
+        # 1 > 2 > 3, then 1 deleted the way the baseline bulk delete did it;
+        # 4 > 5 > 6 > 4 loops, and 7 hangs off the loop
+        connection.execute(text("""
+            INSERT INTO todos (id, text, completed, priority, parent_id) VALUES
+            (2, 'B', 0, 'medium', 1), (3, 'C', 0, 'medium', 2),
+            (4, 'D', 0, 'medium', 6), (5, 'E', 0, 'medium', 4), (6, 'F', 0, 'medium', 5),
+            (7, 'G', 0, 'medium', 5), (8, 'H', 0, 'medium', NULL)
+        """))
+
+        upgrade(connection, "0006")
+
+        rows = connection.execute(text("SELECT id, parent_id, path, depth FROM todos ORDER BY id")).all()
+    engine.dispose()
+    assert rows == [
+        (2, None, "/2/", 0), (3, 2, "/2/3/", 1),
+        (4, None, "/4/", 0), (5, 4, "/4/5/", 1), (6, 5, "/4/5/6/", 2),
+        (7, 5, "/4/5/7/", 2), (8, None, "/8/", 0),
+    ]
@@ -0,0 +1,79 @@
+def child_ids(client, todo_id):
+    return [child["id"] for child in client.get(f"/api/todos/{todo_id}").json()["children"]]
+
+
+def move(client, todo_id, new_parent_id):
+    return client.post(f"/api/todos/{todo_id}/move", json={"new_parent_id": new_parent_id})
+
+
+def test_batch_move_under_former_child(client, make_todo, counters, assert_consistent):
+    a = make_todo("A")
+    x = make_todo("X", parent_id=a)
+    y = make_todo("Y")
+
+    response = client.post("/api/todos/move", json={"moves": [
+        {"todo_id": a, "new_parent_id": y},
+        {"todo_id": x, "new_parent_id": None},
+        {"todo_id": a, "new_parent_id": x},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json()["applied"] == 3
+    assert_consistent()
+    assert child_ids(client, x) == [a]
+    assert child_ids(client, y) == []
+
+
+def test_batch_move_rejects_cycle_created_within_the_batch(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B")
+
+    response = client.post("/api/todos/move", json={"moves": [
+        {"todo_id": b, "new_parent_id": a},
+        {"todo_id": a, "new_parent_id": b},
+    ]})
+
+    results = response.json()["results"]
+    assert [result["ok"] for result in results] == [True, False]
+    assert results[1]["error"] == "Cannot move todo to its own descendant"
+    assert_consistent()
+
+
+def test_atomic_batch_move_writes_nothing_on_failure(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B")
+
+    response = client.post("/api/todos/move?atomic=true", json={"moves": [
+        {"todo_id": a, "new_parent_id": b},
+        {"todo_id": b, "new_parent_id": 999999},
+    ]})
+
+    assert response.json()["applied"] == 0
+    assert child_ids(client, b) == []
+    assert_consistent()
+
+
+def test_move_subtree(client, make_todo, counters, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+    d = make_todo("D")
+
+    assert move(client, b, d).status_code == 200
+    assert_consistent()
+    assert child_ids(client, d) == [b]
+    assert [todo["id"] for todo in client.get(f"/api/todos/{c}/ancestors").json()] == [d, b]
+
+    assert move(client, b, None).status_code == 200
+    assert_consistent()
+
+
+def test_move_into_own_subtree_or_missing_parent(client, make_todo, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+
+    assert move(client, a, b).status_code == 400
+    assert move(client, a, a).status_code == 400
+    assert move(client, a, 999999).status_code == 400
+    assert move(client, 999999, None).status_code == 404
+    assert_consistent()
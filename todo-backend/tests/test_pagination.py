@@ -0,0 +1,35 @@
+def walk(client, url, limit):
+    seen, cursor = [], None
+    while True:
+        page = client.get(url, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert page.status_code == 200
+        seen += [todo["id"] for todo in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_cursor_walk_returns_every_root_once(client, make_todo):
+    roots = [make_todo(f"root {i}") for i in range(10)]
+    make_todo("child", parent_id=roots[0])
+
+    assert walk(client, "/api/todos/", limit=3) == roots
+    assert walk(client, "/api/todos/?nested=false", limit=4) == roots
+    # An exact multiple of the page size ends with one empty page
+    assert walk(client, "/api/todos/", limit=5) == roots
+
+
+def test_cursor_walk_of_children(client, make_todo):
+    parent = make_todo("parent")
+    children = [make_todo(f"child {i}", parent_id=parent) for i in range(7)]
+
+    assert walk(client, f"/api/todos/?parent_id={parent}", limit=2) == children
+
+
+def test_malformed_cursor_is_a_400(client, make_todo):
+    make_todo("root")
+
+    for cursor in ("not-a-cursor", "WzEsMl0", "WyJhIl0", "e30"):
+        response = client.get("/api/todos/", params={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["error"] == "Invalid cursor"
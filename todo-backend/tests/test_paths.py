@@ -0,0 +1,103 @@
+from sqlalchemy import insert
+
+from app import crud
+from app.models import Todo
+
+
+def test_paths_follow_creates_updates_and_deletes(client, make_todo, counters, db, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+    d = make_todo("D")
+
+    rows = {todo.id: (todo.path, todo.depth) for todo in db.query(Todo)}
+    assert rows[c] == (f"/{a}/{b}/{c}/", 2)
+    assert rows[d] == (f"/{d}/", 0)
+
+    # Re-parenting through PUT goes through the same path rewrite as /move
+    assert client.put(f"/api/todos/{b}", json={"parent_id": d}).status_code == 200
+    assert_consistent()
+    db.expire_all()
+    assert db.get(Todo, c).path == f"/{d}/{b}/{c}/"
+
+    assert client.delete(f"/api/todos/{d}").status_code == 200
+    assert db.query(Todo.id).all() == [(a,)]
+    assert_consistent()
+
+
+def test_ancestors_from_the_root_down(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+
+    ancestors = client.get(f"/api/todos/{c}/ancestors").json()
+
+    assert [todo["id"] for todo in ancestors] == [a, b]
+    assert client.get(f"/api/todos/{a}/ancestors").json() == []
+
+
+def test_nested_listing_by_depth(client, make_todo):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    make_todo("C", parent_id=b)
+
+    tree = client.get(f"/api/todos/{a}?max_depth=1").json()
+
+    assert [child["id"] for child in tree["children"]] == [b]
+    assert tree["children"][0]["children"] == []
+
+
+def test_a_full_page_of_roots_loads_its_subtrees(client, db):
+    # 1000 roots, the largest page, each with one child
+    db.execute(insert(Todo), [{"id": i, "text": f"root {i}"} for i in range(1, 1001)])
+    db.execute(insert(Todo), [{"id": 1000 + i, "text": f"child {i}", "parent_id": i} for i in range(1, 1001)])
+    db.commit()
+    crud.rebuild_todo_paths(db)
+
+    response = client.get("/api/todos/?limit=1000")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page) == 1000
+    assert all([child["id"] for child in root["children"]] == [root["id"] + 1000] for root in page)
+
+
+def test_rebuild_fixes_drifted_paths(make_todo, db, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+    # A write that bypasses crud, as a raw SQL edit or an old restore would
+    db.query(Todo).filter(Todo.id == c).update({Todo.parent_id: a, Todo.path: None})
+    db.commit()
+
+    assert crud.verify_todo_paths(db) == [c]
+    assert crud.rebuild_todo_paths(db) == 1
+    assert_consistent()
+
+
+def test_rebuild_makes_unreachable_todos_roots(client, make_todo, db, assert_consistent):
+    a = make_todo("A")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b)
+    x = make_todo("X")
+    y = make_todo("Y", parent_id=x)
+    z = make_todo("Z", parent_id=y)
+    # The baseline bulk delete removed parents without their children
+    db.query(Todo).filter(Todo.id == a).delete()
+    db.query(Todo).filter(Todo.id.in_([b, c])).update({Todo.path: None})
+    # ... and a parent_id edit can close a loop
+    db.query(Todo).filter(Todo.id == x).update({Todo.parent_id: z, Todo.path: None})
+    db.commit()
+    since = client.get("/api/todos/changes?since=0").json()["version"]
+
+    # y and z kept their old paths, which are right again once x is a root
+    assert crud.rebuild_todo_paths(db) == 3
+    assert_consistent()
+    assert db.query(Todo.id, Todo.parent_id, Todo.path).order_by(Todo.id).all() == [
+        (b, None, f"/{b}/"), (c, b, f"/{b}/{c}/"),
+        (x, None, f"/{x}/"), (y, x, f"/{x}/{y}/"), (z, y, f"/{x}/{y}/{z}/"),
+    ]
+    # They answer again, and clients hear about their new parent_id
+    assert client.get(f"/api/todos/{b}").json()["children"][0]["id"] == c
+    feed = client.get(f"/api/todos/changes?since={since}").json()
+    assert sorted(change["todo_id"] for change in feed["changes"]) == [b, x]
@@ -0,0 +1,87 @@
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+
+from app import metrics, profiling
+from app.main import app
+from app.routers import maintain_db
+
+TOKEN = maintain_db.ADMIN_TOKEN
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    """A client for the app with the profiling middleware installed, as PROFILING_ENABLED does"""
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    installed = app.user_middleware
+    assert installed[0].cls is metrics.MetricsMiddleware
+
+    def make(sample_rate=0.0):
+        # Just inside the metrics middleware, where main.py puts it; the
+        # monkeypatch puts the original stack back afterwards
+        monkeypatch.setattr(app, "user_middleware", [
+            installed[0],
+            Middleware(profiling.ProfilingMiddleware, token=TOKEN, sample_rate=sample_rate),
+            *installed[1:],
+        ])
+        monkeypatch.setattr(app, "middleware_stack", None)
+        return TestClient(app)
+    return make
+
+
+def test_only_the_token_header_or_the_sample_is_profiled(profiled, monkeypatch):
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.3)
+
+    on_request = profiled()
+    assert profiling.PROFILE_ID_HEADER in on_request.get("/api/todos/", headers={"X-Profile": TOKEN}).headers
+    assert profiling.PROFILE_ID_HEADER not in on_request.get("/api/todos/", headers={"X-Profile": "wrong"}).headers
+    assert profiling.PROFILE_ID_HEADER not in on_request.get("/api/todos/").headers
+
+    # random() == 0.3 falls inside a 0.5 sample but not a 0.2 one
+    assert profiling.PROFILE_ID_HEADER in profiled(sample_rate=0.5).get("/api/todos/").headers
+    assert profiling.PROFILE_ID_HEADER not in profiled(sample_rate=0.2).get("/api/todos/").headers
+    assert len(profiling.list_profile_ids()) == 2
+
+
+def test_event_streams_are_never_sampled(monkeypatch):
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.0)
+    middleware = profiling.ProfilingMiddleware(app, token=TOKEN, sample_rate=1.0)
+
+    assert not middleware._wanted({"headers": [(b"accept", b"text/event-stream")]})
+    assert middleware._wanted({"headers": [(b"accept", b"application/json")]})
+
+
+def test_only_the_newest_captures_are_kept(profiled, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 3)
+    client = profiled()
+
+    ids = [client.get(f"/api/todos/{i}", headers={"X-Profile": TOKEN}).headers[profiling.PROFILE_ID_HEADER]
+           for i in range(5)]
+
+    assert profiling.list_profile_ids() == ids[-3:]
+    listed = client.get(f"/api/admin/profiles?token={TOKEN}").json()["profiles"]
+    assert [info["id"] for info in listed] == ids[:-4:-1]
+    assert client.get(f"/api/admin/profiles/{ids[0]}?token={TOKEN}").status_code == 404
+
+
+def test_captures_can_be_downloaded(profiled, make_todo, tmp_path):
+    todo = make_todo("A")
+    client = profiled()
+    profile_id = client.get(f"/api/todos/{todo}", headers={"X-Profile": TOKEN}).headers[profiling.PROFILE_ID_HEADER]
+
+    info = client.get(f"/api/admin/profiles?token={TOKEN}").json()["profiles"][0]
+    assert (info["route"], info["status"]) == ("/api/todos/{todo_id}", 200)
+    assert info["db_queries"] > 0
+
+    report = client.get(f"/api/admin/profiles/{profile_id}?token={TOKEN}&format=text")
+    assert report.text.startswith(f"id: {profile_id}\n")
+    assert "function calls" in report.text
+
+    raw = client.get(f"/api/admin/profiles/{profile_id}?token={TOKEN}")
+    (tmp_path / "copy.prof").write_bytes(raw.content)
+    assert pstats.Stats(str(tmp_path / "copy.prof")).total_calls > 0
+
+    assert client.get(f"/api/admin/profiles/{profile_id}?token=wrong").status_code == 403
+    assert client.get(f"/api/admin/profiles/../../etc?token={TOKEN}").status_code == 404
@@ -0,0 +1,163 @@
+"""Fail if any crud query falls back to a full table scan.
+
+Runs every crud function against a small seeded SQLite database, captures the
+SQL it emits and checks ``EXPLAIN QUERY PLAN`` for each statement. Any plain
+``SCAN <table>`` (a scan that uses no index) is reported as a failure, apart
+from the documented exceptions in ``ALLOWED_SCANS``.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, database, jobs, schemas
+
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+
+# CTEs are materialized per query and are expected to be scanned
+CTE_NAMES = {"subtree", "chain", "tree"}
+
+# (crud function, table) pairs that scan by design
+ALLOWED_SCANS = {
+    # One row per user; the global total has to add them all up
+    ("get_todo_stats[counters]", "todo_counters"),
+    # Maintenance job that recomputes every counter from scratch
+    ("rebuild_todo_counters", "todos"),
+    ("rebuild_todo_counters", "todo_counters"),
+    # Streams the whole table in primary key order
+    ("export_todos", "todos"),
+}
+
+
+def seed(db):
+    """Create a small tree with a mix of priorities, states and due dates"""
+    yesterday = datetime.now() - timedelta(days=1)
+    ids = []
+    for i in range(30):
+        todo = crud.create_todo(db, schemas.TodoCreate(
+            text=f"seed todo {i} plan project",
+            priority=("low", "medium", "high")[i % 3],
+            completed=i % 4 == 0,
+            due_date=yesterday + timedelta(days=i % 3) if i % 5 == 0 else None,
+            parent_id=ids[i // 3] if i >= 3 else None,
+        ))
+        ids.append(todo.id)
+    return ids
+
+
+def without_counters(call):
+    """Run a crud call on the aggregation path rather than todo_counters"""
+    def run(db):
+        crud.STATS_COUNTERS_ENABLED = False
+        try:
+            return call(db)
+        finally:
+            crud.STATS_COUNTERS_ENABLED = True
+    return run
+
+
+def import_todos(db):
+    """A two-row import with a parent link, through all three import steps"""
+    import_id = crud.begin_import(db)
+    crud.import_todos_chunk(db, import_id, [
+        {"id": 1, "parent_id": None, "text": "imported", "completed": False, "priority": "low",
+         "due_date": None, "user_id": None, "created_at": None, "updated_at": None},
+        {"id": 2, "parent_id": 1, "text": "imported child", "completed": True, "priority": "high",
+         "due_date": None, "user_id": None, "created_at": None, "updated_at": None},
+    ])
+    crud.finish_import(db, import_id)
+
+
+def crud_calls(ids):
+    """Every crud entry point, with representative arguments"""
+    root, child, leaf = ids[0], ids[3], ids[-1]
+    return [
+        ("get_todo", lambda db: crud.get_todo(db, child)),
+        ("get_todo_with_children", lambda db: crud.get_todo_with_children(db, root)),
+        ("get_todos[roots]", lambda db: crud.get_todos(db)),
+        ("get_todos[children]", lambda db: crud.get_todos(db, parent_id=root, completed=False)),
+        ("get_todos[cursor]", lambda db: crud.get_todos(db, cursor=crud.encode_cursor(root))),
+        ("get_root_todos_with_children", lambda db: crud.get_root_todos_with_children(db)),
+        ("get_todos[due=today]", lambda db: crud.get_todos(db, due="today", tz="UTC")),
+        ("get_todos[due=this_week]", lambda db: crud.get_todos(db, due="this_week")),
+        ("get_root_todos_with_children[due=overdue]",
+         lambda db: crud.get_root_todos_with_children(db, due="overdue")),
+        ("search_todos", lambda db: crud.search_todos(db, "pla", highlight=True)),
+        ("get_todo_stats", without_counters(lambda db: crud.get_todo_stats(db))),
+        ("get_todo_stats[user]", without_counters(lambda db: crud.get_todo_stats(db, user_id=1))),
+        ("get_todo_stats[root_only]", lambda db: crud.get_todo_stats(db, root_only=True, tz="UTC")),
+        ("update_todo", lambda db: crud.update_todo(db, leaf, schemas.TodoUpdate(priority="high"))),
+        ("toggle_todo_completion", lambda db: crud.toggle_todo_completion(db, leaf, True)),
+        ("toggle_todo_completion[cascade]", lambda db: crud.toggle_todo_completion(db, child, True, cascade=True)),
+        ("move_todo", lambda db: crud.move_todo(db, leaf, child)),
+        ("is_descendant", lambda db: crud.is_descendant(db, leaf, root)),
+        ("check_moves", lambda db: crud.check_moves(db, [(child, leaf), (leaf, None)])),
+        ("generate_ai_subtasks", lambda db: crud.generate_ai_subtasks(db, leaf, 3)),
+        ("delete_todo", lambda db: crud.delete_todo(db, ids[-2])),
+        ("bulk_delete_todos", lambda db: crud.bulk_delete_todos(db, [ids[-3], ids[-4]])),
+        ("create_todo", lambda db: crud.create_todo(db, schemas.TodoCreate(text="new", parent_id=root))),
+        ("apply_batch", lambda db: crud.apply_batch(db, [
+            (0, schemas.BatchCreate(op="create", data=schemas.TodoCreate(text="batch", parent_id=child))),
+            (1, schemas.BatchUpdate(op="update", id=child, data=schemas.TodoUpdate(parent_id=None))),
+            (2, schemas.BatchToggle(op="toggle", id=root, completed=True)),
+            (3, schemas.BatchDelete(op="delete", id=ids[-5])),
+        ])),
+        ("get_changes", lambda db: crud.get_changes(db, since=5)),
+        ("export_todos", lambda db: db.execute(crud.export_todos_query()).all()),
+        ("import_todos", import_todos),
+        ("rebuild_todo_counters", lambda db: crud.rebuild_todo_counters(db)),
+        ("get_todo_stats[counters]", lambda db: crud.get_todo_stats(db)),
+        ("jobs.claim_job", jobs.claim_job),
+        ("jobs.prune_jobs", jobs.prune_jobs),
+        ("jobs.fail_interrupted_jobs", jobs.fail_interrupted_jobs),
+    ]
+
+
+def full_scans(conn, statement, params):
+    """Tables the statement reads without an index"""
+    cursor = conn.connection.dbapi_connection.cursor()
+    plan = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", params).fetchall()
+    scans = []
+    for row in plan:
+        match = SCAN.match(row[-1])
+        if match and match.group(1) not in CTE_NAMES and match.group(1) != "CONSTANT":
+            scans.append(match.group(1))
+    return scans
+
+
+@pytest.fixture
+def captured():
+    """SELECT / WITH / UPDATE / DELETE statements run while the test runs"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Plain INSERT ... VALUES never reads a table, so only these can scan
+        if statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(database.engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(database.engine, "before_cursor_execute", capture)
+
+
+# Names only: the ids are those of each test's own seed
+CASES = [name for name, _ in crud_calls(list(range(30)))]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_no_full_table_scan(name, db, counters, captured):
+    # counters: exercise the counter maintenance queries on every write as well
+    call = dict(crud_calls(seed(db)))[name]
+    del captured[:]
+    call(db)
+    db.commit()
+
+    failures = []
+    with database.engine.connect() as conn:
+        for statement, params in captured:
+            for table in full_scans(conn, statement, params):
+                if (name, table) not in ALLOWED_SCANS:
+                    failures.append(f"full scan of {table}: {' '.join(statement.split())}")
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,68 @@
+import pytest
+
+from app import database
+
+
+@pytest.fixture(autouse=True)
+def fts():
+    assert database.FTS_ENABLED, "the tests expect an SQLite build with FTS5"
+
+
+def search(client, q, **params):
+    return client.get("/api/todos/search/", params={"q": q, **params})
+
+
+def ids(response):
+    return [todo["id"] for todo in response.json()]
+
+
+def test_words_match_as_prefixes(client, make_todo):
+    groceries = make_todo("Buy groceries for the week")
+    make_todo("Call the plumber")
+    both = make_todo("Buy a plumbing kit")
+
+    assert ids(search(client, "groc")) == [groceries]
+    assert sorted(ids(search(client, "buy plumb"))) == [both]
+    assert ids(search(client, "!!!")) == []
+
+
+def test_diacritics_are_folded(client, make_todo):
+    cafe = make_todo("Réserver le café")
+
+    assert ids(search(client, "cafe")) == [cafe]
+    assert ids(search(client, "reserver")) == [cafe]
+    assert ids(search(client, "CAFÉ")) == [cafe]
+
+
+def test_highlighted_snippets(client, make_todo):
+    make_todo("Water the garden plants")
+
+    plain, highlighted = search(client, "gard").json(), search(client, "gard", highlight=True).json()
+
+    assert plain[0]["snippet"] is None
+    assert highlighted[0]["snippet"] == "Water the <mark>garden</mark> plants"
+
+
+def test_cursor_pages_through_the_ranking_once(client, make_todo):
+    # Different lengths give different bm25 ranks, with ties among equals
+    created = {make_todo("report " + "filler " * (i % 4)) for i in range(11)}
+    make_todo("unrelated")
+    full = ids(search(client, "report", limit=100))
+
+    seen, cursor = [], None
+    while True:
+        page = search(client, "report", limit=3, **({"cursor": cursor} if cursor else {}))
+        seen += ids(page)
+        cursor = page.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == full
+    assert set(seen) == created
+
+
+def test_malformed_cursor_is_a_400(client, make_todo):
+    make_todo("report")
+
+    for cursor in ("not-a-cursor", "WzFd", "WyJhIiwxXQ"):
+        assert search(client, "report", cursor=cursor).status_code == 400
@@ -0,0 +1,39 @@
+def test_stats_body_and_etag(client, make_todo):
+    a = make_todo("A", priority="high")
+    make_todo("B", parent_id=a, completed=True)
+
+    response = client.get("/api/todos/stats/")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 2, "completed": 1, "pending": 1, "overdue": 0, "due_today": 0,
+        "by_priority": {"low": 0, "medium": 1, "high": 1},
+    }
+    etag = response.headers["ETag"]
+    assert client.get("/api/todos/stats/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/todos/stats/?root_only=true").json()["total"] == 1
+
+
+def test_counters_match_the_aggregation_after_mixed_writes(client, make_todo, counters, assert_consistent):
+    a = make_todo("A", priority="high")
+    b = make_todo("B", parent_id=a)
+    c = make_todo("C", parent_id=b, priority="low")
+    d = make_todo("D")
+    assert_consistent()
+
+    client.put(f"/api/todos/{c}", json={"priority": "high", "completed": True})
+    client.patch(f"/api/todos/{a}/toggle", json={"completed": True, "cascade": True})
+    client.post(f"/api/todos/{b}/move", json={"new_parent_id": d})
+    assert_consistent()
+
+    client.post("/api/todos/batch", json=[
+        {"op": "create", "data": {"text": "E", "parent_id": d, "priority": "low"}},
+        {"op": "update", "id": d, "data": {"priority": "low"}},
+        {"op": "toggle", "id": c, "completed": False},
+    ])
+    client.delete(f"/api/todos/{b}")
+    assert_consistent()
+
+    stats = client.get("/api/todos/stats/").json()
+    assert (stats["total"], stats["completed"]) == (3, 1)
+    assert stats["by_priority"] == {"low": 2, "medium": 0, "high": 1}
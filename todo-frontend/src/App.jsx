@@ -9,6 +9,9 @@ import { Navigation } from './components/Navigation'
 import { CheckCircleIcon } from '@heroicons/react/24/outline'
 import { transitionViewChange, transitionNavigation } from './utils/viewTransitions'
 
+// Views the server filters by due date (useTodos fetches them with ?due=...)
+const DUE_VIEWS = { overdue: 'overdue', today: 'today' }
+
 function App() {
   const {
     todos,
@@ -23,6 +26,7 @@ function App() {
     searchTodos,
     moveTodo,
     generateAISubtasks,
+    setDueView,
   } = useTodos()
 
   const [searchQuery, setSearchQuery] = useState('')
@@ -54,6 +58,10 @@ function App() {
     })
   }
 
+  useEffect(() => {
+    setDueView(DUE_VIEWS[activeView] || null)
+  }, [activeView, setDueView])
+
   const handleNavToggle = () => {
     transitionNavigation(() => {
       setIsNavVisible(!isNavVisible)
@@ -68,10 +76,13 @@ function App() {
       case 'completed':
         return todo.completed
       case 'overdue':
+        // Listed by the server; search results still need the check
+        if (!searchQuery) return true
         return todo.due_date && new Date(todo.due_date) < new Date() && !todo.completed
       case 'high-priority':
         return todo.priority === 'high'
       case 'today':
+        if (!searchQuery) return true
         if (!todo.due_date) return false
         const today = new Date().toISOString().split('T')[0]
         const todoDate = todo.due_date.split('T')[0]
@@ -3,16 +3,24 @@ import { useState, useEffect, useCallback } from 'react';
 export const API_BASE = 'http://localhost:8000/api';
 const API_TODO_BASE = `${API_BASE}/todos`;
 
+// The server buckets due dates into days in this zone (today, overdue, ...)
+const TIME_ZONE = Intl.DateTimeFormat().resolvedOptions().timeZone;
+const TZ_PARAM = `tz=${encodeURIComponent(TIME_ZONE)}`;
+
 export const useTodos = () => {
   const [todos, setTodos] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [stats, setStats] = useState(null);
+  const [filteredStats, setFilteredStats] = useState(null);
+  // Server-side due-date view (today, overdue or this_week); null lists every root todo
+  const [dueView, setDueView] = useState(null);
 
   const fetchTodos = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await fetch(`${API_TODO_BASE}/`);
+      const query = dueView ? `?due=${dueView}&${TZ_PARAM}` : '';
+      const response = await fetch(`${API_TODO_BASE}/${query}`);
       if (!response.ok) throw new Error('Failed to fetch todos');
       const data = await response.json();
       setTodos(data);
@@ -22,55 +30,24 @@ export const useTodos = () => {
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [dueView]);
 
+  // All-todo stats, plus the root-only counts shown in the navigation
   const fetchStats = async () => {
     try {
-      const response = await fetch(`${API_TODO_BASE}/stats/`);
-      if (!response.ok) throw new Error('Failed to fetch stats');
-      const data = await response.json();
-      setStats(data);
+      const [response, rootResponse] = await Promise.all([
+        fetch(`${API_TODO_BASE}/stats/?${TZ_PARAM}`),
+        fetch(`${API_TODO_BASE}/stats/?root_only=true&${TZ_PARAM}`),
+      ]);
+      if (!response.ok || !rootResponse.ok) throw new Error('Failed to fetch stats');
+      setStats(await response.json());
+      const rootStats = await rootResponse.json();
+      setFilteredStats({ ...rootStats, dueToday: rootStats.due_today });
     } catch (err) {
       console.error('Failed to fetch stats:', err);
     }
   };
 
-  // Calculate filtered stats based on current todos (excluding sub-items)
-  const calculateFilteredStats = (todoList) => {
-    // Only count root-level todos (parent_id is null)
-    const rootTodos = todoList.filter(todo => !todo.parent_id);
-    
-    const total = rootTodos.length;
-    const completed = rootTodos.filter(todo => todo.completed).length;
-    const pending = rootTodos.filter(todo => !todo.completed).length;
-    const overdue = rootTodos.filter(todo => 
-      todo.due_date && new Date(todo.due_date) < new Date() && !todo.completed
-    ).length;
-    
-    // Calculate due today count
-    const today = new Date().toISOString().split('T')[0];
-    const dueToday = rootTodos.filter(todo => {
-      if (!todo.due_date) return false;
-      const todoDate = todo.due_date.split('T')[0];
-      return todoDate === today;
-    }).length;
-    
-    const by_priority = {
-      high: rootTodos.filter(todo => todo.priority === 'high').length,
-      medium: rootTodos.filter(todo => todo.priority === 'medium').length,
-      low: rootTodos.filter(todo => todo.priority === 'low').length,
-    };
-
-    return {
-      total,
-      completed,
-      pending,
-      overdue,
-      dueToday,
-      by_priority
-    };
-  };
-
   const createTodo = async (todoData) => {
     try {
       console.log('Creating todo with data:', todoData);
@@ -177,6 +154,7 @@ export const useTodos = () => {
       });
       if (!response.ok) throw new Error('Failed to move todo');
       await fetchTodos();
+      await fetchStats();
       return await response.json();
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Unknown error');
@@ -202,6 +180,9 @@ export const useTodos = () => {
 
   useEffect(() => {
     fetchTodos();
+  }, [fetchTodos]);
+
+  useEffect(() => {
     fetchStats();
   }, []);
 
@@ -210,7 +191,9 @@ export const useTodos = () => {
     loading,
     error,
     stats,
-    filteredStats: calculateFilteredStats(todos),
+    filteredStats,
+    dueView,
+    setDueView,
     fetchTodos,
     createTodo,
     updateTodo,